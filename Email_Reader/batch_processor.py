@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    BATCH_IMAP_CONCURRENCY, BATCH_CLASSIFIER_CONCURRENCY, BATCH_LLM_CONCURRENCY, EMAIL_STORE_PATH, IMAP_ENDPOINT
+)
+from .email_store import EmailStore
+from .session_pool import SessionPool
+from .draft_queue import DraftQueue
+from .idle_watcher import IdleWatcher
+from .email_response import send_approved_drafts
+
+
+def load_accounts(path):
+    """
+    Load the accounts to process from a JSON file.
+
+    Each entry holds a "user" and either a "password" or the name of an environment
+    variable holding it in "password_env"; "mailbox" and "imap_url" are optional.
+
+    Args:
+        path (str): Path of the JSON accounts file.
+
+    Returns:
+        List[dict]: Accounts with 'user', 'password', 'mailbox' and 'imap_url'.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+    except Exception as e:
+        logging.error(f"Error loading accounts from {path}: {e}")
+        raise Exception(f"Error loading accounts from {path}: {e}")
+
+    accounts = []
+    for entry in entries:
+        password = entry.get('password')
+        if password is None and entry.get('password_env'):
+            password = os.environ.get(entry['password_env'])
+        if not entry.get('user') or password is None:
+            raise Exception(f"Account entry {entry.get('user', '<missing user>')} needs a user and a password")
+        accounts.append({
+            'user': entry['user'],
+            'password': password,
+            'mailbox': entry.get('mailbox', 'inbox'),
+            'imap_url': entry.get('imap_url', IMAP_ENDPOINT),
+        })
+    return accounts
+
+
+class BatchProcessor:
+    """
+    Headless fetch → classify → draft pipeline over many mailboxes.
+
+    A worker pool syncs up to imap_workers accounts at a time into the shared mailbox
+    store; every stored batch goes straight to one DraftQueue, whose classifier and LLM
+    worker counts bound the model concurrency across all accounts.
+    """
+
+    def __init__(self, accounts, responder, imap_workers=BATCH_IMAP_CONCURRENCY,
+                 classifier_workers=BATCH_CLASSIFIER_CONCURRENCY, llm_workers=BATCH_LLM_CONCURRENCY):
+        """
+        Initialize the BatchProcessor object.
+
+        Args:
+            accounts (List[dict]): Accounts as returned by load_accounts.
+            responder (EmailResponder): Responder used for classification and generation.
+            imap_workers (int): Maximum number of accounts synced concurrently.
+            classifier_workers (int): Maximum number of concurrent classification batches.
+            llm_workers (int): Maximum number of concurrent LLM generations.
+        """
+        self.accounts = accounts
+        self.responder = responder
+        self.imap_workers = imap_workers
+        self.store = EmailStore(EMAIL_STORE_PATH)
+        self.pools = {}
+        self.drafts = DraftQueue(responder, self.store, workers=llm_workers, classifier_workers=classifier_workers)
+        self.watchers = []
+        self.lock = threading.Lock()
+
+    def _pool(self, imap_url):
+        """
+        Get the session pool of an IMAP server.
+
+        Args:
+            imap_url (str): IMAP server URL.
+
+        Returns:
+            SessionPool: Pool keeping the server's sessions open between rounds.
+        """
+        with self.lock:
+            if imap_url not in self.pools:
+                self.pools[imap_url] = SessionPool(imap_url=imap_url)
+            return self.pools[imap_url]
+
+    def _sync_account(self, account, submitted):
+        """
+        Sync one account into the store and queue its new emails for drafting.
+
+        Args:
+            account (dict): Account to sync.
+            submitted (List[str]): Collects the Message-IDs queued for this account.
+
+        Returns:
+            dict: Emails stored and the sync time.
+        """
+        def submit(batch):
+            """Queue a stored batch for drafting and remember its Message-IDs."""
+            message_ids = [record.message_id for record in batch if record.message_id]
+            self.drafts.submit(batch)
+            submitted.extend(message_ids)
+
+        start = time.perf_counter()
+        saved = self._pool(account['imap_url']).call_imap(
+            account['user'], account['password'],
+            lambda reader: reader.sync(self.store, mailbox=account['mailbox'], sinks=[submit]))
+        return {'stored': saved, 'sync_seconds': time.perf_counter() - start}
+
+    def run_once(self):
+        """
+        Process every account once and wait until all of their drafts are done.
+
+        Returns:
+            Dict[str, dict]: Per-account counters, timings and throughput.
+        """
+        start = time.perf_counter()
+        submitted = {account['user']: [] for account in self.accounts}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.imap_workers, thread_name_prefix="batch-imap") as executor:
+            futures = {
+                account['user']: executor.submit(self._sync_account, account, submitted[account['user']])
+                for account in self.accounts
+            }
+            for user, future in futures.items():
+                try:
+                    results[user] = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing account {user}: {e}")
+                    results[user] = {'stored': 0, 'sync_seconds': 0.0, 'error': str(e)}
+
+        self.drafts.join()
+        elapsed = time.perf_counter() - start
+        for user, stats in results.items():
+            statuses = [self.store.get_draft(message_id) for message_id in submitted[user]]
+            stats['drafted'] = sum(1 for draft in statuses if draft and draft['status'] == 'ready')
+            stats['failed'] = sum(1 for draft in statuses if draft and draft['status'] == 'failed')
+            stats['emails_per_minute'] = 60 * stats['stored'] / elapsed if elapsed > 0 else 0.0
+            logging.info(f"Account {user}: {stats['stored']} new emails synced in {stats['sync_seconds']:.1f}s, "
+                         f"{stats['drafted']} drafted, {stats['failed']} failed "
+                         f"({stats['emails_per_minute']:.1f} emails/min over the {elapsed:.1f}s round)")
+        return results
+
+    def send_approved(self):
+        """
+        Send the approved replies of every account, one pooled SMTP session per account.
+
+        Returns:
+            Dict[str, dict]: Per-account numbers of replies sent and failed.
+        """
+        results = {}
+        for account in self.accounts:
+            try:
+                sent, failed = send_approved_drafts(self.responder, self.store, self._pool(account['imap_url']),
+                                                    account['user'], account['password'])
+                results[account['user']] = {'sent': sent, 'failed': failed}
+            except Exception as e:
+                logging.error(f"Error sending approved replies of account {account['user']}: {e}")
+                results[account['user']] = {'sent': 0, 'failed': 0, 'error': str(e)}
+        return results
+
+    def start_push(self):
+        """
+        Keep an IMAP IDLE session open per account so that new mail is stored and drafted as it arrives.
+        """
+        for account in self.accounts:
+            watcher = IdleWatcher(account['user'], account['password'], self.store, sinks=[self.drafts.submit],
+                                  mailbox=account['mailbox'], imap_url=account['imap_url'])
+            watcher.start()
+            self.watchers.append(watcher)
+
+    def close(self):
+        """
+        Stop the push watchers and draft workers and close every pooled session and the store.
+        """
+        for watcher in self.watchers:
+            watcher.stop()
+        self.drafts.stop()
+        for pool in self.pools.values():
+            pool.close_all()
+        self.store.close()
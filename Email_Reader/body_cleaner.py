@@ -0,0 +1,164 @@
+import html
+import re
+from html.parser import HTMLParser
+
+# Lines introducing a quoted message; everything below them is history
+REPLY_HEADER_PATTERNS = [
+    re.compile(r'^\s*On .{1,200}wrote:\s*$', re.IGNORECASE),
+    re.compile(r'^\s*-{2,}\s*Original Message\s*-{2,}\s*$', re.IGNORECASE),
+    re.compile(r'^\s*-{2,}\s*Forwarded message\s*-{2,}\s*$', re.IGNORECASE),
+    re.compile(r'^\s*_{10,}\s*$'),
+    re.compile(r'^\s*From:\s.+$', re.IGNORECASE),
+]
+# Outlook reply headers start with From: and are followed by Sent:/Date: within a few lines
+OUTLOOK_FOLLOW_PATTERN = re.compile(r'^\s*(Sent|Date|To|Subject):\s', re.IGNORECASE)
+SIGNATURE_PATTERNS = [
+    re.compile(r'^-- ?$'),
+    re.compile(r'^\s*Sent from my \w+', re.IGNORECASE),
+    re.compile(r'^\s*Get Outlook for \w+', re.IGNORECASE),
+]
+# A trailing paragraph is a footer only if it opens like one; disclaimer words elsewhere
+# ("this is confidential and privileged...", "I want to unsubscribe") are customer text
+FOOTER_START_PATTERN = re.compile(
+    r'^\s*(please consider the environment|to unsubscribe\b|do not reply to this|disclaimer\b|confidentiality notice\b|'
+    r'(the information (contained )?in )?this (e-?mail|message)\b.{0,80}\b(confidential|privileged))',
+    re.IGNORECASE | re.DOTALL
+)
+# Footers are only looked for among the last paragraphs of a body
+MAX_FOOTER_PARAGRAPHS = 2
+BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'table', 'hr'}
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the visible text of an HTML document, one line per block element."""
+
+    def __init__(self):
+        """Initialize the extractor."""
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+        self.quote = 0
+
+    def handle_starttag(self, tag, attrs):
+        """Start a new line at block elements and skip non-visible ones."""
+        if tag == 'blockquote':
+            self.quote += 1
+        if tag in ('script', 'style', 'head'):
+            self.skip += 1
+        elif tag in BLOCK_TAGS:
+            self._new_line()
+
+    def handle_endtag(self, tag):
+        """End the line of a block element."""
+        if tag == 'blockquote':
+            self.quote = max(0, self.quote - 1)
+        if tag in ('script', 'style', 'head'):
+            self.skip = max(0, self.skip - 1)
+        elif tag in BLOCK_TAGS:
+            self._new_line()
+
+    def _new_line(self):
+        """Start a line, marked like a plain-text quote inside a blockquote."""
+        # Quoted replies in HTML mail live in blockquotes
+        self.parts.append('\n> ' if self.quote else '\n')
+
+    def handle_data(self, data):
+        """Keep visible text."""
+        if not self.skip:
+            self.parts.append(data)
+
+
+def html_to_text(markup):
+    """
+    Convert an HTML email body to plain text.
+
+    Args:
+        markup (str): HTML source.
+
+    Returns:
+        str: Visible text with one line per block element.
+    """
+    parser = _TextExtractor()
+    try:
+        parser.feed(markup)
+        parser.close()
+        text = ''.join(parser.parts)
+    except Exception:
+        # Badly broken markup: strip the tags and keep whatever text is left
+        text = html.unescape(re.sub(r'<[^>]+>', ' ', markup))
+    lines = [re.sub(r'[ \t\xa0]+', ' ', line).strip() for line in text.splitlines()]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def _is_reply_header(lines, index):
+    """
+    Check whether a line starts a quoted message.
+
+    Args:
+        lines (List[str]): Body lines.
+        index (int): Line to check.
+
+    Returns:
+        bool: True if the line introduces quoted history.
+    """
+    line = lines[index]
+    for pattern in REPLY_HEADER_PATTERNS[:-1]:
+        if pattern.match(line):
+            return True
+    if REPLY_HEADER_PATTERNS[-1].match(line):
+        return any(OUTLOOK_FOLLOW_PATTERN.match(following) for following in lines[index + 1:index + 4])
+    return False
+
+
+def _is_footer(paragraph):
+    """
+    Check whether a paragraph is a legal footer or mailing-list boilerplate.
+
+    Args:
+        paragraph (str): Paragraph text.
+
+    Returns:
+        bool: True if the paragraph opens like a footer.
+    """
+    return bool(FOOTER_START_PATTERN.match(paragraph))
+
+
+def clean_body(text, is_reply=False):
+    """
+    Strip quoted history, signatures and boilerplate footers from an email body.
+
+    Quote-marked ('>') lines are always removed. Quoted history introduced by a reply
+    header ("On ... wrote:", "-----Original Message-----", an Outlook From:/Sent: block)
+    is only cut for replies, as identified by In-Reply-To/References, so that fresh
+    emails which merely mention such text are kept intact.
+
+    Args:
+        text (str): Decoded plain-text body.
+        is_reply (bool): The email answers an earlier message.
+
+    Returns:
+        str: Cleaned body, or the stripped original if cleaning would leave nothing.
+    """
+    if not text:
+        return text
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    kept = []
+    for index, line in enumerate(lines):
+        if is_reply and _is_reply_header(lines, index):
+            break
+        if any(pattern.match(line) for pattern in SIGNATURE_PATTERNS):
+            break
+        if line.lstrip().startswith('>'):
+            continue
+        kept.append(line.rstrip())
+
+    # Drop trailing legal footers and disclaimers among the last paragraphs, but never the
+    # first substantive paragraph (the one after a short greeting such as "Hello,"); footers
+    # below a signature delimiter are already gone with the signature
+    paragraphs = re.split(r'\n\s*\n', '\n'.join(kept).strip())
+    first = next((i for i, paragraph in enumerate(paragraphs) if len(paragraph.split()) > 5), 0)
+    limit = max(first + 1, len(paragraphs) - MAX_FOOTER_PARAGRAPHS)
+    while len(paragraphs) > limit and _is_footer(paragraphs[-1]):
+        paragraphs.pop()
+    cleaned = re.sub(r'\n{3,}', '\n\n', '\n\n'.join(paragraphs)).strip()
+    return cleaned or text.strip()
@@ -0,0 +1,248 @@
+import base64
+import binascii
+import logging
+import quopri
+import re
+from dataclasses import dataclass
+
+
+@dataclass
+class BodyPart:
+    """A leaf MIME part described by an IMAP BODYSTRUCTURE response."""
+
+    section: str
+    content_type: str
+    charset: str
+    encoding: str
+    size: int
+    disposition: str = None
+    filename: str = None
+
+    @property
+    def is_attachment(self):
+        """bool: Whether the part is an attachment rather than inline text."""
+        return self.disposition == 'attachment' or (self.filename is not None and not self.content_type.startswith('text/'))
+
+
+def flatten_fetch_data(data):
+    """
+    Rebuild the raw wire form of an imaplib FETCH response.
+
+    imaplib splits literals out into (prefix, literal) tuples; re-joining them lets the
+    response be tokenized in a single pass.
+
+    Args:
+        data (list): Response data returned by imaplib.
+
+    Returns:
+        bytes: Raw response bytes.
+    """
+    out = bytearray()
+    for item in data:
+        if isinstance(item, tuple):
+            out += item[0] + b'\r\n' + item[1]
+        elif item:
+            out += b' ' + item
+    return bytes(out)
+
+
+def parse_imap_data(raw):
+    """
+    Tokenize an IMAP response into nested Python lists.
+
+    Atoms and quoted strings become str, literals become bytes and NIL becomes None.
+
+    Args:
+        raw (bytes): Raw response bytes.
+
+    Returns:
+        list: Top-level tokens.
+    """
+    pos = 0
+    length = len(raw)
+    stack = [[]]
+    while pos < length:
+        char = raw[pos:pos + 1]
+        if char in (b' ', b'\r', b'\n'):
+            pos += 1
+        elif char == b'(':
+            stack.append([])
+            pos += 1
+        elif char == b')':
+            if len(stack) > 1:
+                item = stack.pop()
+                stack[-1].append(item)
+            pos += 1
+        elif char == b'"':
+            pos += 1
+            value = bytearray()
+            while pos < length and raw[pos:pos + 1] != b'"':
+                if raw[pos:pos + 1] == b'\\':
+                    pos += 1
+                value += raw[pos:pos + 1]
+                pos += 1
+            pos += 1
+            stack[-1].append(value.decode('utf-8', errors='replace'))
+        elif char == b'{':
+            end = raw.index(b'}', pos)
+            size = int(raw[pos + 1:end])
+            pos = end + 1
+            # Exactly one CRLF ends the literal marker; any further CR/LF belongs to the literal itself
+            if raw[pos:pos + 2] == b'\r\n':
+                pos += 2
+            elif raw[pos:pos + 1] == b'\n':
+                pos += 1
+            stack[-1].append(raw[pos:pos + size])
+            pos += size
+        else:
+            start = pos
+            while pos < length and raw[pos:pos + 1] not in (b' ', b'(', b')', b'\r', b'\n'):
+                if raw[pos:pos + 1] == b'[':
+                    pos = raw.index(b']', pos)
+                pos += 1
+            atom = raw[start:pos].decode('ascii', errors='replace')
+            stack[-1].append(None if atom.upper() == 'NIL' else atom)
+    return stack[0]
+
+
+def parse_fetch_response(data):
+    """
+    Parse an imaplib FETCH response into one dictionary per message.
+
+    Args:
+        data (list): Response data returned by imaplib.
+
+    Returns:
+        List[dict]: Fetch items of each message keyed by upper-case item name.
+    """
+    tokens = parse_imap_data(flatten_fetch_data(data))
+    messages = []
+    for token in tokens:
+        if isinstance(token, list):
+            items = {}
+            for i in range(0, len(token) - 1, 2):
+                items[str(token[i]).upper()] = token[i + 1]
+            messages.append(items)
+    return messages
+
+
+def _as_str(value):
+    """Decode a BODYSTRUCTURE value to str."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+
+def _params(value):
+    """Convert a BODYSTRUCTURE parameter list into a lower-cased dictionary."""
+    if not isinstance(value, list):
+        return {}
+    return {str(_as_str(value[i])).lower(): _as_str(value[i + 1]) for i in range(0, len(value) - 1, 2)}
+
+
+def walk_bodystructure(structure, prefix=''):
+    """
+    Flatten a parsed BODYSTRUCTURE into its leaf parts with IMAP section numbers.
+
+    Args:
+        structure (list): Parsed BODYSTRUCTURE value.
+        prefix (str): Section number of the enclosing multipart.
+
+    Returns:
+        List[BodyPart]: Leaf parts in MIME order.
+    """
+    if structure and isinstance(structure[0], list):
+        parts = []
+        # Child parts come first, followed by the multipart subtype and extension data
+        for i, child in enumerate(structure):
+            if not isinstance(child, list):
+                break
+            parts.extend(walk_bodystructure(child, f"{prefix}{i + 1}."))
+        return parts
+
+    maintype = str(_as_str(structure[0])).lower()
+    subtype = str(_as_str(structure[1])).lower()
+    params = _params(structure[2])
+    encoding = str(_as_str(structure[5]) or '7bit').lower()
+    size = int(structure[6]) if structure[6] is not None else 0
+    if maintype == 'text':
+        extension_start = 8
+    elif maintype == 'message' and subtype == 'rfc822':
+        extension_start = 10
+    else:
+        extension_start = 7
+    disposition = None
+    filename = params.get('name')
+    if len(structure) > extension_start + 1 and isinstance(structure[extension_start + 1], list):
+        disposition_field = structure[extension_start + 1]
+        disposition = str(_as_str(disposition_field[0])).lower()
+        if len(disposition_field) > 1:
+            filename = _params(disposition_field[1]).get('filename', filename)
+    section = prefix.rstrip('.') or '1'
+    return [BodyPart(section, f"{maintype}/{subtype}", params.get('charset'), encoding, size, disposition, filename)]
+
+
+def select_text_part(parts):
+    """
+    Choose the part holding the readable email body.
+
+    Args:
+        parts (List[BodyPart]): Leaf parts of the message.
+
+    Returns:
+        BodyPart or None: The first inline text/plain part, else the first inline text/html part.
+    """
+    inline = [part for part in parts if not part.is_attachment]
+    for content_type in ('text/plain', 'text/html'):
+        for part in inline:
+            if part.content_type == content_type:
+                return part
+    return None
+
+
+def decode_part(payload, encoding):
+    """
+    Undo the Content-Transfer-Encoding of a downloaded body section.
+
+    Args:
+        payload (bytes): Raw section bytes.
+        encoding (str): Content-Transfer-Encoding of the part.
+
+    Returns:
+        bytes: Transfer-decoded payload.
+    """
+    if payload is None:
+        return b''
+    encoding = (encoding or '7bit').lower()
+    if encoding == 'base64':
+        try:
+            return base64.b64decode(payload)
+        except binascii.Error:
+            # Senders that break the padding or line layout must not abort the sync batch
+            data = re.sub(rb'[^A-Za-z0-9+/]', b'', payload)
+            data = data[:len(data) - 1] if len(data) % 4 == 1 else data
+            try:
+                return base64.b64decode(data + b'=' * (-len(data) % 4))
+            except binascii.Error:
+                logging.warning("Keeping an undecodable base64 part as raw bytes")
+                return payload
+    if encoding == 'quoted-printable':
+        return quopri.decodestring(payload)
+    return payload
+
+
+def decode_text(payload, charset):
+    """
+    Decode text bytes with the declared charset, falling back to UTF-8.
+
+    Args:
+        payload (bytes): Transfer-decoded text.
+        charset (str): Declared charset, if any.
+
+    Returns:
+        str: Decoded text.
+    """
+    try:
+        return payload.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return payload.decode('utf-8', errors='replace')
@@ -0,0 +1,266 @@
+import itertools
+import logging
+import queue
+import threading
+from config import DRAFT_WORKERS, DRAFT_PRIORITY, CLASSIFIER_BATCH_SIZE
+from utils import tracing
+from .email_store import REVIEWED_STATUSES
+
+SENTIMENT_RANK = {'Negative': 0, 'Neutral': 1, 'Positive': 2}
+
+
+class DraftQueue:
+    """
+    Background pipeline that pre-generates draft replies for newly fetched emails.
+
+    Classifier threads label emails in batches as they arrive and hands them to a
+    priority queue, from which a bounded pool of workers retrieves context and asks
+    the LLM for a draft. Results are persisted in the mailbox store so that opening
+    an email shows its draft straight away.
+    """
+
+    def __init__(self, responder, store, workers=DRAFT_WORKERS, priority=DRAFT_PRIORITY, classifier_workers=1):
+        """
+        Initialize the DraftQueue object.
+
+        Args:
+            responder (EmailResponder): Responder used for classification and generation.
+            store (EmailStore): Mailbox store the drafts are saved to.
+            workers (int): Maximum number of concurrent LLM generations.
+            priority (str): 'negative' to draft the most negative emails first, 'newest' for newest first.
+            classifier_workers (int): Maximum number of concurrent classification batches.
+        """
+        self.responder = responder
+        self.store = store
+        self.priority = priority
+        self.intake = queue.Queue()
+        self.generation = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.cancelled = set()
+        # Emails queued by this instance; 'queued'/'classified' drafts outside it are left over from a previous run
+        self.active = set()
+        self.lock = threading.Lock()
+        self.stats = {'classified': 0, 'drafted': 0, 'failed': 0, 'cancelled': 0, 'in_progress': 0}
+        self.stop_event = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._classify_loop, name=f"draft-classifier-{i}", daemon=True)
+            for i in range(classifier_workers)
+        ]
+        self.threads += [
+            threading.Thread(target=self._generate_loop, name=f"draft-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+        self.resume()
+
+    def submit(self, emails):
+        """
+        Queue emails for drafting, skipping those that are already drafted, approved, sent or queued by this instance.
+
+        Args:
+            emails (Iterable[dict or EmailRecord]): Emails to draft replies for.
+
+        Returns:
+            int: Number of emails queued.
+        """
+        queued = 0
+        for email in emails:
+            if hasattr(email, 'to_dict'):
+                email = email.to_dict()
+            message_id = email.get('Message ID')
+            if not message_id:
+                continue
+            draft = self.store.get_draft(message_id)
+            if draft is not None and (draft['status'] == 'ready' or draft['status'] in REVIEWED_STATUSES):
+                continue
+            with self.lock:
+                if message_id in self.active:
+                    continue
+                self.active.add(message_id)
+                self.cancelled.discard(message_id)
+            self.store.save_draft(message_id, 'queued')
+            self.intake.put(email)
+            queued += 1
+        return queued
+
+    def resume(self):
+        """
+        Re-queue the drafts a previous run left unfinished.
+
+        Returns:
+            int: Number of emails queued.
+        """
+        emails = [self.store.get_by_message_id(message_id) for message_id in self.store.unfinished_drafts()]
+        queued = self.submit(email for email in emails if email is not None)
+        if queued:
+            logging.info(f"Resumed {queued} unfinished drafts")
+        return queued
+
+    def _finish(self, message_id):
+        """
+        Mark an email as no longer queued by this instance, so that it can be submitted again.
+
+        Args:
+            message_id (str): Message-ID of the email.
+        """
+        with self.lock:
+            self.active.discard(message_id)
+
+    def _priority(self, email, sentiment_label, sentiment_score):
+        """
+        Compute the generation priority of an email; lower values are drafted first.
+        """
+        newest_first = -(email.get('UID') or 0)
+        if self.priority == 'negative':
+            return (SENTIMENT_RANK.get(sentiment_label, 1), -sentiment_score, newest_first)
+        return (newest_first,)
+
+    def _is_cancelled(self, message_id):
+        """
+        Check whether drafting was cancelled for an email.
+        """
+        with self.lock:
+            if message_id in self.cancelled:
+                self.cancelled.discard(message_id)
+                self.stats['cancelled'] += 1
+                return True
+            return False
+
+    def _classify_loop(self):
+        """
+        Classify queued emails in batches and pass them on to the generation queue.
+        """
+        while not self.stop_event.is_set():
+            try:
+                batch = [self.intake.get(timeout=1)]
+            except queue.Empty:
+                continue
+            while len(batch) < CLASSIFIER_BATCH_SIZE:
+                try:
+                    batch.append(self.intake.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                pending = []
+                for email in batch:
+                    if self._is_cancelled(email['Message ID']):
+                        self.store.save_draft(email['Message ID'], 'cancelled')
+                        self._finish(email['Message ID'])
+                    else:
+                        pending.append(email)
+                if pending:
+                    with tracing.request('draft_classify', emails=len(pending)):
+                        results = self.responder.classify_batch([email.get('Clean Body') or email['Body'] for email in pending])
+                    for email, (sentiment_label, sentiment_score) in zip(pending, results):
+                        self.store.save_draft(email['Message ID'], 'classified', sentiment_label, sentiment_score)
+                        priority = self._priority(email, sentiment_label, sentiment_score)
+                        self.generation.put((priority, next(self.counter), email, sentiment_label, sentiment_score))
+                    with self.lock:
+                        self.stats['classified'] += len(pending)
+            except Exception as e:
+                logging.error(f"Error classifying {len(batch)} emails: {e}")
+                for email in batch:
+                    self.store.save_draft(email['Message ID'], 'failed')
+                    self._finish(email['Message ID'])
+                with self.lock:
+                    self.stats['failed'] += len(batch)
+            finally:
+                for _ in batch:
+                    self.intake.task_done()
+
+    def _generate_loop(self):
+        """
+        Generate draft replies in priority order.
+        """
+        while not self.stop_event.is_set():
+            try:
+                _, _, email, sentiment_label, sentiment_score = self.generation.get(timeout=1)
+            except queue.Empty:
+                continue
+            message_id = email['Message ID']
+            try:
+                if self._is_cancelled(message_id):
+                    self.store.save_draft(message_id, 'cancelled', sentiment_label, sentiment_score)
+                    continue
+                with self.lock:
+                    self.stats['in_progress'] += 1
+                try:
+                    with tracing.request('draft', message_id=message_id):
+                        reply_body = self.responder.draft_reply(email.get('Clean Body') or email['Body'], email['Subject'], sentiment_label)
+                finally:
+                    with self.lock:
+                        self.stats['in_progress'] -= 1
+                self.store.save_draft(message_id, 'ready', sentiment_label, sentiment_score, reply_body)
+                with self.lock:
+                    self.stats['drafted'] += 1
+            except Exception as e:
+                logging.error(f"Error drafting reply for email {message_id}: {e}")
+                self.store.save_draft(message_id, 'failed', sentiment_label, sentiment_score)
+                with self.lock:
+                    self.stats['failed'] += 1
+            finally:
+                self._finish(message_id)
+                self.generation.task_done()
+
+    def cancel(self, message_id):
+        """
+        Cancel drafting of a queued email. A generation that already started is not interrupted.
+
+        Args:
+            message_id (str): Message-ID of the email.
+        """
+        with self.lock:
+            self.cancelled.add(message_id)
+
+    def cancel_all(self):
+        """
+        Drop every email that is still waiting to be classified or drafted.
+
+        Returns:
+            int: Number of emails removed from the queues.
+        """
+        dropped = 0
+        for pending in (self.intake, self.generation):
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                email = item if isinstance(item, dict) else item[2]
+                self.store.save_draft(email['Message ID'], 'cancelled')
+                self._finish(email['Message ID'])
+                pending.task_done()
+                dropped += 1
+        with self.lock:
+            self.stats['cancelled'] += dropped
+        return dropped
+
+    def progress(self):
+        """
+        Report queue depths and progress counters.
+
+        Returns:
+            dict: Emails waiting for classification and generation, plus the running counters.
+        """
+        with self.lock:
+            stats = dict(self.stats)
+        stats['waiting_classification'] = self.intake.qsize()
+        stats['waiting_generation'] = self.generation.qsize()
+        return stats
+
+    def join(self):
+        """
+        Block until every submitted email has been classified and drafted, failed or cancelled.
+        """
+        # Classified emails enter the generation queue before their intake item is done
+        self.intake.join()
+        self.generation.join()
+
+    def stop(self):
+        """
+        Stop the background threads once their current item is done.
+        """
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
@@ -1,9 +1,155 @@
 import imaplib
 import email
-import pandas as pd
-from email.header import decode_header
-import smtplib
+import email.message
+import email.policy
+from email.errors import HeaderParseError
+from email.header import decode_header, make_header
 import logging
+import re
+import select
+import ssl
+import time
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from config import FETCH_BATCH_SIZE, LAZY_BODY_FETCH
+from .bodystructure import parse_fetch_response, walk_bodystructure, select_text_part, decode_part, decode_text
+from .body_cleaner import clean_body, html_to_text
+from utils import tracing
+
+UID_PATTERN = re.compile(rb'UID (\d+)')
+FETCH_START_PATTERN = re.compile(rb'^\d+ \(')
+EXISTS_PATTERN = re.compile(rb'^\* \d+ EXISTS', re.IGNORECASE)
+HEADER_FIELDS = 'MESSAGE-ID FROM SUBJECT DATE REPLY-TO IN-REPLY-TO REFERENCES'
+
+
+def compress_uid_set(uids):
+    """
+    Build a compact IMAP UID set (e.g. "1:4,7,9:10") from a list of UIDs.
+
+    Args:
+        uids (Iterable[int]): UIDs to include.
+
+    Returns:
+        str: IMAP sequence-set string.
+    """
+    ranges = []
+    for uid in sorted(set(int(u) for u in uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(f"{start}:{end}" if start != end else str(start) for start, end in ranges)
+
+
+@dataclass(slots=True)
+class EmailRecord:
+    """A parsed email as produced by EmailReader."""
+
+    email_id: str
+    uid: int
+    message_id: str
+    sender: str
+    subject: str
+    body: str
+    attachments: str = '[]'
+    reply_to: str = None
+    in_reply_to: str = None
+    references: str = None
+    clean_body: str = None
+
+    COLUMNS = ['Email ID', 'UID', 'Message ID', 'From', 'Subject', 'Body', 'Attachments', 'Reply-To', 'In-Reply-To',
+               'References', 'Clean Body']
+
+    def to_dict(self):
+        """
+        Convert the record to a dictionary keyed by the mailbox column names.
+
+        Returns:
+            dict: Email record.
+        """
+        return {
+            'Email ID': self.email_id,
+            'UID': self.uid,
+            'Message ID': self.message_id,
+            'From': self.sender,
+            'Subject': self.subject,
+            'Body': self.body,
+            'Attachments': self.attachments,
+            'Reply-To': self.reply_to,
+            'In-Reply-To': self.in_reply_to,
+            'References': self.references,
+            'Clean Body': self.clean_body,
+        }
+
+
+def decode_subject(value):
+    """
+    Decode a Subject header, joining every RFC 2047 encoded word in its declared charset.
+
+    Args:
+        value (str): Raw header value, or None when the header is missing.
+
+    Returns:
+        str: Decoded subject, empty when the header is missing.
+    """
+    if value is None:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (UnicodeDecodeError, LookupError, HeaderParseError):
+        # A mislabelled or unknown charset must not drop the email
+        return ''.join(text.decode('utf-8', errors='replace') if isinstance(text, bytes) else text
+                       for text, _ in decode_header(str(value)))
+
+
+def decode_address(value):
+    """
+    Decode an address header such as From, keeping it usable as the To header of a reply.
+
+    Display names are decoded like the subject and re-quoted where needed, so a decoded
+    "Doe, John" stays one address instead of becoming two.
+
+    Args:
+        value (str): Raw header value, or None when the header is missing.
+
+    Returns:
+        str: Decoded addresses, empty when the header is missing.
+    """
+    if value is None:
+        return ""
+    try:
+        return str(email.policy.default.header_factory('From', str(value)))
+    except Exception as e:
+        logging.warning(f"Keeping undecodable address header {value!r}: {e}")
+        return str(value)
+
+
+def build_reply(original, reply_body, sender):
+    """
+    Build a reply message from the headers cached for an email at fetch time.
+
+    Args:
+        original (dict): Stored email record.
+        reply_body (str): Body of the reply.
+        sender (str): Address the reply is sent from.
+
+    Returns:
+        email.message.EmailMessage: The reply, threaded with In-Reply-To and References.
+    """
+    reply = email.message.EmailMessage()
+    subject = original.get('Subject') or ''
+    reply['Subject'] = subject if subject.lower().startswith('re:') else 'Re: ' + subject
+    reply['To'] = original.get('Reply-To') or original['From']
+    reply['From'] = sender
+    message_id = original.get('Message ID')
+    if message_id:
+        reply['In-Reply-To'] = message_id
+        reply['References'] = ' '.join(filter(None, [original.get('References'), message_id]))
+    reply.set_content(reply_body)
+    return reply
+
 
 class EmailReader:
     """
@@ -23,7 +169,17 @@ class EmailReader:
         self.email_user = email_user
         self.email_pass = email_pass
         self.mail = None
-        self.df = pd.DataFrame(columns=['Email ID', 'Message ID', 'From', 'Subject', 'Body'])
+        self.records = []
+        self.last_sync_stats = {}
+
+    @property
+    def df(self):
+        """
+        pd.DataFrame: The fetched emails, built from the collected records in a single pass.
+        """
+        import pandas as pd
+
+        return pd.DataFrame([record.to_dict() for record in self.records], columns=EmailRecord.COLUMNS)
 
     def connect(self):
         """
@@ -45,47 +201,470 @@ class EmailReader:
             logging.error(f"Login failed: {e}")
             raise ConnectionError(f"Login failed: {e}")
 
-    def fetch_unseen_emails(self):
+    def fetch_unseen_emails(self, batch_size=FETCH_BATCH_SIZE, lazy=LAZY_BODY_FETCH):
+        """
+        Fetch unseen emails in UID batches and collect them in self.records.
+
+        Args:
+            batch_size (int): Number of messages requested per UID FETCH.
+            lazy (bool): Fetch headers and the body text part only, leaving attachments on the server.
+        """
+        with tracing.request('fetch_unseen'):
+            self.records.extend(self.iter_unseen_emails(batch_size, lazy))
+
+    def iter_unseen_emails(self, batch_size=FETCH_BATCH_SIZE, lazy=LAZY_BODY_FETCH):
         """
-        Fetch unseen emails and process them.
+        Stream unseen emails as records while they are being fetched.
+
+        Args:
+            batch_size (int): Number of messages requested per UID FETCH.
+            lazy (bool): Fetch headers and the body text part only, leaving attachments on the server.
+
+        Yields:
+            EmailRecord: Parsed emails in UID order.
         """
         try:
             self.mail.select('inbox')
-            status, messages = self.mail.search(None, '(UNSEEN)')
+            status, messages = self.mail.uid('search', None, '(UNSEEN)')
             if status == 'OK':
-                for num in messages[0].split():
-                    status, data = self.mail.fetch(num, '(RFC822)')
-                    if status == 'OK':
-                        msg = email.message_from_bytes(data[0][1])
-                        self.process_email(msg, num)
+                yield from self.iter_uids(messages[0].split(), batch_size, lazy)
         except Exception as e:
             logging.error(f"Error fetching emails: {e}")
             raise Exception(f"Error fetching emails: {e}")
 
+    def _select_status(self, mailbox):
+        """
+        Select a mailbox and read the status values needed for incremental sync.
+
+        Args:
+            mailbox (str): Mailbox name.
+
+        Returns:
+            Tuple[int, int or None, int or None]: UIDVALIDITY, UIDNEXT and HIGHESTMODSEQ.
+        """
+        if 'CONDSTORE' in self.mail.capabilities and 'ENABLE' in self.mail.capabilities:
+            try:
+                self.mail.enable('CONDSTORE')
+            except imaplib.IMAP4.error as e:
+                logging.warning(f"Could not enable CONDSTORE: {e}")
+        self.mail.select(mailbox)
+
+        def status_value(name):
+            _, data = self.mail.response(name)
+            return int(data[0]) if data and data[0] is not None else None
+
+        return status_value('UIDVALIDITY'), status_value('UIDNEXT'), status_value('HIGHESTMODSEQ')
+
+    def sync(self, store, mailbox='inbox', batch_size=FETCH_BATCH_SIZE, lazy=LAZY_BODY_FETCH, sinks=()):
+        """
+        Fetch only the mail that arrived since the last sync and merge it into the store.
+
+        The first sync of a mailbox (or a sync after its UIDVALIDITY changed) fetches
+        the unseen emails; later syncs fetch UIDs above the saved checkpoint. Records are
+        written to the store and handed to the sinks one batch at a time, as they arrive.
+
+        Args:
+            store (EmailStore): Mailbox store holding the emails and sync checkpoints.
+            mailbox (str): Mailbox name.
+            batch_size (int): Number of messages requested per UID FETCH.
+            lazy (bool): Fetch headers and the body text part only, leaving attachments on the server.
+            sinks (Iterable[Callable[[List[EmailRecord]], None]]): Consumers called with each stored batch.
+
+        Returns:
+            int: Number of new emails stored.
+        """
+        try:
+            with tracing.request('sync', account=self.email_user, mailbox=mailbox) as fields:
+                uidvalidity, uidnext, modseq = self._select_status(mailbox)
+                checkpoint = store.get_checkpoint(self.email_user, mailbox)
+                if checkpoint and checkpoint['uidvalidity'] == uidvalidity:
+                    last_uid = checkpoint['last_uid']
+                    unchanged = uidnext is not None and uidnext <= last_uid + 1
+                    if modseq is not None and checkpoint['modseq'] == modseq:
+                        unchanged = True
+                    if unchanged:
+                        logging.info(f"Mailbox {mailbox} unchanged since UID {last_uid}")
+                        return 0
+                    status, messages = self.mail.uid('search', None, f'UID {last_uid + 1}:*')
+                else:
+                    last_uid = 0
+                    status, messages = self.mail.uid('search', None, '(UNSEEN)')
+                if status != 'OK':
+                    raise Exception(f"UID SEARCH failed: {status}")
+
+                # "n:*" always matches the highest UID, even when it is below n
+                uids = [uid for uid in messages[0].split() if int(uid) > last_uid]
+                saved = 0
+                batch = []
+                for record in self.iter_uids(uids, batch_size, lazy):
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        saved += self._flush_batch(store, batch, sinks)
+                        batch = []
+                if batch:
+                    saved += self._flush_batch(store, batch, sinks)
+
+                highest = max([last_uid] + [int(uid) for uid in uids])
+                if uidnext is not None:
+                    highest = max(highest, uidnext - 1)
+                store.save_checkpoint(self.email_user, mailbox, uidvalidity, highest, modseq)
+                fields['stored'] = saved
+                return saved
+        except Exception as e:
+            logging.error(f"Error syncing emails: {e}")
+            raise Exception(f"Error syncing emails: {e}")
+
+    def _flush_batch(self, store, batch, sinks):
+        """
+        Write a batch of records to the store and pass it on to the sinks.
+
+        Args:
+            store (EmailStore): Mailbox store.
+            batch (List[EmailRecord]): Records to write.
+            sinks (Iterable[Callable[[List[EmailRecord]], None]]): Downstream consumers.
+
+        Returns:
+            int: Number of new emails stored.
+        """
+        with tracing.span('store_write', emails=len(batch)):
+            saved = store.append((record.to_dict() for record in batch), account=self.email_user)
+        for sink in sinks:
+            sink(batch)
+        return saved
+
+    def fetch_uids(self, uids, batch_size=FETCH_BATCH_SIZE, lazy=LAZY_BODY_FETCH):
+        """
+        Fetch the given UIDs from the selected mailbox and collect them in self.records.
+
+        Args:
+            uids (List[bytes]): UIDs to fetch.
+            batch_size (int): Number of messages requested per UID FETCH.
+            lazy (bool): Fetch headers and the body text part only, leaving attachments on the server.
+
+        Returns:
+            int: Number of messages fetched.
+        """
+        before = len(self.records)
+        self.records.extend(self.iter_uids(uids, batch_size, lazy))
+        return len(self.records) - before
+
+    def iter_uids(self, uids, batch_size=FETCH_BATCH_SIZE, lazy=LAZY_BODY_FETCH):
+        """
+        Stream the given UIDs from the selected mailbox with chunked UID FETCHes.
+
+        Messages are fetched with BODY.PEEK so they stay unread on the server. Each
+        batch is parsed on a worker thread while the next batch is being downloaded.
+
+        Args:
+            uids (List[bytes]): UIDs to fetch.
+            batch_size (int): Number of messages requested per UID FETCH.
+            lazy (bool): Fetch headers and the body text part only, leaving attachments on the server.
+
+        Yields:
+            EmailRecord: Parsed emails in UID order.
+        """
+        start = time.perf_counter()
+        fetched = 0
+        body_chars = 0
+        clean_chars = 0
+        pending = None
+        with ThreadPoolExecutor(max_workers=1) as parser:
+            for i in range(0, len(uids), batch_size):
+                uid_set = compress_uid_set(uids[i:i + batch_size])
+                with tracing.span('imap_fetch', lazy=lazy, requested=len(uids[i:i + batch_size])):
+                    if lazy:
+                        data = self._fetch_lazy_batch(uid_set)
+                    else:
+                        status, data = self.mail.uid('fetch', uid_set, '(UID BODY.PEEK[])')
+                if lazy:
+                    job = self._process_lazy_batch
+                else:
+                    if status != 'OK':
+                        logging.error(f"Failed to fetch UID set {uid_set}: {status}")
+                        continue
+                    job = self._process_fetch_response
+                if pending is not None:
+                    records = pending.result()
+                    fetched += len(records)
+                    body_chars += sum(len(record.body or '') for record in records)
+                    clean_chars += sum(len(record.clean_body or '') for record in records)
+                    yield from records
+                # The parser thread logs its spans under the same request ID
+                pending = parser.submit(contextvars.copy_context().run, self._parse_batch, job, data)
+            if pending is not None:
+                records = pending.result()
+                fetched += len(records)
+                body_chars += sum(len(record.body or '') for record in records)
+                clean_chars += sum(len(record.clean_body or '') for record in records)
+                yield from records
+        elapsed = time.perf_counter() - start
+        tracing.increment('emails_fetched', fetched)
+        rate = fetched / elapsed if elapsed > 0 else 0.0
+        reduction = 1 - clean_chars / body_chars if body_chars else 0.0
+        self.last_sync_stats = {'messages': fetched, 'seconds': elapsed, 'messages_per_second': rate,
+                                'body_chars': body_chars, 'clean_body_chars': clean_chars, 'body_reduction': reduction}
+        logging.info(f"Fetched {fetched} emails in {elapsed:.2f}s ({rate:.1f} msg/s, batch size {batch_size}); "
+                     f"cleaned bodies are {reduction:.0%} smaller")
+
+    def _parse_batch(self, job, data):
+        """
+        Run a batch parser in a traced span.
+
+        Args:
+            job (Callable): _process_fetch_response or _process_lazy_batch.
+            data: The fetched batch.
+
+        Returns:
+            List[EmailRecord]: Parsed emails.
+        """
+        with tracing.span('parse') as fields:
+            records = job(data)
+            fields['messages'] = len(records)
+        return records
+
+    def _process_fetch_response(self, data):
+        """
+        Parse the messages contained in a UID FETCH response.
+
+        Args:
+            data (list): Response data returned by imaplib.
+
+        Returns:
+            List[EmailRecord]: Parsed emails.
+        """
+        records = []
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+            match = UID_PATTERN.search(item[0])
+            if match is None:
+                continue
+            msg = email.message_from_bytes(item[1])
+            records.append(self.build_record(msg, match.group(1), self.get_email_body(msg)))
+        return records
+
+    def idle(self, timeout, stop_event=None):
+        """
+        Wait in IMAP IDLE (RFC 2177) on the selected mailbox until new mail arrives.
+
+        imaplib has no IDLE support, so the command is written directly. Responses are
+        read with imaplib's own readline(), so untagged responses that arrived together
+        with the continuation are not lost in its buffer, and select() is only used to
+        wait while that buffer is empty, which keeps the wait interruptible by the stop event.
+
+        Args:
+            timeout (float): Seconds after which IDLE is ended so that it can be re-issued.
+            stop_event (threading.Event, optional): Ends the wait early when set.
+
+        Returns:
+            bool: True if the server announced new messages, False on timeout or stop.
+        """
+        tag = self.mail._new_tag()
+        self.mail.send(tag + b' IDLE\r\n')
+        response = self.mail.readline()
+        if not response.startswith(b'+'):
+            raise Exception(f"IDLE rejected: {response.strip().decode(errors='replace')}")
+
+        deadline = time.monotonic() + timeout
+        new_mail = False
+        while not new_mail and time.monotonic() < deadline:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if not self._response_ready() and not select.select([self.mail.sock], [], [], min(1.0, max(0.0, deadline - time.monotonic())))[0]:
+                continue
+            line = self.mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            if line.startswith(b'* BYE'):
+                raise imaplib.IMAP4.abort(f"Server closed IDLE: {line.strip().decode(errors='replace')}")
+            if EXISTS_PATTERN.match(line):
+                new_mail = True
+
+        # A failure above leaves the session mid-command; callers reconnect instead of ending IDLE
+        self.mail.send(b'DONE\r\n')
+        while True:
+            line = self.mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed while ending IDLE")
+            if EXISTS_PATTERN.match(line):
+                new_mail = True
+            if line.startswith(tag + b' '):
+                break
+        self.mail.tagged_commands.pop(tag, None)
+        status = line[len(tag) + 1:].split(b' ', 1)[0].upper()
+        if status != b'OK':
+            raise Exception(f"IDLE failed: {line.strip().decode(errors='replace')}")
+        return new_mail
+
+    def _response_ready(self):
+        """
+        Check without blocking whether a response is buffered by imaplib, the TLS layer or the socket.
+
+        Returns:
+            bool: True if readline() has data to return.
+        """
+        sock = self.mail.sock
+        previous = sock.gettimeout()
+        sock.settimeout(0)
+        try:
+            return bool(self.mail.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(previous)
+
+    def _fetch_lazy_batch(self, uid_set):
+        """
+        Fetch a batch header-first: headers and BODYSTRUCTURE, then only the body text sections.
+
+        Args:
+            uid_set (str): IMAP UID set to fetch.
+
+        Returns:
+            List[dict]: Per-message 'uid', 'headers', 'part', 'payload' and 'attachments'.
+        """
+        status, data = self.mail.uid('fetch', uid_set, f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])')
+        if status != 'OK':
+            logging.error(f"Failed to fetch headers for UID set {uid_set}: {status}")
+            return []
+
+        messages = {}
+        responses = parse_fetch_response(data)
+        expected = sum(1 for item in data if FETCH_START_PATTERN.match(item[0] if isinstance(item, tuple) else item or b''))
+        if len(responses) != expected:
+            logging.error(f"Parsed {len(responses)} of {expected} FETCH responses for UID set {uid_set}")
+            raise Exception(f"Malformed FETCH response for UID set {uid_set}")
+        for items in responses:
+            if 'UID' not in items or 'BODYSTRUCTURE' not in items:
+                continue
+            parts = walk_bodystructure(items['BODYSTRUCTURE'])
+            headers = next((value for key, value in items.items() if key.startswith('BODY[HEADER')), b'')
+            messages[items['UID']] = {
+                'uid': items['UID'],
+                'headers': headers if isinstance(headers, bytes) else b'',
+                'part': select_text_part(parts),
+                'payload': None,
+                'attachments': [part for part in parts if part.is_attachment],
+            }
+
+        # Most messages share the same text section ("1" or "1.1"), so group them per section
+        sections = {}
+        for message in messages.values():
+            if message['part'] is not None:
+                sections.setdefault(message['part'].section, []).append(message['uid'])
+        for section, section_uids in sections.items():
+            status, data = self.mail.uid('fetch', compress_uid_set(section_uids), f'(UID BODY.PEEK[{section}])')
+            if status != 'OK':
+                logging.error(f"Failed to fetch section {section}: {status}")
+                continue
+            received = set()
+            for items in parse_fetch_response(data):
+                message = messages.get(items.get('UID'))
+                if message is not None and f'BODY[{section}]' in items:
+                    message['payload'] = items[f'BODY[{section}]']
+                    received.add(message['uid'])
+            if received != set(section_uids):
+                logging.error(f"Received section {section} of {len(received)} of {len(section_uids)} messages")
+                raise Exception(f"Malformed FETCH response for section {section}")
+        return list(messages.values())
+
+    def _process_lazy_batch(self, messages):
+        """
+        Build email records from a header-first batch.
+
+        Args:
+            messages (List[dict]): Messages returned by _fetch_lazy_batch.
+
+        Returns:
+            List[EmailRecord]: Parsed emails.
+        """
+        records = []
+        for message in messages:
+            msg = email.message_from_bytes(message['headers'])
+            part = message['part']
+            body = ""
+            if part is not None:
+                body = decode_text(decode_part(message['payload'], part.encoding), part.charset)
+                if part.content_type == 'text/html':
+                    body = html_to_text(body)
+            records.append(self.build_record(msg, message['uid'].encode(), body, message['attachments']))
+        return records
+
+    def fetch_attachment(self, uid, section, encoding, mailbox='inbox'):
+        """
+        Download a single attachment on demand.
+
+        Args:
+            uid (int): IMAP UID of the email.
+            section (str): IMAP body section of the attachment.
+            encoding (str): Content-Transfer-Encoding of the attachment.
+            mailbox (str): Mailbox name.
+
+        Returns:
+            bytes: Decoded attachment content.
+        """
+        try:
+            self.mail.select(mailbox)
+            status, data = self.mail.uid('fetch', str(uid), f'(UID BODY.PEEK[{section}])')
+            if status != 'OK':
+                raise Exception(f"UID FETCH failed: {status}")
+            for items in parse_fetch_response(data):
+                payload = items.get(f'BODY[{section}]')
+                if payload is not None:
+                    return decode_part(payload, encoding)
+            raise Exception(f"Section {section} not found for UID {uid}")
+        except Exception as e:
+            logging.error(f"Error fetching attachment: {e}")
+            raise Exception(f"Error fetching attachment: {e}")
+
     def process_email(self, msg, email_id):
         """
-        Process the email and add it to the DataFrame.
+        Process the email and add it to the fetched records.
 
         Args:
             msg (email.message.Message): Email message.
-            email_id (bytes): Email ID.
+            email_id (bytes): IMAP UID of the email.
         """
         try:
-            message_id = msg.get('Message-ID')
-            subject = decode_header(msg['subject'])[0][0]
-            if isinstance(subject, bytes):
-                subject = subject.decode()
-            from_ = msg.get('from')
-            body = self.get_email_body(msg)
-            self.df = self.df._append({'Email ID': email_id.decode(), 'Message ID': message_id, 'From': from_, 'Subject': subject, 'Body': body}, ignore_index=True)
+            self.records.append(self.build_record(msg, email_id, self.get_email_body(msg)))
         except Exception as e:
             logging.error(f"Error processing email: {e}")
             raise Exception(f"Error processing email: {e}")
 
+    def build_record(self, msg, email_id, body, attachments=()):
+        """
+        Build an email record from a message and its decoded body.
+
+        Args:
+            msg (email.message.Message): Email message or its headers.
+            email_id (bytes): IMAP UID of the email.
+            body (str): Email body.
+            attachments (Iterable[BodyPart]): Attachments left on the server.
+
+        Returns:
+            EmailRecord: The parsed email.
+        """
+        message_id = msg.get('Message-ID')
+        subject = decode_subject(msg.get('Subject'))
+        from_ = decode_address(msg.get('From'))
+        attachment_info = json.dumps([
+            {'section': part.section, 'filename': part.filename, 'content_type': part.content_type,
+             'encoding': part.encoding, 'size': part.size}
+            for part in attachments
+        ])
+        # Replies are recognised by their threading headers so that quoted history can be cut safely
+        is_reply = bool(msg.get('In-Reply-To') or msg.get('References'))
+        return EmailRecord(email_id.decode(), int(email_id), message_id, from_, subject, body, attachment_info,
+                           msg.get('Reply-To'), msg.get('In-Reply-To'), msg.get('References'),
+                           clean_body(body, is_reply))
+
     def get_email_body(self, msg):
         """
         Get the body of the email.
 
+        The first inline text/plain part is preferred; HTML-only emails are converted to
+        text. Each part is decoded with its declared charset.
+
         Args:
             msg (email.message.Message): Email message.
 
@@ -94,17 +673,19 @@ class EmailReader:
         """
         body = ""
         try:
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_maintype() == 'text':
-                        body = part.get_payload(decode=True)
-                        if body is not None:
-                            body = body.decode()
-                        break
-            else:
-                body = msg.get_payload(decode=True)
-                if body is not None:
-                    body = body.decode()
+            parts = [part for part in msg.walk() if part.get_content_maintype() == 'text'
+                     and part.get_content_disposition() != 'attachment']
+            for content_type in ('text/plain', 'text/html'):
+                part = next((part for part in parts if part.get_content_type() == content_type), None)
+                if part is None:
+                    continue
+                payload = part.get_payload(decode=True)
+                if payload is None:
+                    continue
+                body = decode_text(payload, part.get_content_charset())
+                if content_type == 'text/html':
+                    body = html_to_text(body)
+                break
         except Exception as e:
             logging.error(f"Error getting email body: {e}")
         return body
@@ -122,6 +703,22 @@ class EmailReader:
             logging.error(f"Error saving emails to Excel: {e}")
             raise Exception(f"Error saving emails to Excel: {e}")
 
+    def save_emails_to_store(self, store):
+        """
+        Append the fetched emails to the mailbox store.
+
+        Args:
+            store (EmailStore): Mailbox store to append to.
+
+        Returns:
+            int: Number of new emails stored.
+        """
+        try:
+            return store.append((record.to_dict() for record in self.records), account=self.email_user)
+        except Exception as e:
+            logging.error(f"Error saving emails to store: {e}")
+            raise Exception(f"Error saving emails to store: {e}")
+
     def close_connection(self):
         """
         Close the IMAP connection.
@@ -132,47 +729,3 @@ class EmailReader:
         except Exception as e:
             logging.error(f"Error closing connection: {e}")
             print(f"Error closing connection: {e}")
-
-    def reply_to_email(self, msg_id, reply_body):
-        """
-        Reply to an email.
-
-        Args:
-            msg_id (str): Message ID of the email to reply to.
-            reply_body (str): Body of the reply.
-
-        Returns:
-            str: Status message.
-        """
-        try:
-            self.mail.select('inbox')
-            result, data = self.mail.search(None, f'(HEADER Message-ID "{msg_id}")')
-            if result == 'OK':
-                email_ids = data[0].split()
-                latest_email_id = email_ids[-1]
-                result, data = self.mail.fetch(latest_email_id, '(RFC822)')
-
-                if result == 'OK':
-                    raw_email = data[0][1]
-                    email_message = email.message_from_bytes(raw_email)
-
-                    reply = email.message.EmailMessage()
-                    reply['Subject'] = 'Re: ' + email_message['Subject']
-                    reply['To'] = email_message['Reply-To'] or email_message['From']
-                    reply['From'] = self.email_user
-                    reply.set_content(reply_body)
-
-                    with smtplib.SMTP('smtp-mail.outlook.com', 587) as smtp:
-                        smtp.ehlo()
-                        smtp.starttls()
-                        smtp.ehlo()
-                        smtp.login(self.email_user, self.email_pass)
-                        smtp.send_message(reply)
-                    return "Reply sent successfully."
-                else:
-                    return "Failed to fetch the email."
-            else:
-                return "Email not found."
-        except Exception as e:
-            logging.error(f"Error in sending email: {e}")
-            raise Exception(f"Error in sending email: {e}")
@@ -1,18 +1,17 @@
-import gradio as gr
-import pandas as pd
-from .email_reader import EmailReader
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import  RunnablePassthrough
+from .email_reader import build_reply
+from .body_cleaner import clean_body
+from .email_store import EmailStore
+from .session_pool import SessionPool
+from .draft_queue import DraftQueue
+from .idle_watcher import IdleWatcher
 import datetime
+import hashlib
 import os
-from langchain_community.chat_models import ChatOllama
+import time
+import tempfile
 from config import *
-from transformers import pipeline
+from utils.lazy import LazyComponent, warm_up
+from utils import tracing
 import logging
 
 
@@ -21,63 +20,452 @@ import logging
 Data_path = os.path.join('Email_Data', 'emails.xlsx')
 
 class EmailResponder:
-    """Class to handle email responses and sentiment analysis."""
+    """Class to handle email responses and sentiment analysis.
+
+    The models, vector store and LLM client are loaded lazily: they warm up in parallel on
+    background threads, and the first call that needs one waits only for that component.
+    """
 
     def __init__(self):
-        """Initialize the EmailResponder object."""
+        """Initialize the EmailResponder object and start warming up its components."""
         try:
-            self.classifier = pipeline("zero-shot-classification", model=ZERO_SHOT_MODEL)
-            self.text_labels = ['Positive', 'Negative', 'Neutral']
+            self.text_labels = TEXT_LABELS
             self.template = template
-            self.embed_model = HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
             self.DB_PATH = DB_PATH
-            self.vectorstore = Chroma(persist_directory=self.DB_PATH, embedding_function=self.embed_model)
-            self.retriever = self.vectorstore.as_retriever()
-            self.prompt = ChatPromptTemplate.from_template(self.template)
             self.ollama_llm = OLLAMA_MODEL
-            self.model_local = ChatOllama(model=self.ollama_llm)
-            self.chain = (
-                {"context": self.retriever, "question": RunnablePassthrough()}
-                | self.prompt
-                | self.model_local
-                | StrOutputParser()
-            )
+            self.classify_batcher = None
+            self.model_client = None
+            if MODEL_SERVER_MODE == 'remote':
+                from utils.model_server import ModelClient
+
+                self.model_client = ModelClient(MODEL_SERVER_SOCKET)
+            elif MICRO_BATCH_ENABLED:
+                from utils.micro_batcher import MicroBatcher
+
+                # Concurrent sessions share classifier forward passes instead of queueing one by one
+                self.classify_batcher = MicroBatcher("classifier", lambda bodies: self.classifier.classify_batch(bodies))
+            self.components = {
+                'embed_model': LazyComponent("embedding model", self._load_embed_model),
+                'classifier': LazyComponent("classifier", self._load_classifier),
+                'vectorstore': LazyComponent("vector store", self._load_vectorstore),
+                'context_assembler': LazyComponent("context assembler", self._load_context_assembler),
+                'model_local': LazyComponent("LLM client", self._load_llm),
+                'chain': LazyComponent("RAG chain", self._build_chain),
+                'response_cache': LazyComponent("response cache", self._load_response_cache),
+            }
+            warm_up(list(self.components.values()), max_workers=len(self.components))
         except Exception as e:
             logging.error(f"Error initializing EmailResponder: {e}")
             raise
 
-    def generate_response(self, body, subject):
+    def _load_embed_model(self):
+        """Load the embedding model, behind the shared on-disk embedding cache and the micro-batcher."""
+        from utils.embedding_cache import load_embed_model
+
+        if self.model_client is not None:
+            from utils.model_server import RemoteEmbeddings
+
+            return RemoteEmbeddings(self.model_client)
+        embed_model = load_embed_model(EMBED_MODEL_NAME)
+        if MICRO_BATCH_ENABLED:
+            from utils.micro_batcher import BatchedEmbeddings
+
+            return BatchedEmbeddings(embed_model)
+        return embed_model
+
+    def _load_classifier(self):
+        """Load the sentiment classifier, with the embedding fast path when it is enabled."""
+        from utils.sentiment_classifier import SentimentClassifier, PrototypeClassifier
+
+        if self.model_client is not None:
+            # The model server runs the fast path and batching itself
+            return self.model_client
+        fast_classifier = None
+        if FAST_SENTIMENT_ENABLED:
+            fast_classifier = PrototypeClassifier(self.embed_model, self.text_labels, SENTIMENT_SEED_PATH)
+        return SentimentClassifier(ZERO_SHOT_MODEL, self.text_labels, fast_classifier=fast_classifier)
+
+    def _load_vectorstore(self):
+        """Open the vector store of the configured backend (Chroma or the memmap index)."""
+        from utils.vector_db import VectorDatabase
+
+        return VectorDatabase(self.DB_PATH, self.embed_model).open_vector_db()
+
+    def _load_context_assembler(self):
+        """Create the token-budgeted context assembler and load its tokenizer."""
+        from utils.context_assembly import ContextAssembler
+
+        return ContextAssembler(self.vectorstore)
+
+    def _load_llm(self):
+        """Create the Ollama chat client, logging prompt tokens and prefill time per request."""
+        from langchain_community.chat_models import ChatOllama
+        from utils.context_assembly import PromptMetricsHandler
+
+        return ChatOllama(model=self.ollama_llm, base_url=OLLAMA_BASE_URL, callbacks=[PromptMetricsHandler()])
+
+    def _load_response_cache(self):
+        """Open the semantic cache of sent replies, or return None when it is disabled."""
+        if not RESPONSE_CACHE_ENABLED:
+            return None
+        from utils.response_cache import ResponseCache
+
+        return ResponseCache(self.embed_model)
+
+    def _build_chain(self):
+        """Build the generation chain; retrieval and prompt building run before it as separately traced stages."""
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+
+        self.prompt = ChatPromptTemplate.from_template(self.template)
+        return self.model_local | StrOutputParser()
+
+    @property
+    def embed_model(self):
+        """HuggingFaceEmbeddings: The embedding model."""
+        return self.components['embed_model'].get()
+
+    @property
+    def classifier(self):
+        """SentimentClassifier: The sentiment classifier."""
+        return self.components['classifier'].get()
+
+    @property
+    def vectorstore(self):
+        """VectorStore: The guideline vector store."""
+        return self.components['vectorstore'].get()
+
+    @property
+    def retriever(self):
+        """VectorStoreRetriever: Retriever over the vector store."""
+        return self.vectorstore.as_retriever()
+
+    @property
+    def context_assembler(self):
+        """ContextAssembler: Deduplicates and trims retrieved chunks to the prompt token budget."""
+        return self.components['context_assembler'].get()
+
+    @property
+    def model_local(self):
+        """ChatOllama: The Ollama chat client."""
+        return self.components['model_local'].get()
+
+    @property
+    def chain(self):
+        """Runnable: The generation chain, from prompt messages to the reply text."""
+        return self.components['chain'].get()
+
+    @property
+    def response_cache(self):
+        """ResponseCache: The semantic cache of sent replies, None when disabled."""
+        return self.components['response_cache'].get()
+
+    def component_status(self):
+        """Describe the loading state of each component.
+
+        Returns:
+            str: One status entry per component.
+        """
+        status = [component.describe() for component in self.components.values()]
+        if self.classify_batcher is not None:
+            status.append(self.classify_batcher.describe())
+        if self.model_client is None and MICRO_BATCH_ENABLED and self.components['embed_model'].status == 'ready':
+            status.append(self.embed_model.batcher.describe())
+        return " | ".join(status)
+
+    def response_cache_status(self, cache_hit=None):
+        """Describe a session's last cache lookup and the overall cache effectiveness.
+
+        Args:
+            cache_hit (dict, optional): Cache hit returned with the session's last generated response.
+
+        Returns:
+            str: Status message.
+        """
+        cache = self.response_cache if RESPONSE_CACHE_ENABLED else None
+        if cache is None:
+            return "Response cache disabled"
+        stats = cache.stats()
+        summary = (f"{stats['entries']} cached replies | hit rate {stats['hit_rate']:.0%} "
+                   f"({stats['hits']} of {stats['hits'] + stats['misses']}) | {stats['seconds_saved']:.0f}s saved")
+        if cache_hit:
+            return (f"Offered the cached reply of a similar email (similarity {cache_hit['similarity']:.2f}); "
+                    f"click Regenerate Response for a fresh draft | {summary}")
+        return summary
+
+    def cached_reply(self, body, sentiment_label):
+        """Look up the sent reply of a near-duplicate email with the same sentiment.
+
+        Args:
+            body (str): The body of the email.
+            sentiment_label (str): Sentiment label of the email.
+
+        Returns:
+            dict: Cached message ID, reply and similarity, or None on a miss or when the cache is disabled.
+        """
+        if not RESPONSE_CACHE_ENABLED:
+            return None
+        try:
+            with tracing.span('cache_lookup') as fields:
+                hit = self.response_cache.lookup(body, sentiment_label)
+                fields['hit'] = hit is not None
+            return hit
+        except Exception as e:
+            # The cache is an optimization; a failing lookup falls back to generation
+            logging.error(f"Error looking up response cache: {e}")
+            return None
+
+    def record_generation(self, seconds):
+        """Record the duration of a generated reply, used to estimate the time saved by cache hits.
+
+        Args:
+            seconds (float): Generation time in seconds.
+        """
+        if RESPONSE_CACHE_ENABLED:
+            try:
+                self.response_cache.record_generation(seconds)
+            except Exception as e:
+                logging.error(f"Error recording generation time: {e}")
+
+    def remember_reply(self, email, reply_body):
+        """Add a sent reply to the semantic response cache.
+
+        Args:
+            email (dict): The email that was answered.
+            reply_body (str): The reply that was sent.
+        """
+        body = email['Clean Body'] or email['Body']
+        if not RESPONSE_CACHE_ENABLED or not reply_body.strip() or not body:
+            return
+        try:
+            message_id = email['Message ID'] or hashlib.sha256(body.encode('utf-8')).hexdigest()
+            sentiment_label, sentiment_score = self.classify(body)
+            self.response_cache.add(message_id, body, sentiment_label, sentiment_score, reply_body)
+        except Exception as e:
+            # The reply is already sent; failing to cache it must not report a failure
+            logging.error(f"Error caching sent reply: {e}")
+
+    def generate_response(self, body, subject, use_cache=True):
         """Generate a response based on sentiment analysis and a pre-defined model chain.
 
         Args:
             body (str): The body of the email.
             subject (str): The subject of the email.
+            use_cache (bool): Offer the cached reply of a near-duplicate email instead of generating one.
+
+        Returns:
+            Tuple[str, float, str, dict]: A tuple containing sentiment label, sentiment score, the generated reply,
+            and the response cache hit the reply came from, or None. The hit is returned rather than kept on
+            the instance, which every UI session shares.
+        """
+        try:
+            with tracing.request('generate_response'):
+                with tracing.span('clean'):
+                    # Quoted history and signatures only slow the models down
+                    body = clean_body(body)
+                sentiment_label, sentiment_score = self.classify(body)
+                cache_hit = self.cached_reply(body, sentiment_label) if use_cache else None
+                if cache_hit:
+                    return sentiment_label, sentiment_score, cache_hit['reply'], cache_hit
+                reply_body = self.draft_reply(body, subject, sentiment_label, use_cache=False)
+                return sentiment_label, sentiment_score, reply_body, None
+        except Exception as e:
+            logging.error(f"Error generating response: {e}")
+            raise
+
+    def classify(self, body):
+        """Classify the sentiment of an email body.
+
+        Args:
+            body (str): The body of the email.
+
+        Returns:
+            Tuple[str, float]: Sentiment label and sentiment score.
+        """
+        with tracing.span('classify'):
+            if self.classify_batcher is not None:
+                return self.classify_batcher.submit(body).result()
+            return self.classifier.classify(body)
+
+    def classify_batch(self, bodies):
+        """Classify the sentiment of many email bodies in batched forward passes.
+
+        Args:
+            bodies (List[str]): Email bodies.
+
+        Returns:
+            List[Tuple[str, float]]: Sentiment label and score of each body.
+        """
+        with tracing.span('classify_batch', emails=len(bodies)):
+            if self.classify_batcher is not None:
+                return self.classify_batcher.map(bodies)
+            return self.classifier.classify_batch(bodies)
+
+    def build_query(self, body, subject, sentiment_label):
+        """Build the question passed to the retrieval chain.
+
+        Args:
+            body (str): The body of the email.
+            subject (str): The subject of the email.
+            sentiment_label (str): Sentiment label of the email.
+
+        Returns:
+            str: The query.
+        """
+        today = datetime.date.today()
+        return f"Todays date -{today}\n  sentiment - {sentiment_label}\n Subject -{subject}\n Body-{body} "
+
+    def build_prompt(self, query):
+        """Retrieve the context of a query and fill in the prompt template.
+
+        Args:
+            query (str): The question built by build_query.
+
+        Returns:
+            List[BaseMessage]: Prompt messages for the generation chain.
+        """
+        context = self.context_assembler.assemble(query)
+        # The prompt template is created together with the chain
+        self.components['chain'].get()
+        with tracing.span('prompt') as fields:
+            messages = self.prompt.format_messages(context=context, question=query)
+            fields['prompt_chars'] = sum(len(message.content) for message in messages)
+        return messages
+
+    def draft_reply(self, body, subject, sentiment_label, use_cache=True):
+        """Retrieve context and generate a reply for an already classified email.
+
+        Args:
+            body (str): The body of the email.
+            subject (str): The subject of the email.
+            sentiment_label (str): Sentiment label of the email.
+            use_cache (bool): Reuse the cached reply of a near-duplicate email when there is one.
 
         Returns:
-            Tuple[str, float, str]: A tuple containing sentiment label, sentiment score, and the generated reply.
+            str: The generated reply.
         """
+        hit = self.cached_reply(body, sentiment_label) if use_cache else None
+        if hit:
+            return hit['reply']
+        start = time.perf_counter()
+        messages = self.build_prompt(self.build_query(body, subject, sentiment_label))
+        with tracing.span('llm'):
+            reply_body = self.chain.invoke(messages)
+        self.record_generation(time.perf_counter() - start)
+        return reply_body
+
+    def stream_reply(self, body, subject, sentiment_label):
+        """Retrieve context and stream the reply token by token from ChatOllama.
+
+        Args:
+            body (str): The body of the email.
+            subject (str): The subject of the email.
+            sentiment_label (str): Sentiment label of the email.
+
+        Yields:
+            str: Reply chunks as they are generated.
+        """
+        start = time.perf_counter()
+        messages = self.build_prompt(self.build_query(body, subject, sentiment_label))
+        first_token = True
+        with tracing.span('llm', stream=True) as fields:
+            llm_start = time.perf_counter()
+            for chunk in self.chain.stream(messages):
+                if first_token:
+                    logging.info(f"Time to first token: {time.perf_counter() - start:.2f}s")
+                    fields['first_token_ms'] = round(1000 * (time.perf_counter() - llm_start), 3)
+                    first_token = False
+                yield chunk
+        elapsed = time.perf_counter() - start
+        logging.info(f"Streamed reply generated in {elapsed:.2f}s")
+        self.record_generation(elapsed)
+
+    def generate_response_stream(self, body, subject, use_cache=True):
+        """Generate a response, yielding the sentiment first and then the reply as it streams in.
+
+        Args:
+            body (str): The body of the email.
+            subject (str): The subject of the email.
+            use_cache (bool): Offer the cached reply of a near-duplicate email instead of generating one.
+
+        Yields:
+            Tuple[str, float, str, dict]: Sentiment label, sentiment score, the reply generated so far,
+            and the response cache hit the reply came from, or None.
+        """
+        # The UI resumes the stream on pool threads, so the request ID is re-bound around every step
+        yield from tracing.bind_generator(self._generate_response_stream(body, subject, use_cache), tracing.new_request_id())
+
+    def _generate_response_stream(self, body, subject, use_cache):
+        """Generator behind generate_response_stream."""
         try:
-            # Assuming you want to analyze the body for sentiment
-            result = self.classifier(body, self.text_labels, multi_label=False)
-            sentiment_label = result['labels'][0]
-            sentiment_score = result['scores'][0]
-            today = datetime.date.today()
-            query = f"Todays date -{today}\n  sentiment - {sentiment_label}\n Subject -{subject}\n Body-{body} "
-            reply_body = self.chain.invoke(query)
-            return sentiment_label, sentiment_score, reply_body
+            tracing.increment('requests', type='generate_response_stream')
+            with tracing.span('generate_response_stream'):
+                with tracing.span('clean'):
+                    body = clean_body(body)
+                sentiment_label, sentiment_score = self.classify(body)
+                cache_hit = self.cached_reply(body, sentiment_label) if use_cache else None
+                if cache_hit:
+                    yield sentiment_label, sentiment_score, cache_hit['reply'], cache_hit
+                    return
+                yield sentiment_label, sentiment_score, "", None
+                reply_body = ""
+                for chunk in self.stream_reply(body, subject, sentiment_label):
+                    reply_body += chunk
+                    yield sentiment_label, sentiment_score, reply_body, None
         except Exception as e:
             logging.error(f"Error generating response: {e}")
             raise
 
+def send_approved_drafts(responder, store, sessions, email_user, email_pass):
+    """Send the approved replies of an account, reusing its pooled SMTP session.
+
+    Each reply is its own call_smtp call, so a dropped session is retried for that reply
+    only. Sending stops at the first failure, and the failed reply is marked 'send_failed'
+    instead of staying approved, because the server may have accepted it before the error;
+    approving it again sends it again.
+
+    Args:
+        responder (EmailResponder): Responder whose response cache learns the sent replies.
+        store (EmailStore): Mailbox store holding the drafts.
+        sessions (SessionPool): Session pool of the account's servers.
+        email_user (str): Email username.
+        email_pass (str): Email password.
+
+    Returns:
+        Tuple[int, int]: Number of replies sent and number of failed replies (0 or 1).
+    """
+    sent = 0
+    for message_id, reply_body in store.approved_drafts(email_user):
+        current = store.get_by_message_id(message_id)
+        try:
+            message = build_reply(current, reply_body, email_user)
+            sessions.call_smtp(email_user, email_pass, lambda smtp: smtp.send_message(message))
+        except Exception as e:
+            logging.error(f"Error sending the approved reply to {message_id}: {e}")
+            store.set_draft_status(message_id, 'send_failed')
+            return sent, 1
+        store.set_draft_status(message_id, 'sent')
+        responder.remember_reply(current, reply_body)
+        sent += 1
+    logging.info(f"Sent {sent} approved replies for {email_user}")
+    return sent, 0
+
+
 class EmailProcessor(EmailResponder):
     """Class to process emails and manage email-related tasks."""
 
     def __init__(self):
         """Initialize the EmailProcessor object."""
         super().__init__()
+        self.store = EmailStore(EMAIL_STORE_PATH)
+        self.sessions = SessionPool()
+        self.drafts = DraftQueue(self, self.store)
+        self.watchers = {}
+        if self.store.count() == 0 and os.path.exists(Data_path):
+            self.store.import_excel(Data_path)
 
     def fetch_and_save_emails(self, email_user, email_pass):
-        """Fetch unseen emails and save them to an Excel file.
+        """Fetch the emails that arrived since the last sync and append them to the mailbox store.
 
         Args:
             email_user (str): Email username.
@@ -87,27 +475,70 @@ class EmailProcessor(EmailResponder):
             str: Success message or error message.
         """
         try:
-            reader = EmailReader('imap-mail.outlook.com', email_user, email_pass)
-            reader.connect()
-            reader.login()
-            reader.fetch_unseen_emails()
-            reader.save_emails_to_excel(Data_path)
-            return "Emails fetched and saved to 'emails.xlsx'"
+            saved = self.sessions.call_imap(email_user, email_pass,
+                                            lambda reader: reader.sync(self.store, sinks=[self.drafts.submit]))
+            return f"Fetched {saved} new emails into the mailbox store"
         except Exception as e:
             logging.error(f"Error fetching and saving emails: {e}")
             raise
 
+    def start_push(self, email_user, email_pass):
+        """Start IMAP IDLE push ingestion of the inbox, so new mail is stored and drafted without fetching.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+
+        Returns:
+            str: Status message.
+        """
+        try:
+            watcher = self.watchers.get(email_user)
+            if watcher is None:
+                watcher = IdleWatcher(email_user, email_pass, self.store, sinks=[self.drafts.submit])
+                self.watchers[email_user] = watcher
+            watcher.start()
+            return f"Watching the inbox of {email_user} for new mail"
+        except Exception as e:
+            logging.error(f"Error starting push ingestion: {e}")
+            raise
+
+    def stop_push(self):
+        """Stop every IMAP IDLE watcher.
+
+        Returns:
+            str: Status message.
+        """
+        for watcher in self.watchers.values():
+            watcher.stop()
+        stopped = len(self.watchers)
+        self.watchers = {}
+        return f"Stopped {stopped} push watchers"
+
+    def push_status(self):
+        """Describe the state of the IMAP IDLE watchers.
+
+        Returns:
+            str: One status entry per watched account.
+        """
+        if not self.watchers:
+            return "Push ingestion off"
+        entries = []
+        for user, watcher in self.watchers.items():
+            status = watcher.status()
+            latency = f", last {status['last_latency']:.1f}s after notification" if status['last_latency'] is not None else ""
+            entries.append(f"{user}: {status['state']}, {status['synced']} pushed{latency}")
+        return " | ".join(entries)
+
     def load_emails(self):
-        """Load emails from the Excel file.
+        """Load the first email from the mailbox store.
 
         Returns:
-            Tuple[str, str, str, int]: A tuple containing sender, subject, body, and email index.
+            Tuple[str, str, str, int, str, str, str]: A tuple containing sender, subject, body, email index,
+            and the pre-generated sentiment, sentiment score and reply.
         """
         try:
-            df = pd.read_excel(Data_path)
-            if not df.empty:
-                return self.update_email_content(df, 0)
-            return "N/A", "N/A", "N/A", 0
+            return self.update_email_content(0) + self.get_draft(0)
         except Exception as e:
             logging.error(f"Error loading emails: {e}")
             raise
@@ -126,18 +557,19 @@ class EmailProcessor(EmailResponder):
             and empty reply and sentiment fields.
         """
         try:
-            df = pd.read_excel(Data_path)
-            if 0 <= index < len(df):
-                # Retrieve the message ID of the current email
-                msg_id = df.iloc[index]['Message ID']  # Replace 'Message ID' with the actual column name for message IDs in your DataFrame
-                reader = EmailReader('imap-mail.outlook.com', email_user, email_pass)
-                reader.connect()
-                reader.login()
-                send_status = reader.reply_to_email(msg_id, reply_body)
-                reader.close_connection()
+            index = int(index)
+            current = self.store.get(index)
+            if current is not None:
+                # The reply is built from headers cached at fetch time, so no IMAP round-trip is needed
+                message = build_reply(current, reply_body, email_user)
+                self.sessions.call_smtp(email_user, email_pass, lambda smtp: smtp.send_message(message))
+                if current['Message ID']:
+                    # An approved draft answered by hand must not be sent again
+                    self.store.set_draft_status(current['Message ID'], 'sent')
+                self.remember_reply(current, reply_body)
 
-                response_message = send_status if send_status else "Reply sent successfully!"
-                From, Subject, Body, index = self.update_email_content(df, index)
+                response_message = "Reply sent successfully!"
+                From, Subject, Body, index = self.update_email_content(index)
 
                 # Clear reply body and sentiment fields
                 return response_message, From, Subject, Body, index, "", "", ""
@@ -148,19 +580,131 @@ class EmailProcessor(EmailResponder):
             logging.error(f"Error sending reply and moving next: {e}")
             raise
 
-    def update_email_content(self, df, index):
+    def approve_reply_and_move_next(self, index, reply_body):
+        """Approve the reply to the current email for sending and move to the next email.
+
+        Args:
+            index (int): Current email index.
+            reply_body (str): Reply body.
+
+        Returns:
+            Tuple[str, str, str, str, int, str, str, str]: A tuple containing response message, and the sender, subject,
+            body, index, sentiment, sentiment score and reply of the next email.
+        """
+        try:
+            index = int(index)
+            current = self.store.get(index)
+            if current is None or not current['Message ID']:
+                return ("Invalid email index.",) + self.update_email_content(index) + self.get_draft(index)
+            if not reply_body.strip():
+                return ("The reply is empty.",) + self.update_email_content(index) + self.get_draft(index)
+            self.store.approve_draft(current['Message ID'], reply_body)
+            index = index + 1 if index < self.store.count() - 1 else index
+            return ("Reply approved for sending",) + self.update_email_content(index) + self.get_draft(index)
+        except Exception as e:
+            logging.error(f"Error approving reply: {e}")
+            raise
+
+    def send_approved_drafts(self, email_user, email_pass):
+        """Send every approved reply of the account over its pooled SMTP session.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+
+        Returns:
+            str: Status message.
+        """
+        try:
+            sent, failed = send_approved_drafts(self, self.store, self.sessions, email_user, email_pass)
+            if failed:
+                return f"Sent {sent} approved replies; stopped at a failed reply, which is marked for review"
+            return f"Sent {sent} approved replies"
+        except Exception as e:
+            logging.error(f"Error sending approved replies: {e}")
+            raise
+
+    def open_attachments(self, email_user, email_pass, index):
+        """Download the attachments of the current email, which are left on the server at fetch time.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+            index (int): Current email index.
+
+        Returns:
+            List[str]: Paths of the downloaded attachment files.
+        """
+        try:
+            current = self.store.get(int(index))
+            if current is None or not current['Attachments']:
+                return []
+            target_dir = tempfile.mkdtemp(prefix='attachments_')
+
+            def download(reader):
+                paths = []
+                for number, attachment in enumerate(current['Attachments']):
+                    content = reader.fetch_attachment(current['UID'], attachment['section'], attachment['encoding'])
+                    filename = os.path.basename(attachment['filename'] or f"attachment_{number + 1}")
+                    path = os.path.join(target_dir, filename)
+                    with open(path, 'wb') as f:
+                        f.write(content)
+                    paths.append(path)
+                return paths
+
+            return self.sessions.call_imap(email_user, email_pass, download)
+        except Exception as e:
+            logging.error(f"Error opening attachments: {e}")
+            raise
+
+    def get_draft(self, index):
+        """Get the pre-generated draft of an email.
+
+        Args:
+            index (int): Email index.
+
+        Returns:
+            Tuple[str, str, str]: Sentiment, sentiment score and the drafted or approved reply, empty while not available.
+        """
+        current = self.store.get(int(index)) if index >= 0 else None
+        draft = self.store.get_draft(current['Message ID']) if current and current['Message ID'] else None
+        if draft is None:
+            return "", "", ""
+        score = str(draft['score']) if draft['score'] is not None else ""
+        return draft['sentiment'] or "", score, draft['reply'] or ""
+
+    def draft_queue_status(self):
+        """Describe the progress of the background draft queue.
+
+        Returns:
+            str: Queue depths and counters.
+        """
+        progress = self.drafts.progress()
+        return (f"Waiting: {progress['waiting_classification']} to classify, {progress['waiting_generation']} to draft | "
+                f"In progress: {progress['in_progress']} | Drafted: {progress['drafted']} | "
+                f"Failed: {progress['failed']} | Cancelled: {progress['cancelled']}")
+
+    def cancel_drafts(self):
+        """Cancel every draft that has not started generating yet.
+
+        Returns:
+            str: Status message.
+        """
+        dropped = self.drafts.cancel_all()
+        return f"Cancelled {dropped} queued drafts"
+
+    def update_email_content(self, index):
         """Update email content based on the index.
 
         Args:
-            df (pd.DataFrame): DataFrame containing email data.
             index (int): Email index.
 
         Returns:
             Tuple[str, str, str, int]: A tuple containing sender, subject, body, and email index.
         """
         try:
-            if 0 <= index < len(df):
-                email = df.iloc[index]
+            email = self.store.get(index) if index >= 0 else None
+            if email is not None:
                 return email["From"], email["Subject"], str(email["Body"]), index
             return "N/A", "N/A", "N/A", index
         except Exception as e:
@@ -175,15 +719,16 @@ class EmailProcessor(EmailResponder):
             index (int): Current email index.
 
         Returns:
-            Tuple[str, str, str, int]: A tuple containing sender, subject, body, and email index.
+            Tuple[str, str, str, int, str, str, str]: A tuple containing sender, subject, body, email index,
+            and the pre-generated sentiment, sentiment score and reply.
         """
         try:
-            df = pd.read_excel(Data_path)
+            index = int(index)
             if direction == "next":
-                index = index + 1 if index < len(df) - 1 else index
+                index = index + 1 if index < self.store.count() - 1 else index
             elif direction == "prev":
                 index = index - 1 if index > 0 else index
-            return self.update_email_content(df, index)
+            return self.update_email_content(index) + self.get_draft(index)
         except Exception as e:
             logging.error(f"Error navigating emails: {e}")
             raise
@@ -197,6 +742,8 @@ class EmailProcessor(EmailResponder):
         Returns:
             gr.Info: Gradio Info object.
         """
+        import gradio as gr
+
         try:
             if response_message:
                 gr.update(value=response_message, visible=True)
@@ -0,0 +1,427 @@
+import sqlite3
+import json
+import threading
+import logging
+import os
+
+# Draft states set by an agent; the background draft queue never overwrites them
+REVIEWED_STATUSES = ('approved', 'sent', 'send_failed')
+
+
+class EmailStore:
+    """
+    Persistent, indexed mailbox store backed by SQLite.
+
+    Emails are kept in insertion order so that the position shown in the UI maps
+    directly onto the table's rowid, which makes Next/Previous navigation independent
+    of the mailbox size. Messages are de-duplicated by Message-ID and can also be
+    looked up by (account, IMAP UID).
+    """
+
+    COLUMNS = ['Email ID', 'Message ID', 'From', 'Subject', 'Body']
+
+    def __init__(self, db_path):
+        """
+        Initialize the EmailStore object.
+
+        Args:
+            db_path (str): Path of the SQLite database file.
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open email store: {e}")
+            raise ConnectionError(f"Failed to open email store: {e}")
+
+    def _create_schema(self):
+        """
+        Create the tables and indexes if they do not exist yet.
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS emails (
+                    position INTEGER PRIMARY KEY,
+                    account TEXT,
+                    uid INTEGER,
+                    email_id TEXT,
+                    message_id TEXT UNIQUE,
+                    sender TEXT,
+                    subject TEXT,
+                    body TEXT,
+                    attachments TEXT,
+                    reply_to TEXT,
+                    in_reply_to TEXT,
+                    refs TEXT,
+                    clean_body TEXT
+                )
+                """
+            )
+            for column in ('attachments', 'reply_to', 'in_reply_to', 'refs', 'clean_body'):
+                self._ensure_column('emails', column, 'TEXT')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_account_uid ON emails (account, uid)")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS drafts (
+                    message_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    sentiment TEXT,
+                    score REAL,
+                    reply TEXT,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    account TEXT,
+                    mailbox TEXT,
+                    uidvalidity INTEGER,
+                    last_uid INTEGER,
+                    modseq INTEGER,
+                    PRIMARY KEY (account, mailbox)
+                )
+                """
+            )
+
+    def _ensure_column(self, table, column, column_type):
+        """
+        Add a column to a table created by an older version of the store.
+
+        Args:
+            table (str): Table name.
+            column (str): Column name.
+            column_type (str): SQLite column type.
+        """
+        columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    @staticmethod
+    def _row_to_email(row):
+        """
+        Convert a database row into an email record.
+
+        Args:
+            row (sqlite3.Row): Row from the emails table.
+
+        Returns:
+            dict: Email record keyed by the mailbox column names.
+        """
+        return {
+            'Email ID': row['email_id'],
+            'Message ID': row['message_id'],
+            'From': row['sender'],
+            'Subject': row['subject'],
+            'Body': row['body'],
+            'Account': row['account'],
+            'UID': row['uid'],
+            'Attachments': json.loads(row['attachments']) if row['attachments'] else [],
+            'Reply-To': row['reply_to'],
+            'In-Reply-To': row['in_reply_to'],
+            'References': row['refs'],
+            # Rows stored before bodies were cleaned fall back to the original body
+            'Clean Body': row['clean_body'] if row['clean_body'] is not None else row['body'],
+        }
+
+    def append(self, emails, account=None):
+        """
+        Append emails to the store, skipping Message-IDs that are already stored.
+
+        Args:
+            emails (Iterable[dict]): Email records keyed by the mailbox column names.
+            account (str, optional): Account the emails were fetched from.
+
+        Returns:
+            int: Number of emails actually inserted.
+        """
+        rows = [
+            (
+                account or email.get('Account'),
+                email.get('UID'),
+                None if email.get('Email ID') is None else str(email.get('Email ID')),
+                email.get('Message ID'),
+                email.get('From'),
+                email.get('Subject'),
+                email.get('Body'),
+                email.get('Attachments') if isinstance(email.get('Attachments'), (str, type(None))) else json.dumps(email.get('Attachments')),
+                email.get('Reply-To'),
+                email.get('In-Reply-To'),
+                email.get('References'),
+                email.get('Clean Body'),
+            )
+            for email in emails
+        ]
+        try:
+            with self.lock, self.conn:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO emails (account, uid, email_id, message_id, sender, subject, body, attachments, "
+                    "reply_to, in_reply_to, refs, clean_body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                return self.conn.total_changes - before
+        except sqlite3.Error as e:
+            logging.error(f"Error appending emails to store: {e}")
+            raise Exception(f"Error appending emails to store: {e}")
+
+    def count(self):
+        """
+        Count the emails in the store.
+
+        Emails are never deleted, so the highest position equals the row count and is
+        read straight from the primary key index.
+
+        Returns:
+            int: Number of stored emails.
+        """
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(MAX(position), 0) FROM emails").fetchone()[0]
+
+    def get(self, index):
+        """
+        Get the email at the given position.
+
+        Args:
+            index (int): Zero-based position of the email.
+
+        Returns:
+            dict or None: Email record, or None if the position is out of range.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM emails WHERE position = ?", (int(index) + 1,)).fetchone()
+        return self._row_to_email(row) if row else None
+
+    def page(self, offset, limit):
+        """
+        Read a page of emails in mailbox order.
+
+        Args:
+            offset (int): Zero-based position of the first email.
+            limit (int): Maximum number of emails to return.
+
+        Returns:
+            List[dict]: Email records.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM emails WHERE position > ? ORDER BY position LIMIT ?", (int(offset), int(limit))
+            ).fetchall()
+        return [self._row_to_email(row) for row in rows]
+
+    def get_by_message_id(self, message_id):
+        """
+        Look up an email by its Message-ID header.
+
+        Args:
+            message_id (str): Message-ID of the email.
+
+        Returns:
+            dict or None: Email record, or None if it is not stored.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM emails WHERE message_id = ?", (message_id,)).fetchone()
+        return self._row_to_email(row) if row else None
+
+    def get_by_uid(self, account, uid):
+        """
+        Look up an email by account and IMAP UID.
+
+        Args:
+            account (str): Account the email was fetched from.
+            uid (int): IMAP UID of the email.
+
+        Returns:
+            dict or None: Email record, or None if it is not stored.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM emails WHERE account = ? AND uid = ?", (account, int(uid))
+            ).fetchone()
+        return self._row_to_email(row) if row else None
+
+    def get_checkpoint(self, account, mailbox):
+        """
+        Get the IMAP sync checkpoint of a mailbox.
+
+        Args:
+            account (str): Account the mailbox belongs to.
+            mailbox (str): Mailbox name.
+
+        Returns:
+            dict or None: Checkpoint with 'uidvalidity', 'last_uid' and 'modseq', or None.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT uidvalidity, last_uid, modseq FROM sync_state WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def save_checkpoint(self, account, mailbox, uidvalidity, last_uid, modseq=None):
+        """
+        Save the IMAP sync checkpoint of a mailbox.
+
+        Args:
+            account (str): Account the mailbox belongs to.
+            mailbox (str): Mailbox name.
+            uidvalidity (int): UIDVALIDITY of the mailbox.
+            last_uid (int): Highest UID that has been synced.
+            modseq (int, optional): HIGHESTMODSEQ of the mailbox when CONDSTORE is available.
+        """
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (account, mailbox, uidvalidity, last_uid, modseq) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (account, mailbox, uidvalidity, last_uid, modseq),
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Error saving sync checkpoint: {e}")
+            raise Exception(f"Error saving sync checkpoint: {e}")
+
+    def save_draft(self, message_id, status, sentiment=None, score=None, reply=None):
+        """
+        Save the draft reply state of an email, unless an agent already approved or sent a reply.
+
+        Args:
+            message_id (str): Message-ID of the email.
+            status (str): 'queued', 'classified', 'ready', 'failed' or 'cancelled'.
+            sentiment (str, optional): Sentiment label.
+            score (float, optional): Sentiment score.
+            reply (str, optional): Drafted reply body.
+        """
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO drafts (message_id, status, sentiment, score, reply, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                    "ON CONFLICT (message_id) DO UPDATE SET status = excluded.status, sentiment = excluded.sentiment, "
+                    "score = excluded.score, reply = excluded.reply, updated_at = excluded.updated_at "
+                    f"WHERE drafts.status NOT IN ({', '.join('?' * len(REVIEWED_STATUSES))})",
+                    (message_id, status, sentiment, score, reply) + REVIEWED_STATUSES,
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Error saving draft: {e}")
+            raise Exception(f"Error saving draft: {e}")
+
+    def approve_draft(self, message_id, reply):
+        """
+        Approve a reply for sending, keeping the sentiment of the draft.
+
+        Args:
+            message_id (str): Message-ID of the email.
+            reply (str): Reply body the agent approved.
+        """
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO drafts (message_id, status, reply, updated_at) VALUES (?, 'approved', ?, CURRENT_TIMESTAMP) "
+                    "ON CONFLICT (message_id) DO UPDATE SET status = 'approved', reply = excluded.reply, "
+                    "updated_at = excluded.updated_at",
+                    (message_id, reply),
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Error approving draft: {e}")
+            raise Exception(f"Error approving draft: {e}")
+
+    def set_draft_status(self, message_id, status):
+        """
+        Change the status of an existing draft, e.g. once its reply was sent.
+
+        Args:
+            message_id (str): Message-ID of the email.
+            status (str): New status.
+        """
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "UPDATE drafts SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE message_id = ?", (status, message_id)
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Error updating draft status: {e}")
+            raise Exception(f"Error updating draft status: {e}")
+
+    def approved_drafts(self, account):
+        """
+        List the approved replies of an account that are waiting to be sent, oldest approval first.
+
+        Args:
+            account (str): Account the emails were fetched from.
+
+        Returns:
+            List[Tuple[str, str]]: Pairs of Message-ID and reply body.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT drafts.message_id, drafts.reply FROM drafts JOIN emails ON emails.message_id = drafts.message_id "
+                "WHERE drafts.status = 'approved' AND emails.account = ? ORDER BY drafts.updated_at, emails.position",
+                (account,),
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def get_draft(self, message_id):
+        """
+        Get the draft reply state of an email.
+
+        Args:
+            message_id (str): Message-ID of the email.
+
+        Returns:
+            dict or None: Draft with 'status', 'sentiment', 'score' and 'reply', or None.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, sentiment, score, reply FROM drafts WHERE message_id = ?", (message_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def unfinished_drafts(self):
+        """
+        List the emails whose drafting was queued but never finished, e.g. because the process stopped.
+
+        Returns:
+            List[str]: Message-IDs of drafts left 'queued' or 'classified'.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT message_id FROM drafts WHERE status IN ('queued', 'classified')").fetchall()
+        return [row[0] for row in rows]
+
+    def import_excel(self, filename):
+        """
+        One-time import of a legacy emails.xlsx file into the store.
+
+        Args:
+            filename (str): Path of the Excel file.
+
+        Returns:
+            int: Number of emails imported.
+        """
+        import pandas as pd
+
+        try:
+            df = pd.read_excel(filename)
+            df = df.astype(object).where(df.notna(), None)
+            imported = self.append(df.to_dict('records'))
+            logging.info(f"Imported {imported} emails from {filename}")
+            return imported
+        except Exception as e:
+            logging.error(f"Error importing emails from Excel: {e}")
+            raise Exception(f"Error importing emails from Excel: {e}")
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self.lock:
+            self.conn.close()
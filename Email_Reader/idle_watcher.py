@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from config import IMAP_ENDPOINT, IDLE_RENEW_INTERVAL, IDLE_MAX_BACKOFF, IDLE_POLL_INTERVAL
+from .email_reader import EmailReader
+
+
+class IdleWatcher:
+    """
+    Push ingestion for one mailbox over a dedicated IMAP IDLE session.
+
+    A background thread keeps the session in IDLE, re-issuing it before the server's
+    timeout. When the server announces new messages it syncs just the UIDs above the
+    stored checkpoint and hands them to the sinks. Dropped connections are reopened
+    with exponential backoff; servers without IDLE are polled instead.
+    """
+
+    def __init__(self, email_user, email_pass, store, sinks=(), mailbox='inbox', imap_url=IMAP_ENDPOINT,
+                 renew_interval=IDLE_RENEW_INTERVAL, max_backoff=IDLE_MAX_BACKOFF, poll_interval=IDLE_POLL_INTERVAL):
+        """
+        Initialize the IdleWatcher object.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+            store (EmailStore): Mailbox store the new emails are synced into.
+            sinks (Iterable[Callable[[List[EmailRecord]], None]]): Consumers called with each stored batch.
+            mailbox (str): Mailbox to watch.
+            imap_url (str): IMAP server URL.
+            renew_interval (float): Seconds after which IDLE is re-issued.
+            max_backoff (float): Maximum seconds between reconnection attempts.
+            poll_interval (float): Seconds between syncs when the server does not support IDLE.
+        """
+        self.email_user = email_user
+        self.email_pass = email_pass
+        self.store = store
+        self.sinks = list(sinks)
+        self.mailbox = mailbox
+        self.imap_url = imap_url
+        self.renew_interval = renew_interval
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.reader = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'state': 'stopped', 'notifications': 0, 'synced': 0, 'reconnects': 0, 'last_latency': None}
+
+    def start(self):
+        """
+        Start watching the mailbox on a background thread.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=f"idle-{self.email_user}-{self.mailbox}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop watching; IDLE is ended within about a second.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _set_state(self, state):
+        """
+        Record the watcher's current state.
+
+        Args:
+            state (str): State name.
+        """
+        with self.lock:
+            self.stats['state'] = state
+
+    def status(self):
+        """
+        Report the watcher's state and counters.
+
+        Returns:
+            dict: State, notifications received, emails synced, reconnects and the latest notification-to-store latency.
+        """
+        with self.lock:
+            return dict(self.stats)
+
+    def _connect(self):
+        """
+        Open and log in a dedicated session.
+        """
+        self.reader = EmailReader(self.imap_url, self.email_user, self.email_pass)
+        self.reader.connect()
+        self.reader.login()
+
+    def _disconnect(self):
+        """
+        Close the session, ignoring errors from connections the server already dropped.
+        """
+        if self.reader is not None:
+            try:
+                self.reader.mail.logout()
+            except Exception as e:
+                logging.debug(f"Error closing IDLE session: {e}")
+            self.reader = None
+
+    def _sync(self, notified_at=None):
+        """
+        Sync new mail into the store and the sinks.
+
+        Args:
+            notified_at (float, optional): time.monotonic() of the new-mail notification.
+        """
+        saved = self.reader.sync(self.store, mailbox=self.mailbox, sinks=self.sinks)
+        with self.lock:
+            self.stats['synced'] += saved
+            if notified_at is not None:
+                self.stats['notifications'] += 1
+                self.stats['last_latency'] = time.monotonic() - notified_at
+        if notified_at is not None:
+            logging.info(f"Pushed {saved} new emails for {self.email_user}/{self.mailbox} "
+                         f"{time.monotonic() - notified_at:.2f}s after the IDLE notification")
+
+    def _run(self):
+        """
+        Keep the session in IDLE, reconnecting with exponential backoff after failures.
+        """
+        backoff = 1.0
+        while not self.stop_event.is_set():
+            try:
+                self._set_state('connecting')
+                self._connect()
+                # Catch up on anything that arrived while the watcher was not connected
+                self._sync()
+                backoff = 1.0
+                supports_idle = 'IDLE' in self.reader.mail.capabilities
+                if not supports_idle:
+                    logging.warning(f"{self.imap_url} does not support IDLE; polling every {self.poll_interval}s")
+                while not self.stop_event.is_set():
+                    if supports_idle:
+                        self._set_state('idle')
+                        new_mail = self.reader.idle(self.renew_interval, self.stop_event)
+                        if self.stop_event.is_set():
+                            break
+                        # Sync after every IDLE cycle, so a missed notification is picked up at the next renewal
+                        self._set_state('syncing')
+                        self._sync(time.monotonic() if new_mail else None)
+                    elif not self.stop_event.wait(self.poll_interval):
+                        self._set_state('syncing')
+                        self._sync()
+            except Exception as e:
+                logging.error(f"IDLE session for {self.email_user}/{self.mailbox} failed, retrying in {backoff:.0f}s: {e}")
+                with self.lock:
+                    self.stats['reconnects'] += 1
+                self._set_state('reconnecting')
+                self._disconnect()
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        self._disconnect()
+        self._set_state('stopped')
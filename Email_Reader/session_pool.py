@@ -0,0 +1,300 @@
+import imaplib
+import smtplib
+import threading
+import logging
+import time
+from contextlib import contextmanager
+from config import IMAP_ENDPOINT, SMTP_ENDPOINT, SMTP_PORT, SESSION_IDLE_TIMEOUT, SESSION_KEEPALIVE_INTERVAL
+from .email_reader import EmailReader
+
+# Errors of a connection the server dropped; the operation is retried once on a new session
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, smtplib.SMTPServerDisconnected, OSError)
+
+
+def is_connection_error(error):
+    """
+    Check whether an error, or an error it was raised from, comes from a dropped connection.
+
+    EmailReader wraps failures in a plain Exception, so the whole chain is inspected.
+
+    Args:
+        error (BaseException): The raised error.
+
+    Returns:
+        bool: True for dropped or reset connections.
+    """
+    while error is not None:
+        # SMTP replies such as a refused recipient are OSErrors too, but the connection is fine
+        if isinstance(error, CONNECTION_ERRORS) and (
+                not isinstance(error, smtplib.SMTPException) or isinstance(error, smtplib.SMTPServerDisconnected)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class _SMTP(smtplib.SMTP):
+    """An SMTP client that records whether the DATA command of a message was issued."""
+
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+
+class _Session:
+    """A pooled connection together with its lock and last-use time."""
+
+    def __init__(self):
+        self.connection = None
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+
+
+class SessionPool:
+    """
+    Per-account pool of persistent IMAP and SMTP sessions.
+
+    Sessions are kept open between button clicks, probed with NOOP before reuse when
+    they have been idle for a while, reconnected when the probe fails and closed by a
+    background thread once they exceed the idle timeout. Operations run through
+    call_imap/call_smtp are retried once on a new session when the connection drops.
+    """
+
+    def __init__(self, imap_url=IMAP_ENDPOINT, smtp_host=SMTP_ENDPOINT, smtp_port=SMTP_PORT,
+                 idle_timeout=SESSION_IDLE_TIMEOUT, keepalive_interval=SESSION_KEEPALIVE_INTERVAL):
+        """
+        Initialize the SessionPool object.
+
+        Args:
+            imap_url (str): IMAP server URL.
+            smtp_host (str): SMTP server host.
+            smtp_port (int): SMTP server port.
+            idle_timeout (float): Seconds after which an unused session is closed.
+            keepalive_interval (float): Seconds of inactivity after which a session is probed with NOOP.
+        """
+        self.imap_url = imap_url
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.reaper = threading.Thread(target=self._reap_idle_sessions, name="session-reaper", daemon=True)
+        self.reaper.start()
+
+    def _session(self, kind, email_user, email_pass):
+        """
+        Get or create the pool slot of an account.
+
+        Args:
+            kind (str): 'imap' or 'smtp'.
+            email_user (str): Email username.
+            email_pass (str): Email password.
+
+        Returns:
+            _Session: The pool slot.
+        """
+        with self.lock:
+            return self.sessions.setdefault((kind, email_user, email_pass), _Session())
+
+    def _open_imap(self, email_user, email_pass):
+        """
+        Open and log in an IMAP session.
+
+        Returns:
+            EmailReader: Connected reader.
+        """
+        reader = EmailReader(self.imap_url, email_user, email_pass)
+        reader.connect()
+        reader.login()
+        return reader
+
+    def _open_smtp(self, email_user, email_pass):
+        """
+        Open an SMTP session with STARTTLS and log in.
+
+        Returns:
+            smtplib.SMTP: Connected SMTP client.
+        """
+        smtp = _SMTP(self.smtp_host, self.smtp_port)
+        smtp.ehlo()
+        smtp.starttls()
+        smtp.ehlo()
+        smtp.login(email_user, email_pass)
+        return smtp
+
+    @staticmethod
+    def _is_alive(kind, connection):
+        """
+        Probe a connection with NOOP.
+
+        Returns:
+            bool: Whether the server answered the probe.
+        """
+        try:
+            if kind == 'imap':
+                return connection.mail.noop()[0] == 'OK'
+            return connection.noop()[0] == 250
+        except (imaplib.IMAP4.error, smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _close(kind, connection):
+        """
+        Close a connection, ignoring errors from sessions the server already dropped.
+        """
+        try:
+            if kind == 'imap':
+                connection.mail.logout()
+            else:
+                connection.quit()
+        except Exception as e:
+            logging.debug(f"Error closing {kind} session: {e}")
+
+    @contextmanager
+    def _checkout(self, kind, email_user, email_pass):
+        """
+        Lend out the pooled connection of an account, reconnecting it when needed.
+        """
+        session = self._session(kind, email_user, email_pass)
+        with session.lock:
+            now = time.monotonic()
+            if session.connection is not None and now - session.last_used > self.keepalive_interval:
+                if not self._is_alive(kind, session.connection):
+                    logging.info(f"Reconnecting stale {kind} session for {email_user}")
+                    self._close(kind, session.connection)
+                    session.connection = None
+            if session.connection is None:
+                opener = self._open_imap if kind == 'imap' else self._open_smtp
+                session.connection = opener(email_user, email_pass)
+            try:
+                yield session.connection
+            except Exception:
+                # The connection may be left mid-command; drop it so the next checkout reconnects
+                self._close(kind, session.connection)
+                session.connection = None
+                raise
+            finally:
+                session.last_used = time.monotonic()
+
+    def _call(self, kind, email_user, email_pass, operation):
+        """
+        Run an operation on the pooled connection of an account, retrying it once on a new
+        session when the connection turns out to be dropped.
+
+        An SMTP operation is not retried once it issued DATA: the server may already have
+        accepted the message, so the error is raised instead of risking a second delivery.
+
+        Args:
+            kind (str): 'imap' or 'smtp'.
+            email_user (str): Email username.
+            email_pass (str): Email password.
+            operation (Callable): Function called with the connection.
+
+        Returns:
+            The operation's result.
+        """
+        for attempt in range(2):
+            connection = None
+            try:
+                with self._checkout(kind, email_user, email_pass) as connection:
+                    if kind == 'smtp':
+                        connection.data_started = False
+                    return operation(connection)
+            except Exception as e:
+                delivered = kind == 'smtp' and getattr(connection, 'data_started', False)
+                if attempt == 1 or delivered or not is_connection_error(e):
+                    raise
+                logging.warning(f"The {kind} session for {email_user} was dropped; retrying on a new session: {e}")
+
+    def call_imap(self, email_user, email_pass, operation):
+        """
+        Run an operation on the pooled IMAP session of an account, retrying once after a dropped connection.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+            operation (Callable[[EmailReader], Any]): Function called with the connected reader.
+
+        Returns:
+            The operation's result.
+        """
+        return self._call('imap', email_user, email_pass, operation)
+
+    def call_smtp(self, email_user, email_pass, operation):
+        """
+        Run an operation on the pooled SMTP session of an account, retrying once when the connection
+        drops before the message's DATA command.
+
+        Once the operation issued DATA the server may already have accepted the message, so a
+        later drop is raised instead of retried and the message is never sent twice.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+            operation (Callable[[smtplib.SMTP], Any]): Function called with the connected client.
+
+        Returns:
+            The operation's result.
+        """
+        return self._call('smtp', email_user, email_pass, operation)
+
+    def imap(self, email_user, email_pass):
+        """
+        Borrow the pooled IMAP session of an account.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+
+        Returns:
+            ContextManager[EmailReader]: Connected and logged-in reader.
+        """
+        return self._checkout('imap', email_user, email_pass)
+
+    def smtp(self, email_user, email_pass):
+        """
+        Borrow the pooled SMTP session of an account.
+
+        Args:
+            email_user (str): Email username.
+            email_pass (str): Email password.
+
+        Returns:
+            ContextManager[smtplib.SMTP]: Connected and logged-in SMTP client.
+        """
+        return self._checkout('smtp', email_user, email_pass)
+
+    def _reap_idle_sessions(self):
+        """
+        Close sessions that have been idle for longer than the idle timeout.
+        """
+        while not self.stop_event.wait(self.keepalive_interval):
+            with self.lock:
+                items = list(self.sessions.items())
+            for (kind, email_user, _), session in items:
+                if not session.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if session.connection is not None and time.monotonic() - session.last_used > self.idle_timeout:
+                        logging.info(f"Closing idle {kind} session for {email_user}")
+                        self._close(kind, session.connection)
+                        session.connection = None
+                finally:
+                    session.lock.release()
+
+    def close_all(self):
+        """
+        Stop the background thread and close every pooled session.
+        """
+        self.stop_event.set()
+        with self.lock:
+            items = list(self.sessions.items())
+            self.sessions = {}
+        for (kind, _, _), session in items:
+            with session.lock:
+                if session.connection is not None:
+                    self._close(kind, session.connection)
+                    session.connection = None
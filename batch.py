@@ -0,0 +1,89 @@
+# batch.py
+
+import argparse
+import logging
+import signal
+import threading
+from Email_Reader.email_response import EmailResponder
+from Email_Reader.batch_processor import BatchProcessor, load_accounts
+from config import (
+    BATCH_ACCOUNTS_PATH, BATCH_IMAP_CONCURRENCY, BATCH_CLASSIFIER_CONCURRENCY, BATCH_LLM_CONCURRENCY, BATCH_POLL_INTERVAL
+)
+from utils.logging_config import setup_logging
+
+setup_logging()
+
+
+def print_report(results):
+    """
+    Prints the per-account results of a round.
+
+    :param results: Per-account statistics returned by BatchProcessor.run_once.
+    """
+    print(f"{'Account':<40} {'New':>6} {'Drafted':>8} {'Failed':>7} {'Sync s':>8} {'Emails/min':>11}")
+    for user, stats in results.items():
+        print(f"{user:<40} {stats['stored']:>6} {stats['drafted']:>8} {stats['failed']:>7} "
+              f"{stats['sync_seconds']:>8.1f} {stats['emails_per_minute']:>11.1f}"
+              + (f"  error: {stats['error']}" if 'error' in stats else ""))
+
+
+def print_send_report(results):
+    """
+    Prints the per-account results of sending the approved replies.
+
+    :param results: Per-account statistics returned by BatchProcessor.send_approved.
+    """
+    print(f"{'Account':<40} {'Sent':>6} {'Failed':>7}")
+    for user, stats in results.items():
+        print(f"{user:<40} {stats['sent']:>6} {stats['failed']:>7}" + (f"  error: {stats['error']}" if 'error' in stats else ""))
+
+
+def main(accounts_path, interval, imap_workers, classifier_workers, llm_workers, push=False, send_approved=False):
+    """
+    Runs the fetch → classify → draft pipeline over every configured account, once or as a daemon.
+
+    :param accounts_path: Path of the JSON accounts file.
+    :param interval: Seconds between rounds; 0 processes every account once and exits.
+    :param imap_workers: Maximum number of accounts synced concurrently.
+    :param classifier_workers: Maximum number of concurrent classification batches.
+    :param llm_workers: Maximum number of concurrent LLM generations.
+    :param push: After the first round, ingest new mail through IMAP IDLE until stopped instead of polling.
+    :param send_approved: Only send the approved replies of every account, then exit.
+    """
+    accounts = load_accounts(accounts_path)
+    processor = BatchProcessor(accounts, EmailResponder(), imap_workers, classifier_workers, llm_workers)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        if send_approved:
+            print_send_report(processor.send_approved())
+            return
+        print_report(processor.run_once())
+        if push:
+            processor.start_push()
+            while not stop.wait(1):
+                pass
+        while interval > 0 and not stop.wait(interval):
+            print_report(processor.run_once())
+    except KeyboardInterrupt:
+        logging.info("Batch processing interrupted")
+    finally:
+        processor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch, classify and draft replies for many mailboxes without the UI.")
+    parser.add_argument('--accounts', default=BATCH_ACCOUNTS_PATH, help="JSON file listing the accounts to process")
+    parser.add_argument('--interval', type=float, default=0,
+                        help=f"run as a daemon, starting a round every INTERVAL seconds (e.g. {BATCH_POLL_INTERVAL})")
+    parser.add_argument('--imap-workers', type=int, default=BATCH_IMAP_CONCURRENCY, help="accounts synced concurrently")
+    parser.add_argument('--classifier-workers', type=int, default=BATCH_CLASSIFIER_CONCURRENCY,
+                        help="concurrent classification batches")
+    parser.add_argument('--llm-workers', type=int, default=BATCH_LLM_CONCURRENCY, help="concurrent LLM generations")
+    parser.add_argument('--daemon', action='store_true', help=f"shorthand for --interval {BATCH_POLL_INTERVAL}")
+    parser.add_argument('--push', action='store_true', help="after the first round, ingest new mail via IMAP IDLE")
+    parser.add_argument('--send-approved', action='store_true',
+                        help="send every approved reply over one SMTP session per account, then exit")
+    args = parser.parse_args()
+    main(args.accounts, BATCH_POLL_INTERVAL if args.daemon and not args.interval else args.interval,
+         args.imap_workers, args.classifier_workers, args.llm_workers, args.push, args.send_approved)
@@ -0,0 +1,93 @@
+"""
+Offline benchmark of quoted-text and signature stripping on the stored emails.
+
+Usage:
+    python benchmarks/body_cleaning.py --limit 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EMAIL_STORE_PATH, TEXT_LABELS, ZERO_SHOT_MODEL
+from Email_Reader.body_cleaner import clean_body
+from Email_Reader.email_store import EmailStore
+from utils.sentiment_classifier import SentimentClassifier
+
+
+def load_bodies(limit):
+    """
+    Read original and cleaned email bodies from the mailbox store.
+
+    Emails stored before bodies were cleaned are cleaned here with the same rules.
+
+    :param limit: Maximum number of emails.
+    :return: Tuple of (original bodies, cleaned bodies).
+    """
+    store = EmailStore(EMAIL_STORE_PATH)
+    emails = [email for email in store.page(0, limit) if email['Body']]
+    store.close()
+    originals = [email['Body'] for email in emails]
+    cleaned = [
+        email['Clean Body'] if email['Clean Body'] != email['Body']
+        else clean_body(email['Body'], bool(email['In-Reply-To'] or email['References']))
+        for email in emails
+    ]
+    return originals, cleaned
+
+
+def classify_seconds(bodies):
+    """
+    Time the zero-shot classifier over a list of bodies, bypassing the result cache.
+
+    :param bodies: Email bodies.
+    :return: Seconds spent classifying.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        classifier = SentimentClassifier(ZERO_SHOT_MODEL, TEXT_LABELS, cache_path=os.path.join(cache_dir, 'cache.db'))
+        start = time.perf_counter()
+        classifier.classify_batch(bodies)
+        return time.perf_counter() - start
+
+
+def main():
+    """
+    Report the input size reduction of the cleaned bodies and its effect on classifier latency.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limit', type=int, default=200, help="number of stored emails to use")
+    parser.add_argument('--skip-classifier', action='store_true', help="only report the size reduction")
+    args = parser.parse_args()
+
+    originals, cleaned = load_bodies(args.limit)
+    if not originals:
+        raise SystemExit(f"No emails found in {EMAIL_STORE_PATH}")
+
+    start = time.perf_counter()
+    for body in originals:
+        clean_body(body, True)
+    cleaning_seconds = time.perf_counter() - start
+
+    original_chars = sum(len(body) for body in originals)
+    cleaned_chars = sum(len(body) for body in cleaned)
+    per_email = [1 - len(clean) / len(original) for original, clean in zip(originals, cleaned)]
+    print(f"Emails:                        {len(originals)}")
+    print(f"Average body size:             {original_chars / len(originals):.0f} -> {cleaned_chars / len(cleaned):.0f} chars")
+    print(f"Total size reduction:          {1 - cleaned_chars / original_chars:.1%}")
+    print(f"Average per-email reduction:   {sum(per_email) / len(per_email):.1%}")
+    print(f"Cleaning cost:                 {1000 * cleaning_seconds / len(originals):.2f} ms/email")
+
+    if not args.skip_classifier:
+        original_seconds = classify_seconds(originals)
+        cleaned_seconds = classify_seconds(cleaned)
+        print(f"Classifier latency (original): {1000 * original_seconds / len(originals):.1f} ms/email")
+        print(f"Classifier latency (cleaned):  {1000 * cleaned_seconds / len(cleaned):.1f} ms/email "
+              f"({1 - cleaned_seconds / original_seconds:.1%} faster)")
+
+
+if __name__ == "__main__":
+    main()
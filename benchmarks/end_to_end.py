@@ -0,0 +1,460 @@
+"""
+Offline end-to-end benchmark of fetching, ingestion, classification, retrieval, drafting and sending.
+
+The real pipeline runs against in-process stand-ins: a fake IMAP server seeded with
+synthetic mailboxes (attachments, HTML, replies and non-UTF-8 charsets), a fake SMTP
+sink and a stub of the Ollama API that streams replies at a configurable token rate.
+Every file the application writes goes to a temporary directory. With --tiny, small
+embedding and zero-shot models are used so the suite runs on a CPU in minutes; add
+--offline once they are in the HuggingFace cache.
+
+Results are written as JSON; --compare prints the change of every metric against an
+earlier result file and flags regressions beyond --tolerance.
+
+Usage:
+    python benchmarks/end_to_end.py --tiny --mailbox-sizes 100,1000
+    python benchmarks/end_to_end.py --tiny --offline --compare benchmarks/results/baseline.json
+    python benchmarks/end_to_end.py --skip-models
+"""
+
+import argparse
+import datetime
+import imaplib
+import json
+import os
+import platform
+import resource
+import smtplib
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+from Email_Reader.email_reader import EmailReader, build_reply
+from Email_Reader.email_store import EmailStore
+from fakes import FakeIMAPServer, FakeSMTPServer, FakeOllamaServer, synthetic_mailbox, synthetic_guidelines
+
+# Small models with the same interfaces as the production ones
+TINY_MODELS = {
+    'EMBED_MODEL_NAME': "sentence-transformers/all-MiniLM-L6-v2",
+    'ZERO_SHOT_MODEL': "cross-encoder/nli-MiniLM2-L6-H768",
+    'CONTEXT_TOKENIZER': "sentence-transformers/all-MiniLM-L6-v2",
+}
+
+REPLY = "Thank you for your email. We have looked into your order and will get back to you shortly."
+
+
+class LocalEmailReader(EmailReader):
+    """
+    EmailReader connecting without TLS to a "host:port" IMAP URL, as the fake server expects.
+    """
+
+    def connect(self):
+        """
+        Connect to the local IMAP server.
+        """
+        host, port = self.imap_url.rsplit(':', 1)
+        self.mail = imaplib.IMAP4(host, int(port))
+
+
+def percentile_ms(seconds, q):
+    """
+    Convert a latency percentile to milliseconds, by the nearest-rank method.
+
+    :param seconds: List of latencies in seconds.
+    :param q: Percentile between 0 and 100.
+    :return: Latency in milliseconds.
+    """
+    if not seconds:
+        return 0.0
+    ordered = sorted(seconds)
+    return 1000 * ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def latency_summary(seconds):
+    """
+    Summarize request latencies.
+
+    :param seconds: List of latencies in seconds.
+    :return: Dictionary with the request count, mean, p50 and p95 in milliseconds and requests per second.
+    """
+    total = sum(seconds)
+    return {
+        'requests': len(seconds),
+        'mean_ms': 1000 * total / len(seconds) if seconds else 0.0,
+        'p50_ms': percentile_ms(seconds, 50),
+        'p95_ms': percentile_ms(seconds, 95),
+        'per_second': len(seconds) / total if total > 0 else 0.0,
+    }
+
+
+def max_rss_mb():
+    """
+    Peak resident memory of this process.
+
+    :return: Megabytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def configure(args, work_dir, ollama_url):
+    """
+    Point the application configuration at the work directory, the Ollama stub and the selected models.
+
+    Must run before the application modules that read these settings are imported.
+
+    :param args: Parsed command line arguments.
+    :param work_dir: Directory receiving every file the application writes.
+    :param ollama_url: Base URL of the Ollama stub.
+    :return: Dictionary of the overridden settings.
+    """
+    overrides = {
+        'DB_PATH': os.path.join(work_dir, 'db'),
+        'INGEST_MANIFEST_PATH': os.path.join(work_dir, 'manifest.json'),
+        'EMBED_CACHE_PATH': os.path.join(work_dir, 'embedding_cache'),
+        'EMAIL_STORE_PATH': os.path.join(work_dir, 'emails.db'),
+        'SENTIMENT_CACHE_PATH': os.path.join(work_dir, 'sentiment_cache.db'),
+        'RESPONSE_CACHE_PATH': os.path.join(work_dir, 'response_cache.db'),
+        # Cached replies would answer instead of the pipeline being measured
+        'RESPONSE_CACHE_ENABLED': False,
+        'MODEL_SERVER_MODE': 'inprocess',
+        'VECTOR_BACKEND': args.backend,
+        'INFERENCE_BACKEND': args.inference_backend,
+        'OLLAMA_BASE_URL': ollama_url,
+    }
+    if args.tiny:
+        overrides.update(TINY_MODELS)
+    if args.embed_model:
+        overrides['EMBED_MODEL_NAME'] = args.embed_model
+    if args.zero_shot_model:
+        overrides['ZERO_SHOT_MODEL'] = args.zero_shot_model
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return overrides
+
+
+def bench_fetch(imap, sizes, work_dir, args):
+    """
+    Sync synthetic mailboxes of each size into fresh stores, with full and header-first fetching.
+
+    :param imap: Running FakeIMAPServer.
+    :param sizes: Mailbox sizes.
+    :param work_dir: Directory for the mailbox stores.
+    :param args: Parsed command line arguments.
+    :return: Tuple of (per-size results, path of the lazily synced store of the largest mailbox).
+    """
+    url = f"{imap.address[0]}:{imap.address[1]}"
+    results = {}
+    store_path = None
+    for size in sizes:
+        user = f"bench{size}@example.com"
+        messages = synthetic_mailbox(size, seed=size, attachment_ratio=args.attachment_ratio, attachment_kb=args.attachment_kb)
+        mailbox_bytes = imap.add_mailbox(user, 'secret', messages)
+        results[str(size)] = {'mailbox_mb': mailbox_bytes / 1e6}
+        for mode in ('full', 'lazy'):
+            path = os.path.join(work_dir, f"fetch-{size}-{mode}.db")
+            store = EmailStore(path)
+            reader = LocalEmailReader(url, user, 'secret')
+            start = time.perf_counter()
+            reader.connect()
+            reader.login()
+            saved = reader.sync(store, lazy=mode == 'lazy', batch_size=args.fetch_batch_size)
+            elapsed = time.perf_counter() - start
+            reader.mail.logout()
+            store.close()
+            results[str(size)][mode] = {
+                'messages': saved,
+                'seconds': elapsed,
+                'messages_per_second': saved / elapsed if elapsed > 0 else 0.0,
+                'body_reduction': reader.last_sync_stats.get('body_reduction', 0.0),
+            }
+            store_path = path
+    return results, store_path
+
+
+def bench_smtp(smtp, emails):
+    """
+    Send a reply to every email through one SMTP session.
+
+    :param smtp: Running FakeSMTPServer.
+    :param emails: Stored email records.
+    :return: Latency summary of the sends.
+    """
+    latencies = []
+    with smtplib.SMTP(*smtp.address) as session:
+        for email in emails:
+            start = time.perf_counter()
+            session.send_message(build_reply(email, REPLY, 'support@example.com'))
+            latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies)
+
+
+def bench_ingest(work_dir, args):
+    """
+    Ingest synthetic guideline PDFs into a fresh vector store.
+
+    :param work_dir: Directory for the PDFs.
+    :param args: Parsed command line arguments.
+    :return: Dictionary of files, chunks, seconds, chunks per second and per-stage throughput.
+    """
+    from utils.embedding_cache import load_embed_model
+    from utils.ingest_manifest import IngestManifest
+    from utils.ingest_pipeline import IngestionPipeline
+    from utils.vector_db import VectorDatabase
+
+    docs_dir = os.path.join(work_dir, 'docs')
+    os.makedirs(docs_dir)
+    paths = synthetic_guidelines(docs_dir, args.docs, args.pages)
+    start = time.perf_counter()
+    vector_db = VectorDatabase(config.DB_PATH, load_embed_model(config.EMBED_MODEL_NAME))
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = IngestionPipeline(vector_db, IngestManifest(config.INGEST_MANIFEST_PATH)).run(paths)
+    elapsed = time.perf_counter() - start
+    return {
+        'files': len(paths),
+        'chunks': stats['write']['items'],
+        'model_load_seconds': load_seconds,
+        'seconds': elapsed,
+        'chunks_per_second': stats['write']['items'] / elapsed if elapsed > 0 else 0.0,
+        'stage_per_second': {stage: values['per_second'] for stage, values in stats.items()},
+    }
+
+
+def bench_models(emails, args):
+    """
+    Measure classification, retrieval and end-to-end drafting with the EmailResponder.
+
+    Every request text is made unique so that the sentiment and embedding caches never
+    answer instead of the models.
+
+    :param emails: Stored email records.
+    :param args: Parsed command line arguments.
+    :return: Dictionary of per-stage latency summaries.
+    """
+    from Email_Reader.email_response import EmailResponder
+
+    start = time.perf_counter()
+    responder = EmailResponder()
+    # Wait for every component so that loading is not counted as request latency
+    for component in responder.components.values():
+        component.get()
+    results = {'load_seconds': time.perf_counter() - start}
+    samples = []
+    for i in range(args.requests):
+        email = emails[i % len(emails)]
+        samples.append((f"{email['Clean Body'] or email['Body']}\n[request {i}-{time.time()}]", email['Subject'] or ''))
+
+    latencies, labels = [], []
+    for body, _ in samples:
+        start = time.perf_counter()
+        labels.append(responder.classify(body)[0])
+        latencies.append(time.perf_counter() - start)
+    results['classify'] = latency_summary(latencies)
+
+    bodies = [f"{body} [batch]" for body, _ in samples]
+    start = time.perf_counter()
+    responder.classify_batch(bodies)
+    elapsed = time.perf_counter() - start
+    results['classify_batch'] = {'requests': len(bodies), 'per_second': len(bodies) / elapsed if elapsed > 0 else 0.0}
+
+    latencies = []
+    for (body, subject), label in zip(samples, labels):
+        start = time.perf_counter()
+        responder.context_assembler.assemble(responder.build_query(body, subject, label))
+        latencies.append(time.perf_counter() - start)
+    results['retrieval'] = latency_summary(latencies)
+
+    latencies = []
+    for body, subject in samples:
+        start = time.perf_counter()
+        responder.generate_response(f"{body} [draft]", subject, use_cache=False)
+        latencies.append(time.perf_counter() - start)
+    results['draft'] = latency_summary(latencies)
+
+    # Time until the first reply text, as the streaming UI shows it
+    latencies = []
+    for body, subject in samples:
+        start = time.perf_counter()
+        for _, _, reply, _ in responder.generate_response_stream(f"{body} [stream]", subject, use_cache=False):
+            if reply:
+                latencies.append(time.perf_counter() - start)
+                break
+    results['first_token'] = latency_summary(latencies)
+    return results
+
+
+def environment():
+    """
+    Describe the machine and code revision the benchmark ran on.
+
+    :return: Dictionary of environment details.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def flatten(results, prefix=''):
+    """
+    Flatten nested numeric results into dotted metric names.
+
+    :param results: Nested result dictionary.
+    :param prefix: Name prefix of the current level.
+    :return: Dictionary of metric name to value.
+    """
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare(current, baseline, tolerance):
+    """
+    Print the change of every metric against a baseline run.
+
+    Latencies, durations and peak memory are better when lower; everything else
+    (throughput, reduction ratios) is better when higher.
+
+    :param current: Results of this run.
+    :param baseline: Results of the baseline run.
+    :param tolerance: Relative change beyond which a worse value counts as a regression.
+    :return: Number of regressions.
+    """
+    current_metrics = flatten(current['results'])
+    baseline_metrics = flatten(baseline['results'])
+    regressions = 0
+    print(f"\nCompared with {baseline['environment'].get('commit')} ({baseline['environment'].get('timestamp')}):")
+    for name in sorted(set(current_metrics) & set(baseline_metrics)):
+        before, after = baseline_metrics[name], current_metrics[name]
+        # Counts and the mailbox size describe the workload rather than its performance
+        if name.endswith(('requests', 'messages', 'files', 'chunks', 'mailbox_mb')) or before == 0:
+            continue
+        change = (after - before) / abs(before)
+        lower_is_better = name.endswith(('_ms', 'seconds')) or name.startswith('peak_rss_mb')
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        regressions += worse
+        print(f"{name:<48} {before:>12.2f} -> {after:>12.2f}  {change:>+7.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def report(results):
+    """
+    Print the headline results.
+
+    :param results: Result dictionary.
+    """
+    for size, modes in results['fetch'].items():
+        for mode in ('full', 'lazy'):
+            print(f"fetch {size:>6} emails ({mode}) {modes[mode]['messages_per_second']:>10.1f} msg/s")
+    print(f"smtp send                   {results['smtp']['per_second']:>10.1f} msg/s  p95 {results['smtp']['p95_ms']:>7.1f} ms")
+    if 'ingest' in results:
+        print(f"ingestion                   {results['ingest']['chunks_per_second']:>10.1f} chunks/s")
+    for stage in ('classify', 'retrieval', 'draft', 'first_token'):
+        if stage in results.get('models', {}):
+            stats = results['models'][stage]
+            print(f"{stage:<27} p50 {stats['p50_ms']:>9.1f} ms  p95 {stats['p95_ms']:>9.1f} ms")
+    print(f"peak RSS                    {max(results['peak_rss_mb'].values()):>10.0f} MB")
+
+
+def main():
+    """
+    Run the benchmark stages against the local stand-ins and write the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mailbox-sizes', default='100,1000', help="comma-separated synthetic mailbox sizes")
+    parser.add_argument('--attachment-ratio', type=float, default=0.2, help="fraction of emails with an attachment")
+    parser.add_argument('--attachment-kb', type=int, default=64, help="attachment size in kilobytes")
+    parser.add_argument('--fetch-batch-size', type=int, default=config.FETCH_BATCH_SIZE, help="messages per UID FETCH")
+    parser.add_argument('--imap-latency-ms', type=float, default=0.0, help="simulated IMAP round-trip time")
+    parser.add_argument('--docs', type=int, default=20, help="number of guideline PDFs to ingest")
+    parser.add_argument('--pages', type=int, default=3, help="pages per guideline PDF")
+    parser.add_argument('--requests', type=int, default=20, help="emails classified, retrieved for and drafted")
+    parser.add_argument('--token-latency-ms', type=float, default=20.0, help="Ollama stub delay per generated token")
+    parser.add_argument('--reply-tokens', type=int, default=60, help="tokens per stub reply")
+    parser.add_argument('--prefill-ms', type=float, default=50.0, help="Ollama stub delay per 1000 prompt tokens")
+    parser.add_argument('--backend', default=config.VECTOR_BACKEND, choices=['chroma', 'memmap'], help="vector store backend")
+    parser.add_argument('--inference-backend', default=config.INFERENCE_BACKEND, choices=['torch', 'onnx'],
+                        help="embedding and zero-shot model backend")
+    parser.add_argument('--tiny', action='store_true', help="use small embedding and zero-shot models")
+    parser.add_argument('--embed-model', help="embedding model to use instead of the configured one")
+    parser.add_argument('--zero-shot-model', help="zero-shot model to use instead of the configured one")
+    parser.add_argument('--offline', action='store_true', help="load models from the HuggingFace cache only")
+    parser.add_argument('--skip-models', action='store_true', help="only benchmark fetching and sending")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/end_to_end-<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier result file to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 when a metric regressed")
+    args = parser.parse_args()
+    if args.offline:
+        os.environ['HF_HUB_OFFLINE'] = '1'
+        os.environ['TRANSFORMERS_OFFLINE'] = '1'
+
+    imap = FakeIMAPServer(args.imap_latency_ms).start()
+    smtp = FakeSMTPServer().start()
+    ollama = FakeOllamaServer(args.token_latency_ms, args.reply_tokens, args.prefill_ms, config.OLLAMA_MODEL).start()
+    results = {'peak_rss_mb': {}}
+    with tempfile.TemporaryDirectory() as work_dir:
+        settings = configure(args, work_dir, ollama.url)
+        try:
+            sizes = [int(size) for size in args.mailbox_sizes.split(',')]
+            results['fetch'], store_path = bench_fetch(imap, sizes, work_dir, args)
+            results['peak_rss_mb']['fetch'] = max_rss_mb()
+
+            store = EmailStore(store_path)
+            emails = [email for email in store.page(0, max(sizes)) if email['Body']]
+            store.close()
+            results['smtp'] = bench_smtp(smtp, emails[:200])
+            results['peak_rss_mb']['smtp'] = max_rss_mb()
+
+            if not args.skip_models:
+                results['ingest'] = bench_ingest(work_dir, args)
+                results['peak_rss_mb']['ingest'] = max_rss_mb()
+                results['models'] = bench_models(emails, args)
+                results['models']['llm_requests'] = ollama.server.requests
+                results['peak_rss_mb']['models'] = max_rss_mb()
+        finally:
+            imap.close()
+            smtp.close()
+            ollama.close()
+
+    run = {
+        'environment': environment(),
+        'settings': {**vars(args), **{name: value for name, value in settings.items() if not name.endswith('_PATH')}},
+        'results': results,
+    }
+    report(results)
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"end_to_end-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(run, json.load(f), args.tolerance)
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
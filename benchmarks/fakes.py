@@ -0,0 +1,664 @@
+"""
+Local stand-ins for the IMAP, SMTP and Ollama servers, and synthetic mailboxes and guideline PDFs.
+
+Everything runs on background threads in the benchmark process and listens on
+127.0.0.1, so the end-to-end benchmark needs no network access or accounts.
+"""
+
+import email
+import email.policy
+import email.utils
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CRLF_POLICY = email.policy.default.clone(linesep='\r\n')
+
+SENTENCES = {
+    'Positive': [
+        "Thank you so much for the quick delivery, the package arrived a day early.",
+        "Your support team was incredibly helpful and solved my problem in minutes.",
+        "I am very happy with the replacement and will definitely order again.",
+        "The new subscription plan works perfectly for our team.",
+    ],
+    'Negative': [
+        "My order is two weeks late and nobody has answered my previous emails.",
+        "The item arrived broken and I was charged twice for it.",
+        "I am extremely disappointed with the service and want a full refund.",
+        "This is the third time the app has logged me out and lost my changes.",
+    ],
+    'Neutral': [
+        "Could you tell me when my invoice for March will be available?",
+        "I would like to update the shipping address on my account.",
+        "Please let me know which documents you need for the warranty claim.",
+        "Is it possible to change the delivery date of order 4471?",
+    ],
+}
+
+# (charset, text) pairs exercising non-UTF-8 decoding
+CHARSET_TEXTS = [
+    ('iso-8859-1', "Bonjour, je n'ai toujours pas reçu ma commande. Pourriez-vous vérifier où elle en est ?"),
+    ('windows-1252', "Thanks \u2013 the \u201creplacement\u201d arrived today and works great."),
+    ('koi8-r', "Здравствуйте, мой заказ до сих пор не доставлен. Прошу вернуть деньги."),
+    ('shift_jis', "注文した商品がまだ届いていません。確認をお願いします。"),
+    ('utf-8', "Great service \U0001F44D the refund already showed up on my card, thank you!"),
+]
+
+GUIDELINES = [
+    "Refunds are issued to the original payment method within 14 days of receiving the returned item.",
+    "Customers whose order is more than five business days late are offered free express shipping on their next order.",
+    "Damaged items are replaced without requiring a return when the customer sends a photo of the damage.",
+    "Duplicate charges are reversed by the billing team within two business days of being reported.",
+    "Support replies should acknowledge the customer's feelings before describing the next steps.",
+    "Warranty claims require the order number, the date of purchase and a short description of the fault.",
+    "Subscription plans can be changed at any time and the difference is prorated on the next invoice.",
+    "Invoices are available in the account portal on the first business day of the following month.",
+    "Shipping addresses can be changed until the order has been handed to the carrier.",
+    "Repeated sign-out problems are escalated to the engineering team with the customer's device details.",
+]
+
+
+class BackgroundServer:
+    """
+    Runs a socketserver server on a daemon thread.
+    """
+
+    def start(self):
+        """
+        Starts serving in the background.
+
+        :return: The server itself.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def address(self):
+        """
+        :return: Tuple of (host, port) the server listens on.
+        """
+        return self.server.server_address[:2]
+
+    def close(self):
+        """
+        Stops serving and closes the listening socket.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _quote(value):
+    """
+    Quotes a string for an IMAP response.
+
+    :param value: String to quote.
+    :return: Quoted string.
+    """
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _param_list(params):
+    """
+    Formats MIME parameters as an IMAP parenthesized list.
+
+    :param params: List of (name, value) pairs.
+    :return: Parenthesized list, or NIL when there are no parameters.
+    """
+    if not params:
+        return 'NIL'
+    return '(' + ' '.join(f"{_quote(name)} {_quote(value)}" for name, value in params) + ')'
+
+
+def encoded_payload(part):
+    """
+    Returns the payload of a leaf part as it is on the wire, before transfer decoding.
+
+    :param part: email.message.Message leaf part.
+    :return: Payload bytes.
+    """
+    if part.get('Content-Transfer-Encoding', '7bit').lower() in ('base64', 'quoted-printable'):
+        return part.get_payload().encode('ascii')
+    # 7bit and 8bit payloads are stored undecoded; decode=True hands back their raw bytes
+    return part.get_payload(decode=True)
+
+
+def bodystructure(part):
+    """
+    Builds the IMAP BODYSTRUCTURE of a parsed message, with disposition extension data.
+
+    :param part: email.message.Message parsed with the compat32 policy.
+    :return: BODYSTRUCTURE string.
+    """
+    if part.is_multipart():
+        children = ''.join(bodystructure(child) for child in part.get_payload())
+        params = [(name, value) for name, value in (part.get_params() or [])[1:]]
+        return f"({children} {_quote(part.get_content_subtype())} {_param_list(params)} NIL NIL)"
+
+    payload = encoded_payload(part)
+    params = [(name, value) for name, value in (part.get_params() or [])[1:]]
+    fields = [_quote(part.get_content_maintype()), _quote(part.get_content_subtype()), _param_list(params), 'NIL', 'NIL',
+              _quote(part.get('Content-Transfer-Encoding', '7bit')), str(len(payload))]
+    if part.get_content_maintype() == 'text':
+        fields.append(str(payload.count(b'\n')))
+    fields.append('NIL')
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        fields.append(f"({_quote(disposition)} {_param_list([('filename', filename)] if filename else [])})")
+    else:
+        fields.append('NIL')
+    fields.append('NIL')
+    return '(' + ' '.join(fields) + ')'
+
+
+class FakeMessage:
+    """
+    A stored message with everything the fake IMAP server answers FETCH items from.
+    """
+
+    def __init__(self, uid, raw):
+        """
+        Parses the message once.
+
+        :param uid: IMAP UID.
+        :param raw: Message bytes with CRLF line endings.
+        """
+        self.uid = uid
+        self.raw = raw
+        self.message = email.message_from_bytes(raw)
+        self.bodystructure = bodystructure(self.message).encode('utf-8')
+        split = raw.find(b'\r\n\r\n')
+        self.header = raw[:split + 4] if split >= 0 else raw
+        self.text = raw[split + 4:] if split >= 0 else b''
+
+    def header_fields(self, names):
+        """
+        Extracts the given header fields, as BODY[HEADER.FIELDS (...)] does.
+
+        :param names: Upper-case header names.
+        :return: Header lines followed by a blank line.
+        """
+        fields = []
+        for line in self.header.split(b'\r\n'):
+            if line[:1] in (b' ', b'\t') and fields:
+                fields[-1] += b'\r\n' + line
+            elif line:
+                fields.append(line)
+        kept = [field for field in fields if field.split(b':', 1)[0].strip().decode('ascii', 'replace').upper() in names]
+        return b''.join(field + b'\r\n' for field in kept) + b'\r\n'
+
+    def section(self, spec):
+        """
+        Returns the content of a BODY[section] fetch item.
+
+        :param spec: Section specifier, e.g. "", "HEADER.FIELDS (FROM DATE)", "TEXT" or "1.2".
+        :return: Section bytes.
+        """
+        spec = spec.upper()
+        if spec == '':
+            return self.raw
+        if spec == 'HEADER':
+            return self.header
+        if spec == 'TEXT':
+            return self.text
+        if spec.startswith('HEADER.FIELDS'):
+            return self.header_fields(set(spec[spec.index('(') + 1:spec.rindex(')')].split()))
+        part = self.message
+        for number in spec.split('.'):
+            if part.is_multipart():
+                part = part.get_payload()[int(number) - 1]
+            elif number != '1':
+                return b''
+        return encoded_payload(part)
+
+
+def parse_uid_set(uid_set, highest):
+    """
+    Expands an IMAP UID set such as "1:50,60,70:*".
+
+    :param uid_set: UID set string.
+    :param highest: Highest UID in the mailbox, the value of "*".
+    :return: Function telling whether a UID is in the set.
+    """
+    ranges = []
+    for item in uid_set.split(','):
+        bounds = [highest if value == '*' else int(value) for value in item.split(':')]
+        ranges.append((min(bounds), max(bounds)))
+    return lambda uid: any(low <= uid <= high for low, high in ranges)
+
+
+ARGUMENT_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+FETCH_ITEM_PATTERN = re.compile(r'BODY(?:\.PEEK)?\[[^\]]*\]|[A-Z0-9.]+')
+
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    """Serves one IMAP connection."""
+
+    def respond(self, data):
+        """Sends a response after the configured round-trip latency."""
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(data)
+
+    def handle(self):
+        """Answers the commands the email reader uses until the client logs out."""
+        self.user = None
+        self.messages = None
+        self.wfile.write(b'* OK [CAPABILITY IMAP4rev1 UIDPLUS] Fake IMAP ready\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.decode('utf-8', errors='replace').rstrip('\r\n').partition(' ')
+            command, _, arguments = rest.partition(' ')
+            command = command.upper()
+            try:
+                if command == 'UID':
+                    sub_command, _, arguments = arguments.partition(' ')
+                    response = self.uid_command(sub_command.upper(), arguments)
+                else:
+                    response = self.command(command, arguments)
+            except Exception as e:
+                response = f"BAD {e}".encode('utf-8')
+            if response is None:
+                return
+            untagged, _, status = response.rpartition(b'\n')
+            self.respond((untagged + b'\n' if untagged else b'') + tag.encode('ascii') + b' ' + status + b'\r\n')
+            if command == 'LOGOUT':
+                return
+
+    def command(self, command, arguments):
+        """
+        Runs a command other than UID.
+
+        :return: Untagged lines followed by the tagged status, or None to drop the connection.
+        """
+        args = [re.sub(r'\\(.)', r'\1', quoted) or atom for quoted, atom in ARGUMENT_PATTERN.findall(arguments)]
+        if command == 'CAPABILITY':
+            return b'* CAPABILITY IMAP4rev1 UIDPLUS\r\nOK CAPABILITY completed'
+        if command == 'LOGIN':
+            account = self.server.accounts.get(args[0])
+            if account is None or account['password'] != args[1]:
+                return b'NO [AUTHENTICATIONFAILED] Invalid credentials'
+            self.user = args[0]
+            return b'OK LOGIN completed'
+        if command in ('SELECT', 'EXAMINE'):
+            if self.user is None:
+                return b'NO Not authenticated'
+            mailboxes = self.server.accounts[self.user]['mailboxes']
+            name = args[0].upper() if args[0].upper() == 'INBOX' else args[0]
+            if name not in mailboxes:
+                return b'NO Mailbox does not exist'
+            self.messages = mailboxes[name]
+            uidnext = (self.messages[-1].uid if self.messages else 0) + 1
+            return (f"* {len(self.messages)} EXISTS\r\n* 0 RECENT\r\n* FLAGS (\\Seen \\Answered)\r\n"
+                    f"* OK [UIDVALIDITY {self.server.uidvalidity}] UIDs valid\r\n"
+                    f"* OK [UIDNEXT {uidnext}] Predicted next UID\r\nOK [READ-WRITE] {command} completed").encode()
+        if command in ('NOOP', 'CHECK'):
+            return b'OK NOOP completed'
+        if command == 'CLOSE':
+            self.messages = None
+            return b'OK CLOSE completed'
+        if command == 'LOGOUT':
+            return b'* BYE Logging out\r\nOK LOGOUT completed'
+        return f"BAD Unsupported command {command}".encode()
+
+    def uid_command(self, command, arguments):
+        """
+        Runs UID SEARCH or UID FETCH on the selected mailbox.
+
+        :return: Untagged lines followed by the tagged status.
+        """
+        if self.messages is None:
+            return b'NO No mailbox selected'
+        highest = self.messages[-1].uid if self.messages else 0
+        if command == 'SEARCH':
+            criteria = arguments.upper().strip('()').split()
+            if criteria and criteria[0] == 'UID':
+                matches = parse_uid_set(criteria[1], highest)
+                uids = [message.uid for message in self.messages if matches(message.uid)]
+            else:
+                # Messages are only ever fetched with BODY.PEEK, so every message stays unseen
+                uids = [message.uid for message in self.messages]
+            return ('* SEARCH ' + ' '.join(map(str, uids))).rstrip().encode() + b'\r\nOK SEARCH completed'
+        if command == 'FETCH':
+            uid_set, _, spec = arguments.partition(' ')
+            matches = parse_uid_set(uid_set, highest)
+            items = FETCH_ITEM_PATTERN.findall(spec.upper())
+            out = bytearray()
+            for number, message in enumerate(self.messages, start=1):
+                if not matches(message.uid):
+                    continue
+                fields = [b'UID ' + str(message.uid).encode()]
+                for item in items:
+                    if item == 'BODYSTRUCTURE':
+                        fields.append(b'BODYSTRUCTURE ' + message.bodystructure)
+                    elif item == 'FLAGS':
+                        fields.append(b'FLAGS ()')
+                    elif item in ('RFC822', 'RFC822.PEEK') or item.startswith('BODY'):
+                        section = item[item.index('[') + 1:-1] if '[' in item else ''
+                        data = message.section(section)
+                        name = b'RFC822' if item.startswith('RFC822') else f"BODY[{section}]".encode()
+                        fields.append(name + b' {' + str(len(data)).encode() + b'}\r\n' + data)
+                out += b'* ' + str(number).encode() + b' FETCH (' + b' '.join(fields) + b')\r\n'
+            return bytes(out) + b'OK FETCH completed'
+        return f"BAD Unsupported UID command {command}".encode()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeIMAPServer(BackgroundServer):
+    """
+    An in-memory IMAP server with the subset of IMAP4rev1 the email reader uses.
+
+    It supports LOGIN, SELECT, UID SEARCH (UNSEEN and UID ranges) and UID FETCH of
+    UID, FLAGS, BODYSTRUCTURE and BODY.PEEK sections, answering after an optional
+    per-command latency to emulate a remote server.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        """
+        Binds to a free local port.
+
+        :param latency_ms: Delay before every response, in milliseconds.
+        """
+        self.server = _ThreadingTCPServer(('127.0.0.1', 0), _IMAPHandler)
+        self.server.accounts = {}
+        self.server.uidvalidity = int(time.time())
+        self.server.latency = latency_ms / 1000
+
+    def add_mailbox(self, user, password, messages, mailbox='INBOX'):
+        """
+        Creates an account mailbox holding the given messages.
+
+        :param user: Login name.
+        :param password: Password.
+        :param messages: Raw messages with CRLF line endings, stored with UIDs 1..n.
+        :param mailbox: Mailbox name.
+        :return: Total size of the messages in bytes.
+        """
+        account = self.server.accounts.setdefault(user, {'password': password, 'mailboxes': {}})
+        account['mailboxes'][mailbox] = [FakeMessage(uid, raw) for uid, raw in enumerate(messages, start=1)]
+        return sum(len(raw) for raw in messages)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Accepts messages on one SMTP connection."""
+
+    def handle(self):
+        """Answers an SMTP session, keeping every message sent."""
+        self.wfile.write(b'220 localhost Fake ESMTP\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb == b'EHLO':
+                self.wfile.write(b'250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n')
+            elif verb == b'DATA':
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                data = bytearray()
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    data += data_line[1:] if data_line.startswith(b'..') else data_line
+                with self.server.lock:
+                    self.server.messages.append(bytes(data))
+                self.wfile.write(b'250 OK queued\r\n')
+            elif verb == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            elif verb in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.wfile.write(b'250 OK\r\n')
+            else:
+                self.wfile.write(b'502 Command not implemented\r\n')
+
+
+class FakeSMTPServer(BackgroundServer):
+    """
+    A plain-text SMTP sink that accepts and keeps every message.
+    """
+
+    def __init__(self):
+        """
+        Binds to a free local port.
+        """
+        self.server = _ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+        self.server.messages = []
+        self.server.lock = threading.Lock()
+
+    @property
+    def messages(self):
+        """
+        :return: Raw messages received so far.
+        """
+        with self.server.lock:
+            return list(self.server.messages)
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    """Streams canned replies in Ollama's NDJSON format."""
+
+    def log_message(self, format, *args):
+        """Keeps request logs out of the benchmark output."""
+
+    def do_GET(self):
+        """Lists the stub model, as /api/tags does."""
+        self.send_json({'models': [{'name': self.server.model_name}]})
+
+    def send_json(self, message):
+        """Sends a single JSON response."""
+        payload = json.dumps(message).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        """Answers /api/chat and /api/generate with a reply streamed at the configured token rate."""
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        chat = self.path.rstrip('/').endswith('/chat')
+        if chat:
+            prompt = ' '.join(str(message.get('content', '')) for message in request.get('messages', []))
+        else:
+            prompt = request.get('prompt', '')
+        with self.server.lock:
+            self.server.requests += 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        prompt_tokens = max(1, len(prompt) // 4)
+        start = time.perf_counter()
+        time.sleep(self.server.prefill_latency_per_token * prompt_tokens)
+        prefill = time.perf_counter() - start
+        words = self.server.reply.split(' ')
+        for i in range(self.server.reply_tokens):
+            time.sleep(self.server.token_latency)
+            token = words[i % len(words)] + ' '
+            chunk = {'model': request.get('model'), 'done': False}
+            if chat:
+                chunk['message'] = {'role': 'assistant', 'content': token}
+            else:
+                chunk['response'] = token
+            self.wfile.write(json.dumps(chunk).encode('utf-8') + b'\n')
+            self.wfile.flush()
+        final = {
+            'model': request.get('model'), 'done': True,
+            'prompt_eval_count': prompt_tokens, 'prompt_eval_duration': int(prefill * 1e9),
+            'eval_count': self.server.reply_tokens, 'eval_duration': int(self.server.token_latency * self.server.reply_tokens * 1e9),
+        }
+        if chat:
+            final['message'] = {'role': 'assistant', 'content': ''}
+        else:
+            final['response'] = ''
+        self.wfile.write(json.dumps(final).encode('utf-8') + b'\n')
+
+
+class FakeOllamaServer(BackgroundServer):
+    """
+    A stub of the Ollama HTTP API that streams a fixed reply with configurable latency.
+    """
+
+    def __init__(self, token_latency_ms=20.0, reply_tokens=60, prefill_ms_per_1k_tokens=50.0, model_name='mistral'):
+        """
+        Binds to a free local port.
+
+        :param token_latency_ms: Delay before each generated token, in milliseconds.
+        :param reply_tokens: Number of tokens per reply.
+        :param prefill_ms_per_1k_tokens: Delay before the first token per 1000 prompt tokens, in milliseconds.
+        :param model_name: Model name reported by /api/tags.
+        """
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _OllamaHandler)
+        self.server.daemon_threads = True
+        self.server.token_latency = token_latency_ms / 1000
+        self.server.reply_tokens = reply_tokens
+        self.server.prefill_latency_per_token = prefill_ms_per_1k_tokens / 1e6
+        self.server.model_name = model_name
+        self.server.reply = ("Dear customer, thank you for reaching out and we are sorry for the trouble. "
+                             "We have checked your order and a refund has been issued to your original payment method. "
+                             "Please let us know if there is anything else we can do for you. Kind regards, Support")
+        self.server.requests = 0
+        self.server.lock = threading.Lock()
+
+    @property
+    def url(self):
+        """
+        :return: Base URL of the stub.
+        """
+        return f"http://{self.address[0]}:{self.address[1]}"
+
+
+def synthetic_message(rng, index, attachment_ratio=0.2, attachment_kb=64, domain='example.com'):
+    """
+    Builds one synthetic customer email.
+
+    Messages mix plain text, multipart/alternative, HTML-only, non-UTF-8 charsets and
+    replies with quoted history and a signature; some carry a binary attachment.
+
+    :param rng: random.Random used for every choice.
+    :param index: Message number, used for unique IDs.
+    :param attachment_ratio: Fraction of messages with an attachment.
+    :param attachment_kb: Attachment size in kilobytes.
+    :param domain: Domain of the addresses and Message-IDs.
+    :return: Message bytes with CRLF line endings.
+    """
+    label = rng.choice(list(SENTENCES))
+    text = ' '.join(rng.sample(SENTENCES[label], 2)) + f"\n\nOrder reference: {rng.randint(10000, 99999)}\n"
+    kind = rng.choice(['plain', 'alternative', 'html', 'charset', 'reply'])
+
+    msg = EmailMessage()
+    msg['From'] = f"Customer {index} <customer{index}@{domain}>"
+    msg['To'] = f"support@{domain}"
+    msg['Date'] = email.utils.formatdate(time.time() - 60 * index, localtime=True)
+    msg['Message-ID'] = f"<bench-{index}-{rng.getrandbits(32):08x}@{domain}>"
+    msg['Subject'] = f"Order question #{index}"
+
+    if kind == 'charset':
+        charset, text = rng.choice(CHARSET_TEXTS)
+        msg.replace_header('Subject', text[:30])
+        msg.set_content(text, charset=charset)
+    elif kind == 'html':
+        msg.set_content(f"<html><body><p>{'</p><p>'.join(text.splitlines())}</p>"
+                        f"<div class=\"footer\">Sent from my phone</div></body></html>", subtype='html')
+    elif kind == 'reply':
+        msg['In-Reply-To'] = f"<support-{index}@{domain}>"
+        msg['References'] = f"<support-{index}@{domain}>"
+        msg.replace_header('Subject', f"Re: Order question #{index}")
+        quoted = '\n'.join('> ' + line for line in rng.choice(GUIDELINES).split('. '))
+        msg.set_content(f"{text}\nOn Mon, 3 Jun 2024 at 10:12, Support <support@{domain}> wrote:\n{quoted}\n\n"
+                        f"--\nCustomer {index}\nSent from my phone\n")
+    else:
+        msg.set_content(text)
+        if kind == 'alternative':
+            msg.add_alternative(f"<html><body><p>{'<br>'.join(text.splitlines())}</p></body></html>", subtype='html')
+
+    if rng.random() < attachment_ratio:
+        msg.add_attachment(rng.randbytes(attachment_kb * 1024), maintype='application', subtype='pdf',
+                           filename=f"invoice-{index}.pdf")
+    return msg.as_bytes(policy=CRLF_POLICY)
+
+
+def synthetic_mailbox(count, seed=0, attachment_ratio=0.2, attachment_kb=64):
+    """
+    Builds a reproducible mailbox of synthetic customer emails.
+
+    :param count: Number of messages.
+    :param seed: Random seed.
+    :param attachment_ratio: Fraction of messages with an attachment.
+    :param attachment_kb: Attachment size in kilobytes.
+    :return: List of message bytes.
+    """
+    rng = random.Random(seed)
+    return [synthetic_message(rng, index, attachment_ratio, attachment_kb) for index in range(1, count + 1)]
+
+
+def _pdf_escape(text):
+    """Escapes a line for a PDF string literal."""
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, pages):
+    """
+    Writes a minimal text-only PDF.
+
+    :param path: Output path.
+    :param pages: List of pages, each a list of ASCII text lines.
+    """
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    page_ids = []
+    for lines in pages:
+        stream = ('BT /F1 10 Tf 14 TL 50 800 Td ' + ' '.join(f"({_pdf_escape(line)}) '" for line in lines) + ' ET').encode('latin-1')
+        objects.append(b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream')
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>".encode())
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b''.join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def synthetic_guidelines(directory, count, pages=3, seed=0):
+    """
+    Writes reproducible customer-support guideline PDFs to ingest.
+
+    :param directory: Output directory.
+    :param count: Number of PDF files.
+    :param pages: Pages per file.
+    :param seed: Random seed.
+    :return: List of written paths.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for number in range(count):
+        document = []
+        for page in range(pages):
+            lines = [f"Support guideline {number}.{page}"]
+            for _ in range(12):
+                sentence = f"Case {rng.randint(100, 999)}: " + rng.choice(GUIDELINES)
+                lines.extend(sentence[i:i + 90] for i in range(0, len(sentence), 90))
+            document.append(lines[:55])
+        path = f"{directory}/guidelines-{number:03d}.pdf"
+        write_pdf(path, document)
+        paths.append(path)
+    return paths
@@ -0,0 +1,160 @@
+"""
+Throughput benchmark of in-process models against the shared model server.
+
+Usage:
+    python benchmarks/model_server.py --clients 8 --requests 25
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import EMAIL_STORE_PATH, EMBED_MODEL_NAME, TEXT_LABELS, ZERO_SHOT_MODEL
+from Email_Reader.email_store import EmailStore
+from utils.micro_batcher import MicroBatcher, BatchedEmbeddings, percentile
+from utils.model_server import ModelClient, RemoteEmbeddings
+
+
+def load_bodies(limit):
+    """
+    Read email bodies from the mailbox store.
+
+    :param limit: Maximum number of emails.
+    :return: List of email bodies.
+    """
+    store = EmailStore(EMAIL_STORE_PATH)
+    bodies = [email['Clean Body'] or email['Body'] for email in store.page(0, limit) if email['Body']]
+    store.close()
+    return bodies
+
+
+def run_clients(call, bodies, clients, requests, tag):
+    """
+    Issue requests from concurrent client threads, as several workers or sessions would.
+
+    Every request text is made unique so that the sentiment and embedding caches never
+    answer instead of the models.
+
+    :param call: Function taking one email body.
+    :param bodies: Email bodies to cycle through.
+    :param clients: Number of client threads.
+    :param requests: Requests per client.
+    :param tag: Scenario name added to every request text.
+    :return: Tuple of (requests per second, latencies in seconds).
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(requests):
+            start = time.perf_counter()
+            call(f"{bodies[(offset * requests + i) % len(bodies)]}\n[{tag} {offset}-{i}-{time.time()}]")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def report(name, rate, latencies):
+    """
+    Print one result line.
+
+    :param name: Scenario name.
+    :param rate: Requests per second.
+    :param latencies: Latencies in seconds.
+    """
+    print(f"{name:<28} {rate:>8.1f} req/s  p50 {1000 * percentile(latencies, 50):>7.1f} ms  "
+          f"p95 {1000 * percentile(latencies, 95):>7.1f} ms")
+
+
+def max_rss_mb():
+    """
+    Peak resident memory of this process.
+
+    :return: Megabytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def process_rss_mb(pid):
+    """
+    Current and peak resident memory of another process.
+
+    :param pid: Process ID.
+    :return: Tuple of (current, peak) megabytes.
+    """
+    sizes = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'VmHWM'):
+                sizes[name] = int(value.split()[0]) / 1024
+    return sizes.get('VmRSS', 0.0), sizes.get('VmHWM', 0.0)
+
+
+def main():
+    """
+    Run the same concurrent classify and embed load against the model server and against in-process models.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help="concurrent client threads")
+    parser.add_argument('--requests', type=int, default=25, help="requests per client")
+    parser.add_argument('--limit', type=int, default=200, help="number of stored emails to use")
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.limit)
+    if not bodies:
+        raise SystemExit(f"No emails found in {EMAIL_STORE_PATH}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        socket_path = os.path.join(work_dir, 'models.sock')
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve_models.py'), '--socket', socket_path], cwd=ROOT)
+        try:
+            start = time.perf_counter()
+            while not os.path.exists(socket_path):
+                if server.poll() is not None:
+                    raise SystemExit("Model server failed to start; see logs/app.log")
+                time.sleep(0.2)
+            print(f"Model server ready in {time.perf_counter() - start:.1f}s")
+
+            client = ModelClient(socket_path)
+            remote_embeddings = RemoteEmbeddings(client)
+            report("remote classify", *run_clients(client.classify, bodies, args.clients, args.requests, 'rc'))
+            report("remote embed_query", *run_clients(remote_embeddings.embed_query, bodies, args.clients, args.requests, 're'))
+            # Measured before any model is loaded here, so this is the footprint of a thin worker
+            print(f"Client process peak RSS:     {max_rss_mb():.0f} MB (paid by every worker process)")
+            # The models moved into the server, which is paid once however many workers share it
+            server_rss, server_peak = process_rss_mb(server.pid)
+            print(f"Model server RSS:            {server_rss:.0f} MB, peak {server_peak:.0f} MB (paid once)")
+        finally:
+            server.terminate()
+            server.wait()
+
+        from utils.embedding_cache import load_embed_model
+        from utils.sentiment_classifier import SentimentClassifier
+
+        classifier = SentimentClassifier(ZERO_SHOT_MODEL, TEXT_LABELS, cache_path=os.path.join(work_dir, 'cache.db'))
+        batcher = MicroBatcher("classifier", classifier.classify_batch)
+        embeddings = BatchedEmbeddings(load_embed_model(EMBED_MODEL_NAME))
+        report("in-process classify", *run_clients(lambda body: batcher.submit(body).result(), bodies,
+                                                     args.clients, args.requests, 'lc'))
+        report("in-process embed_query", *run_clients(embeddings.embed_query, bodies, args.clients, args.requests, 'le'))
+        print(f"In-process peak RSS:         {max_rss_mb():.0f} MB (paid again by every worker process)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Parity and latency check of the quantized ONNX Runtime models against the PyTorch ones.
+
+Usage:
+    python benchmarks/onnx_parity.py --limit 500 --threads 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from config import EMAIL_STORE_PATH, EMBED_MODEL_NAME, TEXT_LABELS, ZERO_SHOT_MODEL
+from Email_Reader.email_store import EmailStore
+
+
+def load_bodies(limit):
+    """
+    Read email bodies from the mailbox store.
+
+    :param limit: Maximum number of emails.
+    :return: List of email bodies.
+    """
+    store = EmailStore(EMAIL_STORE_PATH)
+    bodies = [email['Clean Body'] or email['Body'] for email in store.page(0, limit) if email['Body']]
+    store.close()
+    return bodies
+
+
+def timed(call, *args):
+    """
+    Run a call and measure it.
+
+    :param call: Callable to run.
+    :param args: Arguments of the call.
+    :return: Tuple of (result, seconds).
+    """
+    start = time.perf_counter()
+    result = call(*args)
+    return result, time.perf_counter() - start
+
+
+def compare_embeddings(bodies):
+    """
+    Embed the bodies with both backends.
+
+    :param bodies: Email bodies.
+    :return: Tuple of (cosine similarities, nearest-neighbour agreement, PyTorch seconds, ONNX seconds).
+    """
+    import numpy as np
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from utils.onnx_backend import OnnxEmbeddings
+
+    reference, torch_seconds = timed(HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME).embed_documents, bodies)
+    quantized, onnx_seconds = timed(OnnxEmbeddings(EMBED_MODEL_NAME).embed_documents, bodies)
+
+    reference = np.array(reference, dtype=np.float32)
+    quantized = np.array(quantized, dtype=np.float32)
+    reference /= np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    quantized /= np.maximum(np.linalg.norm(quantized, axis=1, keepdims=True), 1e-12)
+    cosines = (reference * quantized).sum(axis=1)
+
+    # Retrieval only depends on the ranking, so compare each body's nearest other body
+    neighbours = []
+    for vectors in (reference, quantized):
+        similarities = vectors @ vectors.T
+        np.fill_diagonal(similarities, -np.inf)
+        neighbours.append(similarities.argmax(axis=1))
+    agreement = float((neighbours[0] == neighbours[1]).mean()) if len(bodies) > 1 else 1.0
+    return cosines, agreement, torch_seconds, onnx_seconds
+
+
+def compare_labels(bodies):
+    """
+    Classify the bodies with both backends, each with a fresh result cache.
+
+    :param bodies: Email bodies.
+    :return: Tuple of (PyTorch results, ONNX results, PyTorch seconds, ONNX seconds).
+    """
+    from utils.sentiment_classifier import SentimentClassifier
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        reference = SentimentClassifier(ZERO_SHOT_MODEL, TEXT_LABELS, cache_path=os.path.join(cache_dir, 'torch.db'),
+                                        backend='torch')
+        quantized = SentimentClassifier(ZERO_SHOT_MODEL, TEXT_LABELS, cache_path=os.path.join(cache_dir, 'onnx.db'),
+                                        backend='onnx')
+        reference_results, torch_seconds = timed(reference.classify_batch, bodies)
+        quantized_results, onnx_seconds = timed(quantized.classify_batch, bodies)
+    return reference_results, quantized_results, torch_seconds, onnx_seconds
+
+
+def main():
+    """
+    Run both backends over the stored emails and report parity and latency.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limit', type=int, default=500, help="number of stored emails to compare on")
+    parser.add_argument('--threads', type=int, default=config.ONNX_INTRA_OP_THREADS, help="ONNX Runtime intra-op threads")
+    parser.add_argument('--min-cosine', type=float, default=0.99, help="lowest acceptable mean cosine similarity")
+    parser.add_argument('--min-agreement', type=float, default=0.95, help="lowest acceptable label agreement")
+    args = parser.parse_args()
+
+    # Must be set before the model modules read it
+    config.ONNX_INTRA_OP_THREADS = args.threads
+    import numpy as np
+
+    bodies = load_bodies(args.limit)
+    if not bodies:
+        raise SystemExit(f"No emails found in {EMAIL_STORE_PATH}")
+
+    cosines, neighbour_agreement, embed_torch, embed_onnx = compare_embeddings(bodies)
+    reference, quantized, classify_torch, classify_onnx = compare_labels(bodies)
+    agreement = sum(ref[0] == new[0] for ref, new in zip(reference, quantized)) / len(bodies)
+    score_gap = sum(abs(ref[1] - new[1]) for ref, new in zip(reference, quantized)) / len(bodies)
+
+    print(f"Emails:                          {len(bodies)}")
+    print(f"Embedding cosine (mean / min):   {cosines.mean():.4f} / {cosines.min():.4f}")
+    print(f"Embedding cosine (p5):           {np.percentile(cosines, 5):.4f}")
+    print(f"Nearest-neighbour agreement:     {neighbour_agreement:.1%}")
+    print(f"Embedding latency torch / onnx:  {1000 * embed_torch / len(bodies):.1f} / "
+          f"{1000 * embed_onnx / len(bodies):.1f} ms/email ({embed_torch / embed_onnx:.1f}x)")
+    print(f"Label agreement:                 {agreement:.1%}")
+    print(f"Mean top-label score gap:        {score_gap:.4f}")
+    print(f"Classifier latency torch / onnx: {1000 * classify_torch / len(bodies):.1f} / "
+          f"{1000 * classify_onnx / len(bodies):.1f} ms/email ({classify_torch / classify_onnx:.1f}x)")
+
+    if cosines.mean() < args.min_cosine or agreement < args.min_agreement:
+        raise SystemExit("Quantized models are below the parity thresholds; keep INFERENCE_BACKEND = \"torch\"")
+
+
+if __name__ == "__main__":
+    main()
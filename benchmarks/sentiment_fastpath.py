@@ -0,0 +1,80 @@
+"""
+Offline benchmark of the embedding fast-path sentiment classifier against the zero-shot model.
+
+Usage:
+    python benchmarks/sentiment_fastpath.py --limit 500 --threshold 0.05
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EMAIL_STORE_PATH, EMBED_MODEL_NAME, FAST_SENTIMENT_MARGIN, SENTIMENT_SEED_PATH, TEXT_LABELS, ZERO_SHOT_MODEL
+from Email_Reader.email_store import EmailStore
+from utils.sentiment_classifier import PrototypeClassifier, SentimentClassifier
+
+
+def load_bodies(limit):
+    """
+    Read email bodies from the mailbox store.
+
+    :param limit: Maximum number of emails.
+    :return: List of email bodies.
+    """
+    store = EmailStore(EMAIL_STORE_PATH)
+    bodies = [email['Body'] for email in store.page(0, limit) if email['Body']]
+    store.close()
+    return bodies
+
+
+def main():
+    """
+    Run both classifiers over the stored emails and report agreement and latency.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limit', type=int, default=500, help="number of stored emails to classify")
+    parser.add_argument('--threshold', type=float, default=FAST_SENTIMENT_MARGIN, help="fast-path margin threshold")
+    parser.add_argument('--seed', default=SENTIMENT_SEED_PATH, help="JSON lines seed file for the prototypes")
+    args = parser.parse_args()
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    bodies = load_bodies(args.limit)
+    if not bodies:
+        raise SystemExit(f"No emails found in {EMAIL_STORE_PATH}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A fresh cache directory keeps the zero-shot timings honest
+        zero_shot = SentimentClassifier(ZERO_SHOT_MODEL, TEXT_LABELS, cache_path=os.path.join(cache_dir, 'cache.db'))
+        start = time.perf_counter()
+        reference = zero_shot.classify_batch(bodies)
+        zero_shot_seconds = time.perf_counter() - start
+
+    embed_model = HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
+    fast = PrototypeClassifier(embed_model, TEXT_LABELS, args.seed)
+    start = time.perf_counter()
+    predictions = fast.classify_batch(bodies)
+    fast_seconds = time.perf_counter() - start
+
+    accepted = [(label, ref[0]) for (label, _, margin), ref in zip(predictions, reference) if margin >= args.threshold]
+    agreement = sum(label == ref[0] for (label, _, _), ref in zip(predictions, reference)) / len(bodies)
+    accepted_agreement = sum(label == ref for label, ref in accepted) / len(accepted) if accepted else 0.0
+    fallback_share = 1 - len(accepted) / len(bodies)
+    hybrid_seconds = fast_seconds + zero_shot_seconds * fallback_share
+
+    print(f"Emails:                          {len(bodies)}")
+    print(f"Zero-shot latency:               {1000 * zero_shot_seconds / len(bodies):.1f} ms/email")
+    print(f"Fast-path latency:               {1000 * fast_seconds / len(bodies):.1f} ms/email")
+    print(f"Agreement (all emails):          {agreement:.1%}")
+    print(f"Accepted at margin {args.threshold:.3f}:      {len(accepted) / len(bodies):.1%}")
+    print(f"Agreement (accepted emails):     {accepted_agreement:.1%}")
+    print(f"Estimated hybrid latency:        {1000 * hybrid_seconds / len(bodies):.1f} ms/email "
+          f"({zero_shot_seconds - hybrid_seconds:.1f}s saved)")
+
+
+if __name__ == "__main__":
+    main()
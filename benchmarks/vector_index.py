@@ -0,0 +1,186 @@
+"""
+Benchmark of the in-process memmap vector index against the Chroma store built by ingset.py.
+
+Each backend is opened and queried in its own process, so that its open time, latency and
+resident memory are measured on equal terms.
+
+Usage:
+    python benchmarks/vector_index.py --queries 200 --k 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_PATH, IVF_NLIST, IVF_NPROBE
+from utils.vector_index import MemmapVectorIndex
+
+
+def percentile_ms(seconds, q):
+    """
+    Convert a latency percentile to milliseconds.
+
+    :param seconds: List of latencies in seconds.
+    :param q: Percentile between 0 and 100.
+    :return: Latency in milliseconds.
+    """
+    return 1000 * float(np.percentile(seconds, q))
+
+
+def rss_mb(field='VmRSS'):
+    """
+    Read the memory use of the current process.
+
+    :param field: 'VmRSS' for the current resident set size, 'VmHWM' for its peak.
+    :return: Size in megabytes.
+    """
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def timed_search(search, queries):
+    """
+    Run a search function over every query.
+
+    :param search: Function taking a query vector and returning documents.
+    :param queries: Query vectors.
+    :return: Tuple of (results, latencies in seconds).
+    """
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def open_backend(name, index_dir, args):
+    """
+    Open one backend and return its search function.
+
+    :param name: 'chroma', 'memmap exact' or 'memmap ivf'.
+    :param index_dir: Directory holding the memmap indexes.
+    :param args: Parsed command line arguments.
+    :return: Function taking a query vector and returning documents.
+    """
+    if name == 'chroma':
+        from langchain.vectorstores import Chroma
+
+        chroma = Chroma(persist_directory=DB_PATH)
+        chroma._collection.count()
+        return lambda q: chroma.similarity_search_by_vector(q.tolist(), k=args.k)
+    mode = name.split()[1]
+    index = MemmapVectorIndex(os.path.join(index_dir, mode), None, mode=mode, nlist=args.nlist, nprobe=args.nprobe)
+    return lambda q: index.similarity_search_by_vector(q, k=args.k)
+
+
+def measure(name, index_dir, args, results):
+    """
+    Open a backend and run the queries in a fresh process, reporting time and memory.
+
+    :param name: Backend name.
+    :param index_dir: Directory holding the memmap indexes and the query vectors.
+    :param args: Parsed command line arguments.
+    :param results: Queue receiving the measurements.
+    """
+    if name == 'chroma':
+        # Library imports are not part of the store's memory
+        import langchain.vectorstores
+    queries = np.load(os.path.join(index_dir, 'queries.npy'))
+    baseline = rss_mb()
+    start = time.perf_counter()
+    search = open_backend(name, index_dir, args)
+    open_seconds = time.perf_counter() - start
+    opened = rss_mb()
+    docs, latencies = timed_search(search, queries)
+    results.put({
+        'open_seconds': open_seconds,
+        'latencies': latencies,
+        'texts': [[doc.page_content for doc in found] for found in docs],
+        'open_mb': opened - baseline,
+        'query_mb': rss_mb() - baseline,
+        'peak_mb': rss_mb('VmHWM'),
+    })
+
+
+def run_isolated(name, index_dir, args):
+    """
+    Measure a backend in a separate process.
+
+    :param name: Backend name.
+    :param index_dir: Directory holding the memmap indexes and the query vectors.
+    :param args: Parsed command line arguments.
+    :return: Measurements of the backend.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=measure, args=(name, index_dir, args, results))
+    process.start()
+    measured = results.get()
+    process.join()
+    return measured
+
+
+def main():
+    """
+    Copy the Chroma vectors into memmap indexes and compare open time, query latency, memory and recall.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=200, help="number of query vectors")
+    parser.add_argument('--k', type=int, default=4, help="number of documents per query")
+    parser.add_argument('--nlist', type=int, default=IVF_NLIST, help="IVF clusters")
+    parser.add_argument('--nprobe', type=int, default=IVF_NPROBE, help="IVF clusters scanned per query")
+    args = parser.parse_args()
+
+    from langchain.vectorstores import Chroma
+
+    # Reading every vector is only needed to build the memmap copies; it is not part of Chroma's open time
+    data = Chroma(persist_directory=DB_PATH)._collection.get(include=['embeddings', 'documents', 'metadatas'])
+    if not data['ids']:
+        raise SystemExit(f"No vectors found in {DB_PATH}; run ingset.py first")
+
+    vectors = np.asarray(data['embeddings'], dtype=np.float32)
+    # Perturbed copies of stored vectors stand in for real queries without loading the embedding model
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = queries + rng.normal(scale=0.1 * float(np.abs(vectors).mean()), size=queries.shape).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        np.save(os.path.join(index_dir, 'queries.npy'), queries)
+        exact = MemmapVectorIndex(os.path.join(index_dir, 'exact'), None, mode='exact')
+        exact.add_embeddings(data['documents'], vectors, data['metadatas'], data['ids'])
+        exact.persist()
+        ivf = MemmapVectorIndex(os.path.join(index_dir, 'ivf'), None, mode='ivf', nlist=args.nlist, nprobe=args.nprobe)
+        ivf.add_embeddings(data['documents'], vectors, data['metadatas'], data['ids'])
+        start = time.perf_counter()
+        ivf.persist()
+        ivf_build_seconds = time.perf_counter() - start
+        index_mb = sum(os.path.getsize(os.path.join(index_dir, 'exact', name))
+                       for name in os.listdir(os.path.join(index_dir, 'exact'))) / 1024 / 1024
+        del exact, ivf, data
+
+        runs = {name: run_isolated(name, index_dir, args) for name in ('chroma', 'memmap exact', 'memmap ivf')}
+
+    reference = [set(texts) for texts in runs['memmap exact']['texts']]
+    print(f"Vectors:                {len(vectors)} x {vectors.shape[1]}")
+    print(f"Memmap index size:      {index_mb:.1f} MB")
+    print(f"IVF build:              {ivf_build_seconds:.2f}s ({args.nlist} clusters, {args.nprobe} probed)")
+    for name, run in runs.items():
+        recall = np.mean([len(set(texts) & ref) / max(len(ref), 1) for texts, ref in zip(run['texts'], reference)])
+        print(f"{name:<23} open {1000 * run['open_seconds']:.1f} ms, p50 {percentile_ms(run['latencies'], 50):.2f} ms, "
+              f"p95 {percentile_ms(run['latencies'], 95):.2f} ms, recall@{args.k} vs exact {recall:.1%}")
+        print(f"{'':<23} RSS +{run['open_mb']:.1f} MB after open, +{run['query_mb']:.1f} MB after queries, "
+              f"peak {run['peak_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
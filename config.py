@@ -1,18 +1,123 @@
 DATA_PATH = "Data"
 DB_PATH = "vectorstores/db/"
+# File and chunk content hashes of everything ingested into DB_PATH
+INGEST_MANIFEST_PATH = "vectorstores/manifest.json"
+# Streaming ingestion: parser processes (None = one per CPU), chunks per embedding batch,
+# and batches allowed to wait between pipeline stages
+INGEST_WORKERS = None
+EMBED_BATCH_SIZE = 64
+INGEST_QUEUE_SIZE = 4
 EMBED_MODEL_NAME = "WhereIsAI/UAE-Large-V1"
+# On-disk embedding cache shared by ingestion and retrieval, evicting least recently used vectors when full
+EMBED_CACHE_ENABLED = True
+EMBED_CACHE_PATH = "vectorstores/embedding_cache"
+EMBED_CACHE_MAX_MB = 512
+# Vector store backend: "chroma", or "memmap" for the in-process NumPy index (re-run ingset.py --rebuild after switching)
+VECTOR_BACKEND = "chroma"
+# Memmap index search: "exact" top-k, or "ivf" to scan only the IVF_NPROBE closest of IVF_NLIST clusters
+VECTOR_INDEX_MODE = "exact"
+IVF_NLIST = 64
+IVF_NPROBE = 8
 # Configuration settings for the application
 
 # Email Reader Configuration
 IMAP_ENDPOINT = "imap-mail.outlook.com"
+SMTP_ENDPOINT = "smtp-mail.outlook.com"
+SMTP_PORT = 587
+
+# Pooled IMAP/SMTP sessions: probe with NOOP after this many idle seconds, close after the idle timeout
+SESSION_KEEPALIVE_INTERVAL = 60
+SESSION_IDLE_TIMEOUT = 600
+
+# IMAP IDLE push ingestion: re-issue IDLE before the server's 30 minute timeout, cap the reconnect backoff,
+# and poll at this interval on servers without IDLE
+IDLE_RENEW_INTERVAL = 25 * 60
+IDLE_MAX_BACKOFF = 300
+IDLE_POLL_INTERVAL = 60
+
+# Local mailbox store (SQLite). Legacy emails.xlsx files are imported into it once.
+EMAIL_STORE_PATH = "Email_Data/emails.db"
+
+# Number of messages requested per UID FETCH round-trip
+FETCH_BATCH_SIZE = 50
+
+# Fetch headers and BODYSTRUCTURE first, then only the body text part; attachments stay on the server
+LAZY_BODY_FETCH = True
 
 # Zero-shot classification model
 ZERO_SHOT_MODEL = "MoritzLaurer/DeBERTa-v3-base-mnli-fever-anli"
 TEXT_LABELS = ['Positive', 'Negative', 'Neutral']
+CLASSIFIER_BATCH_SIZE = 16
+# Model serving: "inprocess" loads the classifier and embedder in every process; "remote" uses the shared
+# model server started with serve_models.py, listening on MODEL_SERVER_SOCKET
+MODEL_SERVER_MODE = "inprocess"
+MODEL_SERVER_SOCKET = "/tmp/email_ai_models.sock"
+# Micro-batching of concurrent classifier and embedding calls across sessions: the first request of a batch
+# waits up to MICRO_BATCH_WAIT_MS for others, and at most MICRO_BATCH_MAX_SIZE requests share a forward pass
+MICRO_BATCH_ENABLED = True
+MICRO_BATCH_WAIT_MS = 10
+MICRO_BATCH_MAX_SIZE = 32
+# Inference backend of the embedding and zero-shot models: "torch" runs them in PyTorch; "onnx" exports
+# them once to ONNX_MODEL_DIR with dynamic int8 quantization and runs them with ONNX Runtime
+INFERENCE_BACKEND = "torch"
+ONNX_MODEL_DIR = "models/onnx"
+# ONNX Runtime intra-op threads per model; None uses the number of physical cores
+ONNX_INTRA_OP_THREADS = None
+# Cached sentiment results, keyed by normalized body hash, model and labels
+SENTIMENT_CACHE_PATH = "Email_Data/sentiment_cache.db"
+
+# Embedding fast path: score the email embedding against label prototypes and fall back to the
+# zero-shot model only when the cosine margin between the top two labels is below the threshold
+FAST_SENTIMENT_ENABLED = False
+FAST_SENTIMENT_MARGIN = 0.05
+# Optional JSON lines file of {"text": ..., "label": ...} examples used to build the prototypes
+SENTIMENT_SEED_PATH = None
 
 
 # Ollama Configuration
 OLLAMA_MODEL = "mistral"
+OLLAMA_BASE_URL = "http://localhost:11434"
+
+# RAG context: retrieve CONTEXT_CANDIDATES chunks, drop near-duplicates (word 5-gram overlap at or above the
+# threshold) and keep the most relevant ones within CONTEXT_TOKEN_BUDGET tokens of the generation model's tokenizer
+CONTEXT_CANDIDATES = 8
+CONTEXT_DEDUPE_THRESHOLD = 0.8
+CONTEXT_TOKEN_BUDGET = 1024
+# Ungated copy of the Mistral-7B-Instruct-v0.2 tokenizer (the mistralai repositories require accepting their terms)
+CONTEXT_TOKENIZER = "TheBloke/Mistral-7B-Instruct-v0.2-GPTQ"
+
+# Semantic response cache: offer the sent reply of a prior email with the same sentiment when the
+# cosine similarity of the two bodies reaches the threshold
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_PATH = "Email_Data/response_cache.db"
+RESPONSE_CACHE_THRESHOLD = 0.92
+
+# Stream reply tokens into the Reply Body field while they are generated
+STREAM_RESPONSES = True
+
+# Background draft generation: concurrent Ollama requests and ordering ("negative" or "newest" first)
+DRAFT_WORKERS = 2
+DRAFT_PRIORITY = "negative"
+
+# Headless batch processing (batch.py): JSON list of {"user", "password" or "password_env", "mailbox"} accounts,
+# concurrent IMAP syncs, classifier batches and LLM generations, and seconds between rounds in daemon mode
+BATCH_ACCOUNTS_PATH = "accounts.json"
+BATCH_IMAP_CONCURRENCY = 4
+BATCH_CLASSIFIER_CONCURRENCY = 1
+BATCH_LLM_CONCURRENCY = 2
+BATCH_POLL_INTERVAL = 300
+
+# Tracing (utils/tracing.py): per-stage timing spans are logged as JSON lines with request IDs to TRACE_LOG_PATH;
+# stage latency histograms and counters are rewritten in the Prometheus text format to METRICS_PATH every
+# METRICS_FLUSH_INTERVAL seconds and, when METRICS_PORT is set, served on http://127.0.0.1:METRICS_PORT/metrics
+TRACE_ENABLED = True
+TRACE_LOG_PATH = "logs/trace.jsonl"
+METRICS_PATH = "logs/metrics.prom"
+METRICS_FLUSH_INTERVAL = 15
+METRICS_PORT = None
+# cProfile every request into PROFILE_DIR, or only the next one after `kill -USR1 <pid>`
+PROFILE_REQUESTS = False
+PROFILE_DIR = "logs/profiles"
 
 template = """You are acting as an Email Replier with a human touch, responding to customer emails in accordance with their expressed sentiments. Craft your replies considering the emotional tone conveyed by the customer in their emails. Your goal is to provide empathetic and context-appropriate responses that resonate with the customer's feelings.:
         {context}
@@ -1,42 +1,63 @@
 # main.py
 
+import argparse
 import logging
+import os
 from utils.loaders import DocumentLoader
-from utils.text_processing import TextProcessor
 from utils.vector_db import VectorDatabase
-from config import DATA_PATH, DB_PATH, EMBED_MODEL_NAME
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from utils.ingest_manifest import IngestManifest
+from utils.ingest_pipeline import IngestionPipeline
+from config import DATA_PATH, DB_PATH, EMBED_MODEL_NAME, INGEST_MANIFEST_PATH
+from utils.embedding_cache import load_embed_model
 from utils.logging_config import setup_logging
-import os
 
 setup_logging()
 
 
-def main():
+def main(rebuild=False):
     """
-    Main function to create the vector database from documents.
+    Main function to incrementally update the vector database from documents.
+
+    Only files whose content hash changed are loaded and split, only chunks that are not
+    already stored are embedded, and vectors of deleted or modified content are removed.
+    Changed files stream through the parallel load → split → embed → write pipeline.
+
+    :param rebuild: Clear the vector database and the manifest before ingesting.
     """
     try:
-        # Initialize the document loader
         doc_loader = DocumentLoader(DATA_PATH)
-        documents = doc_loader.load_documents()
-        logging.info(f"Processed {len(documents)} pdf files")
+        paths = doc_loader.list_files()
+        if not paths:
+            raise ValueError("No documents found. Check your DATA_PATH.")
 
-        # Check if documents are loaded
-        if not documents:
-            raise ValueError("No documents loaded. Check your DATA_PATH.")
-
-        # Initialize and apply text processor
-        text_processor = TextProcessor()
-        texts = text_processor.split_text(documents)
-
-        # Initialize and create vector database
-        embed_model = HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
+        embed_model = load_embed_model(EMBED_MODEL_NAME)
         vector_db = VectorDatabase(DB_PATH, embed_model)
-        vector_db.create_vector_db(texts)
+        manifest = IngestManifest(INGEST_MANIFEST_PATH)
+        if not rebuild and not os.path.exists(INGEST_MANIFEST_PATH) and vector_db.count():
+            # Vectors stored before the manifest existed have random IDs that incremental updates
+            # can neither match nor delete, so they would stay next to their re-ingested copies
+            logging.warning(f"No ingestion manifest at {INGEST_MANIFEST_PATH}; rebuilding the vector database")
+            rebuild = True
+        if rebuild:
+            vector_db.reset_vector_db()
+            manifest.files = {}
+
+        # Drop the vectors of files that no longer exist
+        for source in set(manifest.files) - set(paths):
+            vector_db.delete_documents(manifest.chunk_ids(source))
+            manifest.remove(source)
+            logging.info(f"Removed deleted file {source}")
+
+        pipeline = IngestionPipeline(vector_db, manifest)
+        stats = pipeline.run(paths)
+        logging.info(f"Processed {len(paths)} pdf files ({len(paths) - stats['parse']['items']} unchanged)")
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
 
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Create or update the vector database from the PDFs in DATA_PATH.")
+    parser.add_argument('--rebuild', action='store_true', help="clear the vector database and re-ingest every file")
+    args = parser.parse_args()
+    main(rebuild=args.rebuild)
@@ -1,7 +1,9 @@
+import functools
 import gradio as gr
 from Email_Reader.email_response import EmailProcessor
 import logging
 from utils.logging_config import setup_logging
+from config import STREAM_RESPONSES
 
 
 setup_logging()
@@ -26,6 +28,15 @@ def create_interface(email_processor):
                 fetch_button = gr.Button("Fetch Emails")
                 fetch_output = gr.Label()
             fetch_button.click(email_processor.fetch_and_save_emails, inputs=[user_input, pass_input], outputs=fetch_output)
+            with gr.Row():
+                push_button = gr.Button("Start Push")
+                stop_push_button = gr.Button("Stop Push")
+                push_status = gr.Markdown()
+            push_button.click(email_processor.start_push, inputs=[user_input, pass_input], outputs=fetch_output)
+            stop_push_button.click(email_processor.stop_push, outputs=fetch_output)
+            app.load(email_processor.push_status, outputs=push_status, every=2)
+            component_status = gr.Markdown()
+            app.load(email_processor.component_status, outputs=component_status, every=2)
 
             with gr.Row():
                 with gr.Column():
@@ -33,6 +44,8 @@ def create_interface(email_processor):
                     subject_field = gr.Textbox(label="Subject", placeholder="Subject", lines=3, max_lines=3)
                     body_field = gr.Textbox(label="Body", lines=20, max_lines=20, interactive=True, elem_classes="feedback")  # Set the height as desired
                     load_button = gr.Button("Load Emails")
+                    attachments_button = gr.Button("Open Attachments")
+                    attachments_output = gr.File(label="Attachments", file_count="multiple")
                     email_index = gr.Number(label="Email Index", value=0, visible=False)
                     response_label = gr.Label(visible=False)
                 with gr.Column():
@@ -40,20 +53,46 @@ def create_interface(email_processor):
                     Sentiment_score = gr.Textbox(label="Sentiment Score", placeholder="Sentiment Score", lines=3, max_lines=3)
                     reply_body_field = gr.Textbox(label="Reply Body", lines=20, max_lines=20, interactive=True, placeholder="Type your reply here", elem_classes="feedback")  # Set the height as desired
                     reply_button = gr.Button("Reply")
+                    with gr.Row():
+                        approve_button = gr.Button("Approve Reply")
+                        send_approved_button = gr.Button("Send Approved Replies")
 
             with gr.Row():
                 prev_button = gr.Button("Previous")
                 next_button = gr.Button("Next")
                 generate_response_button = gr.Button("Generate Response")
-                generate_response_button.click(email_processor.generate_response, inputs=[body_field, subject_field], outputs=[Sentiment, Sentiment_score, reply_body_field])
+                generate_handler = email_processor.generate_response_stream if STREAM_RESPONSES else email_processor.generate_response
+                regenerate_response_button = gr.Button("Regenerate Response")
+            response_cache_status = gr.Markdown()
+            # The cache hit is kept per browser session, since every session shares the email processor
+            cache_hit = gr.State()
+            generated = generate_response_button.click(generate_handler, inputs=[body_field, subject_field], outputs=[Sentiment, Sentiment_score, reply_body_field, cache_hit])
+            generated.then(email_processor.response_cache_status, inputs=cache_hit, outputs=response_cache_status)
+            # Regenerate skips the response cache and always runs the retrieve-and-generate chain
+            regenerated = regenerate_response_button.click(functools.partial(generate_handler, use_cache=False), inputs=[body_field, subject_field], outputs=[Sentiment, Sentiment_score, reply_body_field, cache_hit])
+            regenerated.then(email_processor.response_cache_status, inputs=cache_hit, outputs=response_cache_status)
+
+            attachments_button.click(email_processor.open_attachments, inputs=[user_input, pass_input, email_index], outputs=attachments_output)
+            with gr.Row():
+                draft_status_button = gr.Button("Draft Queue Status")
+                cancel_drafts_button = gr.Button("Cancel Queued Drafts")
+                draft_status = gr.Label()
+            draft_status_button.click(email_processor.draft_queue_status, outputs=draft_status)
+            cancel_drafts_button.click(email_processor.cancel_drafts, outputs=draft_status)
 
-            load_button.click(email_processor.load_emails, outputs=[from_field, subject_field, body_field, email_index])
-            prev_button.click(lambda x: email_processor.navigate_emails("prev", x), inputs=[email_index], outputs=[from_field, subject_field, body_field, email_index])
-            next_button.click(lambda x: email_processor.navigate_emails("next", x), inputs=[email_index], outputs=[from_field, subject_field, body_field, email_index])
+            email_outputs = [from_field, subject_field, body_field, email_index, Sentiment, Sentiment_score, reply_body_field]
+            load_button.click(email_processor.load_emails, outputs=email_outputs)
+            prev_button.click(lambda x: email_processor.navigate_emails("prev", x), inputs=[email_index], outputs=email_outputs)
+            next_button.click(lambda x: email_processor.navigate_emails("next", x), inputs=[email_index], outputs=email_outputs)
             reply_button.click(email_processor.send_reply_and_move_next, 
                                inputs=[user_input, pass_input, email_index, reply_body_field], 
                                outputs=[response_label, from_field, subject_field, body_field, email_index, Sentiment, Sentiment_score, reply_body_field])
 
+            approve_button.click(email_processor.approve_reply_and_move_next,
+                                 inputs=[email_index, reply_body_field],
+                                 outputs=[response_label, from_field, subject_field, body_field, email_index, Sentiment, Sentiment_score, reply_body_field])
+            send_approved_button.click(email_processor.send_approved_drafts, inputs=[user_input, pass_input], outputs=fetch_output)
+
             response_label.change(email_processor.show_popup, inputs=[response_label])
 
         return app
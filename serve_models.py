@@ -0,0 +1,32 @@
+# serve_models.py
+
+import argparse
+import logging
+from utils.model_server import ModelServer
+from config import MODEL_SERVER_SOCKET
+from utils.logging_config import setup_logging
+
+setup_logging()
+
+
+def main(socket_path):
+    """
+    Loads the classifier and embedding model once and serves them to every worker until interrupted.
+
+    :param socket_path: Path of the Unix socket to listen on.
+    """
+    server = ModelServer(socket_path)
+    print(f"Serving models on {socket_path}; set MODEL_SERVER_MODE = \"remote\" in config.py to use them")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Model server stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the classifier and embedding model to other processes.")
+    parser.add_argument('--socket', default=MODEL_SERVER_SOCKET, help="path of the Unix socket")
+    args = parser.parse_args()
+    main(args.socket)
@@ -0,0 +1,58 @@
+import pytest
+
+from Email_Reader.body_cleaner import clean_body, html_to_text
+
+
+@pytest.mark.parametrize('body, is_reply, expected', [
+    # Quote-marked lines are dropped from any email
+    ("Still waiting.\n> When will it ship?\n> Soon.", False, "Still waiting."),
+    # Reply headers only cut quoted history from replies
+    ("Thanks, that fixed it.\n\nOn Mon, 1 Jan 2024 at 10:00, Support <help@example.com> wrote:\nHave you tried again?",
+     True, "Thanks, that fixed it."),
+    ("I saw this line in your FAQ:\nOn Mon, 1 Jan 2024 at 10:00, Support <help@example.com> wrote:\nnothing",
+     False, "I saw this line in your FAQ:\nOn Mon, 1 Jan 2024 at 10:00, Support <help@example.com> wrote:\nnothing"),
+    ("Please cancel.\n\n-----Original Message-----\nFrom: shop\nSent: Monday\nYour order", True, "Please cancel."),
+    # Outlook headers need a Sent:/Date: line right below the From: line
+    ("Please cancel.\n\nFrom: Shop <shop@example.com>\nSent: Monday, 1 January 2024\nSubject: Order", True,
+     "Please cancel."),
+    ("From: my other address, not the one on file.\nPlease update it.", True,
+     "From: my other address, not the one on file.\nPlease update it."),
+    # Signatures end the body
+    ("My card was charged twice.\n\n-- \nJane Doe\nACME Corp", False, "My card was charged twice."),
+    ("Where is my parcel?\n\nSent from my iPhone", False, "Where is my parcel?"),
+    # Footers are stripped only when a trailing paragraph opens like one
+    ("Hi,\n\nWhere is my order 1234? It was due Monday.\n\nThanks\nAnna\n\n"
+     "This email and any attachments are confidential and intended solely for the addressee.\n\n"
+     "Please consider the environment before printing this email.",
+     False, "Hi,\n\nWhere is my order 1234? It was due Monday.\n\nThanks\nAnna"),
+    ("Hello,\n\nMy refund has not arrived after three weeks.\n\n"
+     "This is confidential and privileged information about my account, please keep it safe.",
+     False, "Hello,\n\nMy refund has not arrived after three weeks.\n\n"
+            "This is confidential and privileged information about my account, please keep it safe."),
+    ("Hi,\n\nI want to unsubscribe from the newsletter, and also cancel my plan.\n\nThanks", False,
+     "Hi,\n\nI want to unsubscribe from the newsletter, and also cancel my plan.\n\nThanks"),
+    # The first substantive paragraph is kept even if it reads like a footer
+    ("Hello,\n\nTo unsubscribe I clicked the link in your email three times, nothing happened.", False,
+     "Hello,\n\nTo unsubscribe I clicked the link in your email three times, nothing happened."),
+    # Cleaning never leaves an empty body
+    ("> only quoted text", False, "> only quoted text"),
+    ("", False, ""),
+    ("Line one\r\nLine two\r\n\r\n\r\n\r\nLine three", False, "Line one\nLine two\n\nLine three"),
+])
+def test_clean_body(body, is_reply, expected):
+    assert clean_body(body, is_reply) == expected
+
+
+@pytest.mark.parametrize('markup, expected', [
+    ("<p>Hello&nbsp;there</p><p>Second <b>line</b></p>", "Hello there\n\nSecond line"),
+    ("<html><head><style>p {color: red}</style></head><body>Visible<script>hidden()</script></body></html>",
+     "Visible"),
+    ("Line<br>break &amp; entity", "Line\nbreak & entity"),
+])
+def test_html_to_text(markup, expected):
+    assert html_to_text(markup) == expected
+
+
+def test_html_blockquotes_are_cleaned_as_quotes():
+    markup = "<div>Sure, go ahead.</div><blockquote><div>Can I return the jacket?</div></blockquote>"
+    assert clean_body(html_to_text(markup)) == "Sure, go ahead."
@@ -0,0 +1,133 @@
+import base64
+
+import pytest
+
+from Email_Reader.bodystructure import (
+    BodyPart, decode_part, flatten_fetch_data, parse_fetch_response, parse_imap_data, select_text_part,
+    walk_bodystructure,
+)
+
+# RFC 3501, section 7.4.2
+RFC3501_MIXED = (
+    b'("TEXT" "PLAIN" ("CHARSET" "US-ASCII") NIL NIL "7BIT" 1152 23)'
+    b'("TEXT" "PLAIN" ("CHARSET" "US-ASCII" "NAME" "cc.diff") "<960723163407.20117h@cac.washington.edu>" '
+    b'"Compiler diff" "BASE64" 4554 73) "MIXED"'
+)
+# Alternative text and HTML bodies with a PDF attachment, as sent by webmail clients
+NESTED_ALTERNATIVE = (
+    b'(("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "QUOTED-PRINTABLE" 50 2 NIL NIL NIL NIL)'
+    b'("TEXT" "HTML" ("CHARSET" "UTF-8") NIL NIL "QUOTED-PRINTABLE" 120 3 NIL NIL NIL NIL) '
+    b'"ALTERNATIVE" ("BOUNDARY" "b1") NIL NIL NIL)'
+    b'("APPLICATION" "PDF" ("NAME" "invoice.pdf") NIL NIL "BASE64" 10240 NIL '
+    b'("ATTACHMENT" ("FILENAME" "invoice.pdf")) NIL NIL) "MIXED" ("BOUNDARY" "b0") NIL NIL NIL'
+)
+# A forwarded message; the envelope and the embedded body come before the extension data
+FORWARDED = (
+    b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 20 1 NIL NIL NIL NIL)'
+    b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 500 ("Mon, 1 Jan 2024 00:00:00 +0000" "fwd subject" '
+    b'((NIL NIL "a" "example.com")) ((NIL NIL "a" "example.com")) ((NIL NIL "a" "example.com")) '
+    b'((NIL NIL "b" "example.org")) NIL NIL NIL "<m@example.com>") '
+    b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 30 2 NIL NIL NIL NIL) 12 NIL '
+    b'("ATTACHMENT" ("FILENAME" "fwd.eml")) NIL NIL) "MIXED" ("BOUNDARY" "x") NIL NIL NIL'
+)
+# HTML-only single part with a NIL disposition
+HTML_ONLY = b'"TEXT" "HTML" ("CHARSET" "iso-8859-1") NIL NIL "QUOTED-PRINTABLE" 300 10 NIL NIL NIL NIL'
+# Inline image next to the text; the quoted filename contains escaped quotes and a backslash
+ESCAPED_NAME = (
+    b'("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 10 1 NIL NIL NIL NIL)'
+    b'("IMAGE" "PNG" ("NAME" "say \\"hi\\" \\\\ bye.png") "<img1>" NIL "BASE64" 2048 NIL '
+    b'("INLINE" ("FILENAME" "say \\"hi\\" \\\\ bye.png")) NIL NIL) "RELATED" NIL NIL NIL NIL'
+)
+
+
+@pytest.mark.parametrize('raw, expected', [
+    (b'NIL', [None]),
+    (b'"a \\"quoted\\" \\\\ string"', ['a "quoted" \\ string']),
+    (b'(1 (2 NIL) "three")', [['1', ['2', None], 'three']]),
+    (b'{5}\r\nhello "after"', [b'hello', 'after']),
+    # Only the CRLF ending the literal marker is skipped, the literal may start with a blank line
+    (b'{8}\r\n\r\nbody\r\n', [b'\r\nbody\r\n']),
+    (b'{0}\r\n NIL', [b'', None]),
+    (b'BODY[HEADER.FIELDS (FROM SUBJECT)] {4}\r\nabcd', ['BODY[HEADER.FIELDS (FROM SUBJECT)]', b'abcd']),
+])
+def test_parse_imap_data(raw, expected):
+    assert parse_imap_data(raw) == expected
+
+
+@pytest.mark.parametrize('structure, expected', [
+    (RFC3501_MIXED, [
+        BodyPart('1', 'text/plain', 'US-ASCII', '7bit', 1152),
+        BodyPart('2', 'text/plain', 'US-ASCII', 'base64', 4554, None, 'cc.diff'),
+    ]),
+    (NESTED_ALTERNATIVE, [
+        BodyPart('1.1', 'text/plain', 'UTF-8', 'quoted-printable', 50),
+        BodyPart('1.2', 'text/html', 'UTF-8', 'quoted-printable', 120),
+        BodyPart('2', 'application/pdf', None, 'base64', 10240, 'attachment', 'invoice.pdf'),
+    ]),
+    (FORWARDED, [
+        BodyPart('1', 'text/plain', 'utf-8', '7bit', 20),
+        BodyPart('2', 'message/rfc822', None, '7bit', 500, 'attachment', 'fwd.eml'),
+    ]),
+    (HTML_ONLY, [
+        BodyPart('1', 'text/html', 'iso-8859-1', 'quoted-printable', 300),
+    ]),
+    (ESCAPED_NAME, [
+        BodyPart('1', 'text/plain', 'us-ascii', '7bit', 10),
+        BodyPart('2', 'image/png', None, 'base64', 2048, 'inline', 'say "hi" \\ bye.png'),
+    ]),
+])
+def test_walk_bodystructure(structure, expected):
+    assert walk_bodystructure(parse_imap_data(b'(' + structure + b')')[0]) == expected
+
+
+@pytest.mark.parametrize('structure, section', [
+    (RFC3501_MIXED, '1'),
+    (NESTED_ALTERNATIVE, '1.1'),
+    (FORWARDED, '1'),
+    (HTML_ONLY, '1'),
+    (ESCAPED_NAME, '1'),
+    # Only an attachment: no body text to fetch
+    (b'"APPLICATION" "PDF" NIL NIL NIL "BASE64" 10 NIL ("ATTACHMENT" ("FILENAME" "a.pdf")) NIL NIL', None),
+])
+def test_select_text_part(structure, section):
+    part = select_text_part(walk_bodystructure(parse_imap_data(b'(' + structure + b')')[0]))
+    assert (part.section if part else None) == section
+
+
+def test_parse_fetch_response_with_literals():
+    # imaplib splits every literal into a (prefix, literal) tuple
+    headers = b'Message-ID: <1@example.com>\r\nSubject: Refund\r\n\r\n'
+    data = [
+        (b'1 (UID 101 BODYSTRUCTURE (' + HTML_ONLY + b') BODY[HEADER.FIELDS (MESSAGE-ID SUBJECT)] {%d}' % len(headers),
+         headers),
+        b')',
+        (b'2 (UID 102 FLAGS (\\Seen) BODY[1] {9}', b'\r\nHi,\r\nOK'),
+        b')',
+    ]
+    first, second = parse_fetch_response(data)
+    assert first['UID'] == '101'
+    assert first['BODY[HEADER.FIELDS (MESSAGE-ID SUBJECT)]'] == headers
+    assert walk_bodystructure(first['BODYSTRUCTURE'])[0].content_type == 'text/html'
+    assert second['UID'] == '102'
+    assert second['FLAGS'] == ['\\Seen']
+    assert second['BODY[1]'] == b'\r\nHi,\r\nOK'
+
+
+def test_flatten_fetch_data_round_trip():
+    data = [(b'1 (UID 7 BODY[1] {3}', b'abc'), b')']
+    assert flatten_fetch_data(data) == b'1 (UID 7 BODY[1] {3}\r\nabc )'
+
+
+@pytest.mark.parametrize('payload, encoding, expected', [
+    (base64.b64encode(b'hello world'), 'base64', b'hello world'),
+    (b'aGVsbG8g\r\nd29ybGQ=\r\n', 'BASE64', b'hello world'),
+    # Missing padding and stray characters are repaired instead of failing the batch
+    (b'aGVsbG8gd29ybGQ', 'base64', b'hello world'),
+    (b'aGVsbG8g*d29ybGQ=', 'base64', b'hello world'),
+    (b'Caf=E9 =\r\nna=C3=AFve', 'quoted-printable', b'Caf\xe9 na\xc3\xafve'),
+    (b'plain', '7bit', b'plain'),
+    (b'plain', None, b'plain'),
+    (None, 'base64', b''),
+])
+def test_decode_part(payload, encoding, expected):
+    assert decode_part(payload, encoding) == expected
@@ -0,0 +1,78 @@
+import pytest
+
+from Email_Reader.email_store import EmailStore
+
+
+def email(number, **fields):
+    return {'Message ID': f'<{number}@example.com>', 'UID': number, 'From': 'customer@example.com',
+            'Subject': f'Subject {number}', 'Body': f'Body {number}', **fields}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmailStore(str(tmp_path / 'emails.db'))
+    yield store
+    store.close()
+
+
+def test_positions_follow_insertion_order(store):
+    assert store.append([email(1), email(2)], account='a@example.com') == 2
+    assert store.append([email(3)], account='a@example.com') == 1
+    assert store.count() == 3
+    assert [store.get(index)['Message ID'] for index in range(3)] == [
+        '<1@example.com>', '<2@example.com>', '<3@example.com>']
+    assert store.get(3) is None
+
+
+def test_duplicate_message_ids_take_no_position(store):
+    store.append([email(1), email(2)])
+    assert store.append([email(2), email(1), email(3)]) == 1
+    assert store.count() == 3
+    assert store.get(2)['Message ID'] == '<3@example.com>'
+
+
+@pytest.mark.parametrize('offset, limit, expected', [
+    (0, 2, [1, 2]),
+    (1, 2, [2, 3]),
+    (3, 10, [4, 5]),
+    (5, 10, []),
+])
+def test_page(store, offset, limit, expected):
+    store.append([email(number) for number in range(1, 6)])
+    assert [record['UID'] for record in store.page(offset, limit)] == expected
+
+
+def test_lookups(store):
+    store.append([email(7, **{'Reply-To': 'reply@example.com', 'Attachments': [{'section': '2'}]})],
+                 account='a@example.com')
+    by_uid = store.get_by_uid('a@example.com', 7)
+    assert by_uid == store.get_by_message_id('<7@example.com>') == store.get(0)
+    assert by_uid['Account'] == 'a@example.com'
+    assert by_uid['Reply-To'] == 'reply@example.com'
+    assert by_uid['Attachments'] == [{'section': '2'}]
+    # Rows stored without a cleaned body fall back to the original one
+    assert by_uid['Clean Body'] == 'Body 7'
+    assert store.get_by_uid('b@example.com', 7) is None
+
+
+def test_checkpoints(store):
+    assert store.get_checkpoint('a@example.com', 'inbox') is None
+    store.save_checkpoint('a@example.com', 'inbox', 42, 100)
+    store.save_checkpoint('a@example.com', 'inbox', 42, 150, modseq=9)
+    assert store.get_checkpoint('a@example.com', 'inbox') == {'uidvalidity': 42, 'last_uid': 150, 'modseq': 9}
+    assert store.get_checkpoint('a@example.com', 'archive') is None
+
+
+def test_reviewed_drafts_survive_the_draft_queue(store):
+    store.append([email(1), email(2)], account='a@example.com')
+    store.save_draft('<1@example.com>', 'ready', 'Negative', 0.9, 'Drafted reply')
+    store.approve_draft('<1@example.com>', 'Edited reply')
+    store.save_draft('<1@example.com>', 'cancelled')
+    assert store.get_draft('<1@example.com>') == {
+        'status': 'approved', 'sentiment': 'Negative', 'score': 0.9, 'reply': 'Edited reply'}
+    assert store.approved_drafts('a@example.com') == [('<1@example.com>', 'Edited reply')]
+    assert store.approved_drafts('b@example.com') == []
+    store.set_draft_status('<1@example.com>', 'sent')
+    assert store.approved_drafts('a@example.com') == []
+    store.save_draft('<2@example.com>', 'queued')
+    assert store.unfinished_drafts() == ['<2@example.com>']
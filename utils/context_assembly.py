@@ -0,0 +1,177 @@
+import logging
+import re
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from utils import tracing
+from config import CONTEXT_CANDIDATES, CONTEXT_DEDUPE_THRESHOLD, CONTEXT_TOKEN_BUDGET, CONTEXT_TOKENIZER
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingles(text, size=5):
+    """
+    Builds the set of word n-grams of a text.
+
+    :param text: Text to shingle.
+    :param size: Number of words per shingle.
+    :return: Set of shingles.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def overlap(first, second):
+    """
+    Measures how much of the smaller shingle set is contained in the other.
+
+    :param first: Shingle set.
+    :param second: Shingle set.
+    :return: Overlap coefficient between 0 and 1.
+    """
+    if not first or not second:
+        return 0.0
+    return len(first & second) / min(len(first), len(second))
+
+
+class ContextAssembler:
+    """
+    Turns retrieved chunks into the context of the RAG prompt within a token budget.
+
+    Candidates are retrieved with their relevance scores, near-duplicates are dropped,
+    and the most relevant chunks are kept until the budget, counted with the tokenizer
+    of the generation model, is used up.
+    """
+
+    def __init__(self, vectorstore, tokenizer_name=CONTEXT_TOKENIZER, budget=CONTEXT_TOKEN_BUDGET,
+                 candidates=CONTEXT_CANDIDATES, dedupe_threshold=CONTEXT_DEDUPE_THRESHOLD):
+        """
+        Initializes the assembler and loads the tokenizer.
+
+        :param vectorstore: Vector store to retrieve chunks from.
+        :param tokenizer_name: HuggingFace name of the generation model's tokenizer.
+        :param budget: Maximum number of context tokens.
+        :param candidates: Number of chunks retrieved before deduplication and trimming.
+        :param dedupe_threshold: Shingle overlap at or above which a chunk counts as a duplicate.
+        """
+        self.vectorstore = vectorstore
+        self.budget = budget
+        self.candidates = candidates
+        self.dedupe_threshold = dedupe_threshold
+        self.logger = logging.getLogger(__name__)
+        self.tokenizer = None
+        try:
+            from transformers import AutoTokenizer
+
+            self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        except Exception as e:
+            # The budget is then only approximate, which should not go unnoticed
+            self.logger.error(f"Could not load tokenizer {tokenizer_name}; the context budget falls back to "
+                              f"an estimate of 4 characters per token: {e}")
+
+    def count_tokens(self, text):
+        """
+        Counts the tokens of a text.
+
+        :param text: Text to count.
+        :return: Number of tokens.
+        """
+        if self.tokenizer is None:
+            return (len(text) + 3) // 4
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def truncate(self, text, max_tokens):
+        """
+        Cuts a text down to its first tokens.
+
+        :param text: Text to cut.
+        :param max_tokens: Number of tokens to keep.
+        :return: Truncated text.
+        """
+        if self.tokenizer is None:
+            return text[:max_tokens * 4]
+        ids = self.tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+        return self.tokenizer.decode(ids)
+
+    def select(self, scored_documents):
+        """
+        Deduplicates scored chunks and keeps the most relevant ones within the budget.
+
+        :param scored_documents: List of (document, relevance score) tuples.
+        :return: Tuple of (chunk texts, number of duplicates dropped, tokens used).
+        """
+        kept, kept_shingles = [], []
+        duplicates = 0
+        used = 0
+        for document, _ in sorted(scored_documents, key=lambda item: item[1], reverse=True):
+            text = document.page_content.strip()
+            text_shingles = shingles(text)
+            if any(overlap(text_shingles, other) >= self.dedupe_threshold for other in kept_shingles):
+                duplicates += 1
+                continue
+            tokens = self.count_tokens(text)
+            remaining = self.budget - used
+            if tokens > remaining:
+                # Only a meaningful remainder is worth a truncated chunk
+                if remaining >= 64:
+                    kept.append(self.truncate(text, remaining))
+                    used += remaining
+                break
+            kept.append(text)
+            kept_shingles.append(text_shingles)
+            used += tokens
+        return kept, duplicates, used
+
+    def assemble(self, query):
+        """
+        Retrieves and assembles the context for a query.
+
+        :param query: The question passed to the chain.
+        :return: Context text.
+        """
+        start = time.perf_counter()
+        with tracing.span('retrieval') as fields:
+            scored = self.vectorstore.similarity_search_with_relevance_scores(query, k=self.candidates)
+            kept, duplicates, used = self.select(scored)
+            fields.update(candidates=len(scored), chunks=len(kept), duplicates=duplicates, tokens=used)
+        self.logger.info(f"Context: {len(kept)} of {len(scored)} chunks ({duplicates} near-duplicates dropped), "
+                         f"{used}/{self.budget} tokens, assembled in {time.perf_counter() - start:.2f}s")
+        return "\n\n".join(kept)
+
+
+class PromptMetricsHandler(BaseCallbackHandler):
+    """
+    Logs the prompt token count and prefill time that Ollama reports for each request, and records them as metrics.
+    """
+
+    def __init__(self):
+        """
+        Initializes the handler.
+        """
+        self.logger = logging.getLogger(__name__)
+
+    def on_llm_end(self, response, **kwargs):
+        """
+        Reads Ollama's evaluation counters from the finished generation.
+
+        :param response: LLMResult of the request.
+        """
+        for generations in response.generations:
+            for generation in generations:
+                info = dict(generation.generation_info or {})
+                message = getattr(generation, 'message', None)
+                if message is not None:
+                    info.update(getattr(message, 'response_metadata', None) or {})
+                if 'prompt_eval_count' not in info:
+                    continue
+                prefill = info.get('prompt_eval_duration', 0) / 1e9
+                generated = info.get('eval_count', 0)
+                decode = info.get('eval_duration', 0) / 1e9
+                self.logger.info(f"Prompt: {info['prompt_eval_count']} tokens, prefill {prefill:.2f}s | "
+                                 f"generated {generated} tokens in {decode:.2f}s")
+                # Prefill and decode times as measured by the Ollama server
+                tracing.record_span('llm_prefill', prefill, tokens=info['prompt_eval_count'])
+                tracing.record_span('llm_decode', decode, tokens=generated)
+                tracing.increment('llm_prompt_tokens', info['prompt_eval_count'])
+                tracing.increment('llm_generated_tokens', generated)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import EMBED_MODEL_NAME, EMBED_CACHE_ENABLED, EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB, INFERENCE_BACKEND
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    An embedding model wrapper that keeps computed vectors in an on-disk cache.
+
+    Vectors live in a memory-mapped float32 array; a SQLite table maps the hash of
+    (model name, text) to a row of that array and tracks recency for eviction. The
+    cache is shared by every process that opens the same directory, so chunks embedded
+    at ingestion time and repeated email bodies at query time are computed only once.
+    """
+
+    def __init__(self, embedding_model, model_name, cache_dir=EMBED_CACHE_PATH, max_mb=EMBED_CACHE_MAX_MB):
+        """
+        Initializes the cache around an embedding model.
+
+        :param embedding_model: Embedding model with embed_documents and embed_query.
+        :param model_name: Name of the model, part of every cache key.
+        :param cache_dir: Directory holding the vector file and its index.
+        :param max_mb: Maximum size of the vector file in megabytes.
+        """
+        self.embedding_model = embedding_model
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.vectors = None
+        self.capacity = None
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'), check_same_thread=False, timeout=30)
+        with self.index:
+            self.index.execute("PRAGMA journal_mode=WAL")
+            self.index.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE, last_used INTEGER)")
+            self.index.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used)")
+            self.index.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self.index.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+        row = self.index.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+        if row:
+            self._open_vectors(**json.loads(row[0]))
+
+    def _open_vectors(self, dim, capacity, create=False):
+        """
+        Maps the vector file into memory.
+
+        :param dim: Embedding dimension.
+        :param capacity: Number of vectors the file holds.
+        :param create: Create the file instead of opening it.
+        """
+        path = os.path.join(self.cache_dir, 'vectors.f32')
+        self.dim = dim
+        self.capacity = capacity
+        self.vectors = np.memmap(path, dtype=np.float32, mode='w+' if create else 'r+', shape=(capacity, dim))
+
+    def _create_vectors(self, dim):
+        """
+        Creates the vector file once the embedding dimension is known, inside the caller's transaction.
+
+        :param dim: Embedding dimension.
+        """
+        capacity = max(1, self.max_bytes // (dim * 4))
+        # The file exists before the layout is committed, so other processes never open a missing file
+        self._open_vectors(dim, capacity, create=True)
+        self.index.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('layout', ?)",
+                           (json.dumps({'dim': dim, 'capacity': capacity}),))
+        self.index.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('next_slot', '0')")
+        self.index.execute("DELETE FROM entries")
+        self.index.execute("DELETE FROM free_slots")
+        self.logger.info(f"Created embedding cache for {capacity} vectors of dimension {dim}")
+
+    def key(self, text, kind='document'):
+        """
+        Builds the cache key of a text.
+
+        :param text: Text to embed.
+        :param kind: 'document' or 'query', since models may embed the two differently.
+        :return: Hex digest.
+        """
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode('utf-8')).hexdigest()
+
+    def _clock(self):
+        """
+        Advances the recency counter shared by all processes using the cache.
+
+        :return: The new counter value.
+        """
+        row = self.index.execute("SELECT value FROM meta WHERE name = 'clock'").fetchone()
+        clock = int(row[0]) + 1 if row else 1
+        self.index.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('clock', ?)", (str(clock),))
+        return clock
+
+    def _allocate(self, count):
+        """
+        Reserves vector slots, evicting the least recently used entries when the file is full.
+
+        :param count: Number of slots needed.
+        :return: List of slot numbers.
+        """
+        freed = [row[0] for row in self.index.execute("SELECT slot FROM free_slots LIMIT ?", (count,))]
+        self.index.executemany("DELETE FROM free_slots WHERE slot = ?", [(slot,) for slot in freed])
+        next_slot = int(self.index.execute("SELECT value FROM meta WHERE name = 'next_slot'").fetchone()[0])
+        fresh = freed + list(range(next_slot, min(self.capacity, next_slot + count - len(freed))))
+        self.index.execute("UPDATE meta SET value = ? WHERE name = 'next_slot'",
+                           (str(next_slot + len(fresh) - len(freed)),))
+        needed = count - len(fresh)
+        if needed <= 0:
+            return fresh
+        # Every evicted slot is reused right away; freed slots and slots past next_slot are the only other free ones
+        rows = self.index.execute("SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (needed,)).fetchall()
+        self.index.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in rows])
+        self.logger.info(f"Evicted {len(rows)} embeddings from the cache")
+        return fresh + [slot for _, slot in rows]
+
+    def _embed(self, texts, embed, kind):
+        """
+        Embeds texts, computing only the ones that are not cached.
+
+        :param texts: Texts to embed.
+        :param embed: Function computing the embeddings of a list of texts.
+        :param kind: 'document' or 'query'.
+        :return: List of embedding vectors.
+        """
+        keys = [self.key(text, kind) for text in texts]
+        results = [None] * len(texts)
+        with self.lock:
+            found = {}
+            if self.vectors is not None:
+                unique = list(set(keys))
+                for i in range(0, len(unique), 500):
+                    chunk = unique[i:i + 500]
+                    rows = self.index.execute(
+                        f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update(rows)
+            for i, key in enumerate(keys):
+                if key in found:
+                    results[i] = self.vectors[found[key]].tolist()
+            if found:
+                with self.index:
+                    clock = self._clock()
+                    self.index.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                           [(clock, key) for key in found])
+
+        missing = {}
+        for i, key in enumerate(keys):
+            if results[i] is None:
+                missing.setdefault(key, []).append(i)
+        if missing:
+            computed = embed([texts[positions[0]] for positions in missing.values()])
+            for positions, vector in zip(missing.values(), computed):
+                for i in positions:
+                    results[i] = list(vector)
+            self._store(list(missing.keys()), computed)
+
+        with self.lock:
+            self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+            self.misses += sum(len(positions) for positions in missing.values())
+        return results
+
+    def _store(self, keys, vectors):
+        """
+        Writes new vectors to the cache.
+
+        :param keys: Cache keys of the vectors.
+        :param vectors: Embedding vectors.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            try:
+                if self.vectors is None:
+                    # Another process may have created the file since this one started
+                    with self.index:
+                        self.index.execute("BEGIN IMMEDIATE")
+                        row = self.index.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+                        if row:
+                            self._open_vectors(**json.loads(row[0]))
+                        else:
+                            self._create_vectors(vectors.shape[1])
+                keys, vectors = keys[:self.capacity], vectors[:self.capacity]
+                # Evicted keys are committed away before their slots are overwritten,
+                # so no other process reads a reused slot under its old key
+                with self.index:
+                    self.index.execute("BEGIN IMMEDIATE")
+                    # Another thread or process that missed on the same texts may have stored them already
+                    stored = set()
+                    for i in range(0, len(keys), 500):
+                        chunk = keys[i:i + 500]
+                        stored.update(row[0] for row in self.index.execute(
+                            f"SELECT key FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                        ))
+                    new = [i for i, key in enumerate(keys) if key not in stored]
+                    keys, vectors = [keys[i] for i in new], vectors[new]
+                    slots = self._allocate(len(keys))
+                # Slots held by writers that have not recorded their entries yet cannot be evicted
+                keys, vectors = keys[:len(slots)], vectors[:len(slots)]
+                if not keys:
+                    return
+                self.vectors[slots] = vectors
+                self.vectors.flush()
+                with self.index:
+                    clock = self._clock()
+                    taken = []
+                    for key, slot in zip(keys, slots):
+                        cursor = self.index.execute("INSERT OR IGNORE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                                                    (key, slot, clock))
+                        if not cursor.rowcount:
+                            taken.append((slot,))
+                    # Keys stored by another writer in the meantime keep its slot; ours goes back to the free list
+                    self.index.executemany("INSERT INTO free_slots (slot) VALUES (?)", taken)
+            except Exception as e:
+                # A cache failure must never break embedding
+                self.logger.exception(f"Error writing to embedding cache: {e}")
+
+    def embed_documents(self, texts):
+        """
+        Embeds documents through the cache.
+
+        :param texts: Texts to embed.
+        :return: List of embedding vectors.
+        """
+        vectors = self._embed(list(texts), self.embedding_model.embed_documents, 'document')
+        stats = self.stats()
+        self.logger.debug(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)")
+        return vectors
+
+    def embed_query(self, text):
+        """
+        Embeds a query through the cache.
+
+        :param text: Query text.
+        :return: Embedding vector.
+        """
+        return self._embed([text], lambda texts: [self.embedding_model.embed_query(texts[0])], 'query')[0]
+
+    def stats(self):
+        """
+        Reports cache effectiveness.
+
+        :return: Dictionary with hits, misses and hit rate.
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
+
+
+def load_embed_model(model_name=EMBED_MODEL_NAME, backend=INFERENCE_BACKEND):
+    """
+    Loads the embedding model shared by ingestion and retrieval, wrapped in the on-disk cache when enabled.
+
+    :param model_name: Name of the HuggingFace embedding model.
+    :param backend: 'torch' for HuggingFaceEmbeddings, 'onnx' for the quantized ONNX Runtime model.
+    :return: Embedding model.
+    """
+    from utils.onnx_backend import OnnxEmbeddings, model_tag
+
+    if backend == 'onnx':
+        embed_model = OnnxEmbeddings(model_name)
+    else:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        embed_model = HuggingFaceEmbeddings(model_name=model_name)
+    if EMBED_CACHE_ENABLED:
+        # Quantized vectors are cached apart from full-precision ones
+        return CachedEmbeddings(embed_model, model_tag(model_name, backend))
+    return embed_model
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+
+
+def file_hash(path):
+    """
+    Computes the SHA-256 hash of a file's content.
+
+    :param path: Path of the file.
+    :return: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(source, chunks):
+    """
+    Derives stable vector IDs from the content of each chunk.
+
+    Identical chunks within one file get an occurrence suffix so that every ID stays unique.
+
+    :param source: Path of the file the chunks come from.
+    :param chunks: Text chunks (documents with page_content).
+    :return: List of chunk IDs in chunk order.
+    """
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.sha256(f"{source}\0{chunk.page_content}".encode('utf-8')).hexdigest()
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(digest if occurrence == 0 else f"{digest}-{occurrence}")
+    return ids
+
+
+class IngestManifest:
+    """
+    A record of which files have been ingested, their content hashes and the IDs of their chunks.
+    """
+
+    def __init__(self, path):
+        """
+        Loads the manifest, starting empty if it does not exist.
+
+        :param path: Path of the JSON manifest file.
+        """
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.files = json.load(f).get('files', {})
+
+    def file_hash(self, source):
+        """
+        Returns the recorded hash of a file.
+
+        :param source: Path of the file.
+        :return: Hex digest, or None if the file was never ingested.
+        """
+        entry = self.files.get(source)
+        return entry['hash'] if entry else None
+
+    def chunk_ids(self, source):
+        """
+        Returns the recorded chunk IDs of a file.
+
+        :param source: Path of the file.
+        :return: List of chunk IDs.
+        """
+        entry = self.files.get(source)
+        return list(entry['chunks']) if entry else []
+
+    def update(self, source, digest, ids):
+        """
+        Records a file as ingested.
+
+        :param source: Path of the file.
+        :param digest: Content hash of the file.
+        :param ids: IDs of the file's chunks.
+        """
+        self.files[source] = {'hash': digest, 'chunks': list(ids)}
+
+    def remove(self, source):
+        """
+        Forgets a file.
+
+        :param source: Path of the file.
+        """
+        self.files.pop(source, None)
+
+    def save(self):
+        """
+        Writes the manifest atomically.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
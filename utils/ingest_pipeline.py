@@ -0,0 +1,200 @@
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from utils.ingest_manifest import file_hash, chunk_ids
+from utils import tracing
+from config import INGEST_WORKERS, EMBED_BATCH_SIZE, INGEST_QUEUE_SIZE
+
+_DONE = object()
+
+
+def load_and_split(path, chunk_size, chunk_overlap):
+    """
+    Loads and chunks a single PDF; runs in a worker process.
+
+    :param path: Path of the PDF file.
+    :param chunk_size: Size of each text chunk.
+    :param chunk_overlap: Overlap between consecutive text chunks.
+    :return: Tuple of (path, content hash, chunks, seconds spent).
+    """
+    from utils.loaders import DocumentLoader
+    from utils.text_processing import TextProcessor
+
+    start = time.perf_counter()
+    pages = DocumentLoader(os.path.dirname(path)).load_file(path)
+    chunks = TextProcessor(chunk_size, chunk_overlap).split_text(pages) if pages else []
+    return path, file_hash(path), chunks, time.perf_counter() - start
+
+
+class IngestionPipeline:
+    """
+    A streaming load → split → embed → write pipeline for incremental ingestion.
+
+    PDFs are parsed and chunked in a process pool. New chunks flow through bounded
+    queues to an embedding thread, which embeds them in fixed-size batches, and to a
+    writer thread, which adds each batch to the vector store as soon as it is ready.
+    """
+
+    def __init__(self, vector_db, manifest, chunk_size=1000, chunk_overlap=50, workers=INGEST_WORKERS,
+                 batch_size=EMBED_BATCH_SIZE, queue_size=INGEST_QUEUE_SIZE):
+        """
+        Initializes the pipeline.
+
+        :param vector_db: VectorDatabase to write to.
+        :param manifest: IngestManifest recording what has been ingested.
+        :param chunk_size: Size of each text chunk.
+        :param chunk_overlap: Overlap between consecutive text chunks.
+        :param workers: Number of parser processes (None for one per CPU).
+        :param batch_size: Number of chunks embedded per batch.
+        :param queue_size: Maximum number of chunks or batches waiting between two stages.
+        """
+        self.vector_db = vector_db
+        self.manifest = manifest
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = workers
+        self.batch_size = batch_size
+        self.chunks = queue.Queue(maxsize=queue_size * batch_size)
+        self.batches = queue.Queue(maxsize=queue_size)
+        self.errors = []
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'parse': {'items': 0, 'seconds': 0.0},
+            'embed': {'items': 0, 'seconds': 0.0},
+            'write': {'items': 0, 'seconds': 0.0},
+        }
+
+    def _embed_stage(self):
+        """
+        Embeds queued chunks in fixed-size batches.
+        """
+        batch = []
+        while True:
+            item = self.chunks.get()
+            if item is not _DONE:
+                batch.append(item)
+            if batch and (item is _DONE or len(batch) >= self.batch_size):
+                try:
+                    start = time.perf_counter()
+                    with tracing.span('embed', chunks=len(batch)):
+                        embeddings = self.vector_db.embedding_model.embed_documents([text.page_content for _, text in batch])
+                    self.stats['embed']['seconds'] += time.perf_counter() - start
+                    self.stats['embed']['items'] += len(batch)
+                    self.batches.put((batch, embeddings))
+                except Exception as e:
+                    self.logger.exception(f"Error embedding batch: {e}")
+                    self.errors.append(e)
+                batch = []
+            if item is _DONE:
+                self.batches.put(_DONE)
+                return
+
+    def _write_stage(self):
+        """
+        Writes embedded batches to the vector store.
+        """
+        while True:
+            item = self.batches.get()
+            if item is _DONE:
+                return
+            batch, embeddings = item
+            try:
+                start = time.perf_counter()
+                with tracing.span('write', chunks=len(batch)):
+                    self.vector_db.add_embeddings([text for _, text in batch], embeddings, [chunk_id for chunk_id, _ in batch])
+                self.stats['write']['seconds'] += time.perf_counter() - start
+                self.stats['write']['items'] += len(batch)
+                tracing.increment('chunks_ingested', len(batch))
+            except Exception as e:
+                self.logger.exception(f"Error writing batch: {e}")
+                self.errors.append(e)
+
+    def run(self, paths):
+        """
+        Ingests the given files, skipping those whose content hash is unchanged.
+
+        :param paths: Paths of the PDF files.
+        :return: Dictionary of per-stage item counts, seconds and throughput.
+        """
+        with tracing.request('ingest', files=len(paths)) as fields:
+            changed = [path for path in paths if self.manifest.file_hash(path) != file_hash(path)]
+            fields['changed'] = len(changed)
+            self._run(changed)
+            for stage, values in self.stats.items():
+                fields[f'{stage}_items'] = values['items']
+        return self.stats
+
+    def _consume(self, parsed, updates):
+        """
+        Queues the new chunks of a parsed file for embedding and removes its stale ones.
+
+        :param parsed: Tuple returned by load_and_split.
+        :param updates: List receiving the file's (path, hash, chunk IDs) for the manifest.
+        """
+        path, digest, texts, seconds = parsed
+        tracing.record_span('parse', seconds, path=os.path.basename(path), chunks=len(texts))
+        self.stats['parse']['items'] += 1
+        ids = chunk_ids(path, texts)
+        old_ids = set(self.manifest.chunk_ids(path))
+        self.vector_db.delete_documents(old_ids - set(ids))
+        new_chunks = [(chunk_id, text) for chunk_id, text in zip(ids, texts) if chunk_id not in old_ids]
+        for item in new_chunks:
+            self.chunks.put(item)
+        updates.append((path, digest, ids))
+        self.logger.info(f"Parsed {path}: {len(new_chunks)} new of {len(ids)} chunks")
+
+    def _run(self, changed):
+        """
+        Runs the parse, embed and write stages over the changed files.
+
+        :param changed: Paths of the files to (re)ingest.
+        """
+        # The stage threads inherit the request ID so their spans belong to this ingestion
+        embedder = threading.Thread(target=contextvars.copy_context().run, args=(self._embed_stage,), name="ingest-embed")
+        writer = threading.Thread(target=contextvars.copy_context().run, args=(self._write_stage,), name="ingest-write")
+        embedder.start()
+        writer.start()
+
+        updates = []
+        start = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                # At most two files per worker are in flight, so parsed chunks waiting for the bounded
+                # chunk queue never pile up beyond that, whatever the size of the corpus
+                in_flight = 2 * (self.workers or os.cpu_count() or 1)
+                remaining = iter(changed)
+                pending = set()
+                while True:
+                    while len(pending) < in_flight:
+                        path = next(remaining, None)
+                        if path is None:
+                            break
+                        pending.add(pool.submit(load_and_split, path, self.chunk_size, self.chunk_overlap))
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._consume(future.result(), updates)
+                    del done
+        finally:
+            self.stats['parse']['seconds'] = time.perf_counter() - start
+            self.chunks.put(_DONE)
+            embedder.join()
+            writer.join()
+
+        if self.errors:
+            raise RuntimeError(f"Ingestion failed: {self.errors[0]}")
+        self.vector_db.persist()
+        # Files are only recorded once all of their chunks are stored
+        for path, digest, ids in updates:
+            self.manifest.update(path, digest, ids)
+        self.manifest.save()
+
+        for stage, values in self.stats.items():
+            values['per_second'] = values['items'] / values['seconds'] if values['seconds'] > 0 else 0.0
+            unit = 'files' if stage == 'parse' else 'chunks'
+            self.logger.info(f"{stage}: {values['items']} {unit} in {values['seconds']:.2f}s ({values['per_second']:.1f} {unit}/s)")
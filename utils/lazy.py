@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class LazyComponent:
+    """
+    A component that is built on first use or warmed up in the background, whichever comes first.
+    """
+
+    def __init__(self, name, factory):
+        """
+        Initializes the lazy component.
+
+        :param name: Name shown in status reports and logs.
+        :param factory: Callable without arguments that builds the component.
+        """
+        self.name = name
+        self.factory = factory
+        self.future = None
+        self.status = 'pending'
+        self.seconds = None
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _claim(self):
+        """
+        Claims the right to load the component. A component that failed to load is retried.
+
+        :return: True if the caller must run the factory.
+        """
+        with self.lock:
+            if self.future is not None and not (self.status == 'failed' and self.future.done()):
+                return False
+            self.future = Future()
+            return True
+
+    def _load(self):
+        """
+        Runs the factory and records the outcome.
+        """
+        self.status = 'loading'
+        start = time.perf_counter()
+        try:
+            value = self.factory()
+        except Exception as e:
+            self.seconds = time.perf_counter() - start
+            self.status = 'failed'
+            self.logger.exception(f"Failed to load {self.name} after {self.seconds:.2f}s: {e}")
+            self.future.set_exception(e)
+            return
+        self.seconds = time.perf_counter() - start
+        self.status = 'ready'
+        self.logger.info(f"Loaded {self.name} in {self.seconds:.2f}s")
+        self.future.set_result(value)
+
+    def start(self, executor):
+        """
+        Starts loading the component in the background unless it is already loading.
+
+        :param executor: Executor to load the component on.
+        """
+        if self._claim():
+            executor.submit(self._load)
+
+    def get(self):
+        """
+        Returns the component, loading it in the calling thread if nobody started it yet.
+
+        :return: The built component.
+        """
+        if self._claim():
+            self._load()
+        return self.future.result()
+
+    def describe(self):
+        """
+        Describes the loading state for the UI.
+
+        :return: Status text.
+        """
+        if self.status == 'ready':
+            return f"{self.name} ready ({self.seconds:.1f}s)"
+        if self.status == 'loading':
+            return f"{self.name} loading…"
+        return f"{self.name} {self.status}"
+
+
+def warm_up(components, max_workers=4):
+    """
+    Loads components in parallel on background threads and logs a startup-time breakdown when all are done.
+
+    :param components: LazyComponent objects to warm up.
+    :param max_workers: Number of loader threads.
+    :return: The executor running the warm-up.
+    """
+    logger = logging.getLogger(__name__)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up")
+    start = time.perf_counter()
+    for component in components:
+        component.start(executor)
+
+    def report():
+        wait([component.future for component in components])
+        breakdown = ', '.join(f"{component.name}={component.seconds:.2f}s" for component in components)
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s ({breakdown})")
+
+    threading.Thread(target=report, name="warm-up-report", daemon=True).start()
+    executor.shutdown(wait=False)
+    return executor
@@ -38,3 +38,30 @@ class DocumentLoader:
 
         except Exception as e:
             raise RuntimeError(f"Error loading documents: {e}")
+
+    def list_files(self, extension='.pdf'):
+        """
+        Lists the files of a given type under the data path.
+
+        :param extension: File extension to match.
+        :return: Sorted list of file paths.
+        """
+        if not os.path.exists(self.data_path):
+            raise FileNotFoundError(f"The specified path '{self.data_path}' does not exist.")
+
+        paths = []
+        for root, _, files in os.walk(self.data_path):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(extension))
+        return sorted(paths)
+
+    def load_file(self, path):
+        """
+        Loads the pages of a single PDF file.
+
+        :param path: Path of the PDF file.
+        :return: List of loaded pages.
+        """
+        try:
+            return PyPDFLoader(path).load()
+        except Exception as e:
+            raise RuntimeError(f"Error loading document '{path}': {e}")
@@ -1,11 +1,12 @@
 import logging
 import os
+from utils.tracing import setup_tracing
 # Setting up logging to save to file
 logs_dir = "logs"
 log_filename = os.path.join(logs_dir, 'app.log')
 def setup_logging():
     """
-    Sets up the logging configuration for the application.
+    Sets up the logging configuration for the application, including tracing and metrics export.
     """
     logging.basicConfig(
         level=logging.INFO,
@@ -13,3 +14,5 @@ def setup_logging():
         filename=log_filename,  # Log to a file named 'app.log'. Adjust the path as needed.
         filemode='a'  # Append mode
     )
+    # Structured per-stage spans and metrics go to their own files
+    setup_tracing()
@@ -0,0 +1,210 @@
+import collections
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from config import MICRO_BATCH_WAIT_MS, MICRO_BATCH_MAX_SIZE
+
+
+def percentile(values, q):
+    """
+    Computes a percentile by the nearest-rank method.
+
+    :param values: Values to summarize.
+    :param q: Percentile between 0 and 100.
+    :return: The percentile, or 0.0 for no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests into batches that run in one forward pass.
+
+    Callers from any thread submit items and wait on futures. A single worker thread
+    takes the first waiting item, keeps collecting for up to max_wait_ms or until
+    max_batch_size items are queued, runs the batch function once and hands each
+    caller its own result. The batch function only runs under the batcher's model
+    lock, whether on the worker or through run(), so the underlying model is never
+    used from two threads at once.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=MICRO_BATCH_MAX_SIZE, max_wait_ms=MICRO_BATCH_WAIT_MS,
+                 window=1000):
+        """
+        Starts the batching worker.
+
+        :param name: Name used in logs and status reports.
+        :param batch_fn: Callable mapping a list of items to a list of results in the same order.
+        :param max_batch_size: Maximum number of items per batch.
+        :param max_wait_ms: Maximum time the first item of a batch waits for more items.
+        :param window: Number of recent requests and batches the metrics are computed over.
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.latencies = collections.deque(maxlen=window)
+        self.batch_sizes = collections.deque(maxlen=window)
+        self.batches = 0
+        self.lock = threading.Lock()
+        self.model_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.worker = threading.Thread(target=self._run, name=f"micro-batch-{name}", daemon=True)
+        self.worker.start()
+
+    def submit(self, item):
+        """
+        Queues one item.
+
+        :param item: Input of the batch function.
+        :return: Future resolving to the item's result.
+        """
+        future = Future()
+        self.requests.put((item, future, time.perf_counter()))
+        return future
+
+    def map(self, items):
+        """
+        Runs items through the batcher and waits for all of their results.
+
+        :param items: Inputs of the batch function.
+        :return: List of results in input order.
+        """
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def run(self, items):
+        """
+        Runs items that fill a batch on their own in one call on the caller's thread, never while the worker runs a batch.
+
+        :param items: Inputs of the batch function.
+        :return: List of results in input order.
+        """
+        with self.model_lock:
+            return self.batch_fn(list(items))
+
+    def _collect(self):
+        """
+        Waits for a first request, then gathers more until the batch is full or the window closes.
+
+        :return: List of (item, future, submitted_at) tuples.
+        """
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """
+        Runs collected batches until the process exits.
+        """
+        while True:
+            batch = self._collect()
+            try:
+                with self.model_lock:
+                    results = self.batch_fn([item for item, _, _ in batch])
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                self.logger.exception(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            finished = time.perf_counter()
+            with self.lock:
+                self.batches += 1
+                self.batch_sizes.append(len(batch))
+                self.latencies.extend(finished - submitted_at for _, _, submitted_at in batch)
+                batches = self.batches
+            if batches % 100 == 0:
+                stats = self.stats()
+                self.logger.info(f"{self.name}: {stats['batches']} batches, mean size {stats['mean_batch_size']:.1f}, "
+                                 f"p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms")
+
+    def stats(self):
+        """
+        Reports latency and batch-size metrics over the recent window.
+
+        :return: Dictionary with batch count, mean and max batch size, and p50/p95 request latency in milliseconds.
+        """
+        with self.lock:
+            latencies = list(self.latencies)
+            sizes = list(self.batch_sizes)
+            batches = self.batches
+        return {
+            'batches': batches,
+            'mean_batch_size': sum(sizes) / len(sizes) if sizes else 0.0,
+            'max_batch_size': max(sizes) if sizes else 0,
+            'p50_ms': 1000 * percentile(latencies, 50),
+            'p95_ms': 1000 * percentile(latencies, 95),
+        }
+
+    def describe(self):
+        """
+        Describes the metrics for the UI.
+
+        :return: Status text.
+        """
+        stats = self.stats()
+        return (f"{self.name}: p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms, "
+                f"mean batch {stats['mean_batch_size']:.1f}")
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    An embedding model wrapper that micro-batches concurrent small embedding calls.
+
+    Query and short document calls from different sessions share forward passes; large
+    calls such as ingestion batches run as they are, but never alongside a shared batch.
+    Queries are embedded with embed_documents, which is what HuggingFaceEmbeddings does
+    for embed_query as well.
+    """
+
+    def __init__(self, embedding_model, max_batch_size=MICRO_BATCH_MAX_SIZE, max_wait_ms=MICRO_BATCH_WAIT_MS):
+        """
+        Wraps an embedding model.
+
+        :param embedding_model: Embedding model with embed_documents.
+        :param max_batch_size: Maximum number of texts per forward pass.
+        :param max_wait_ms: Maximum time a text waits for others to share its batch.
+        """
+        self.embedding_model = embedding_model
+        self.batcher = MicroBatcher("embedder", embedding_model.embed_documents, max_batch_size, max_wait_ms)
+
+    def __getattr__(self, name):
+        """
+        Exposes the wrapped model's other attributes, such as the embedding cache statistics.
+        """
+        return getattr(self.__dict__['embedding_model'], name)
+
+    def embed_documents(self, texts):
+        """
+        Embeds documents, batching small calls with concurrent ones.
+
+        :param texts: Texts to embed.
+        :return: List of embedding vectors.
+        """
+        texts = list(texts)
+        if len(texts) >= self.batcher.max_batch_size:
+            return self.batcher.run(texts)
+        return self.batcher.map(texts)
+
+    def embed_query(self, text):
+        """
+        Embeds a query in a shared batch.
+
+        :param text: Query text.
+        :return: Embedding vector.
+        """
+        return self.batcher.submit(text).result()
@@ -0,0 +1,265 @@
+import base64
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import (
+    MODEL_SERVER_SOCKET, EMBED_MODEL_NAME, ZERO_SHOT_MODEL, TEXT_LABELS, FAST_SENTIMENT_ENABLED, SENTIMENT_SEED_PATH
+)
+
+HEADER = struct.Struct('>I')
+
+
+def send_message(sock, message):
+    """
+    Writes a length-prefixed JSON message.
+
+    :param sock: Connected socket.
+    :param message: JSON-serializable object.
+    """
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    """
+    Reads exactly size bytes.
+
+    :param sock: Connected socket.
+    :param size: Number of bytes.
+    :return: The bytes, or None if the peer closed the connection first.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_message(sock):
+    """
+    Reads a length-prefixed JSON message.
+
+    :param sock: Connected socket.
+    :return: The decoded object, or None if the peer closed the connection.
+    """
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exactly(sock, HEADER.unpack(header)[0])
+    return None if payload is None else json.loads(payload)
+
+
+def encode_vectors(vectors):
+    """
+    Packs embedding vectors as base64 float32, which is far smaller and faster to parse than JSON floats.
+
+    :param vectors: List of embedding vectors.
+    :return: Dictionary with the shape and the packed data.
+    """
+    array = np.asarray(vectors, dtype=np.float32)
+    return {'shape': list(array.shape), 'data': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def decode_vectors(packed):
+    """
+    Unpacks vectors produced by encode_vectors.
+
+    :param packed: Dictionary with the shape and the packed data.
+    :return: List of embedding vectors.
+    """
+    array = np.frombuffer(base64.b64decode(packed['data']), dtype=np.float32).reshape(packed['shape'])
+    return array.tolist()
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves the requests of one client connection until it disconnects."""
+
+    def handle(self):
+        """Answers requests one at a time; concurrency comes from one thread per connection."""
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (OSError, ValueError) as e:
+                self.server.logger.warning(f"Dropping client connection: {e}")
+                return
+            if request is None:
+                return
+            try:
+                response = {'result': self.server.dispatch(request)}
+            except Exception as e:
+                self.server.logger.exception(f"Error serving {request.get('op')}: {e}")
+                response = {'error': str(e)}
+            send_message(self.request, response)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A local process that loads the classifier and the embedding model once and serves them over a Unix socket.
+
+    Every connection is served on its own thread, and requests from all connections
+    go through the same micro-batchers, so any number of frontend or batch workers
+    share both the model memory and the forward passes.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=MODEL_SERVER_SOCKET):
+        """
+        Loads the models and binds the socket.
+
+        :param socket_path: Path of the Unix socket.
+        """
+        from utils.embedding_cache import load_embed_model
+        from utils.micro_batcher import BatchedEmbeddings, MicroBatcher
+        from utils.sentiment_classifier import SentimentClassifier, PrototypeClassifier
+
+        self.logger = logging.getLogger(__name__)
+        self.embed_model = BatchedEmbeddings(load_embed_model(EMBED_MODEL_NAME))
+        fast_classifier = None
+        if FAST_SENTIMENT_ENABLED:
+            fast_classifier = PrototypeClassifier(self.embed_model, TEXT_LABELS, SENTIMENT_SEED_PATH)
+        self.classifier = SentimentClassifier(ZERO_SHOT_MODEL, TEXT_LABELS, fast_classifier=fast_classifier)
+        self.classify_batcher = MicroBatcher("classifier", self.classifier.classify_batch)
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        self.logger.info(f"Model server listening on {socket_path}")
+
+    def dispatch(self, request):
+        """
+        Runs one request.
+
+        :param request: Dictionary with 'op' and its arguments.
+        :return: JSON-serializable result.
+        """
+        op = request.get('op')
+        if op == 'classify':
+            return [list(result) for result in self.classify_batcher.map(request['texts'])]
+        if op == 'embed_documents':
+            return encode_vectors(self.embed_model.embed_documents(request['texts']))
+        if op == 'embed_query':
+            return encode_vectors([self.embed_model.embed_query(request['text'])])
+        if op == 'stats':
+            return {'classifier': self.classify_batcher.stats(), 'embedder': self.embed_model.batcher.stats()}
+        raise ValueError(f"Unknown operation: {op}")
+
+    def server_close(self):
+        """
+        Closes the socket and removes its file.
+        """
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class ModelClient:
+    """
+    A thin client of the model server with the classifier's classify/classify_batch interface.
+
+    Each thread keeps its own connection, so callers never wait on each other's round-trips.
+    """
+
+    def __init__(self, socket_path=MODEL_SERVER_SOCKET):
+        """
+        Initializes the client; connections are opened on first use.
+
+        :param socket_path: Path of the model server's Unix socket.
+        """
+        self.socket_path = socket_path
+        self.local = threading.local()
+
+    def request(self, message):
+        """
+        Sends a request and waits for its response, reconnecting once if the connection was dropped.
+
+        :param message: Request dictionary.
+        :return: The request's result.
+        """
+        for attempt in range(2):
+            sock = getattr(self.local, 'sock', None)
+            try:
+                if sock is None:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.connect(self.socket_path)
+                    self.local.sock = sock
+                send_message(sock, message)
+                response = recv_message(sock)
+                if response is None:
+                    raise ConnectionError("Model server closed the connection")
+                break
+            except OSError as e:
+                if sock is not None:
+                    sock.close()
+                self.local.sock = None
+                if attempt == 1:
+                    raise RuntimeError(f"Model server unavailable at {self.socket_path}: {e}")
+        if 'error' in response:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return response['result']
+
+    def classify_batch(self, texts):
+        """
+        Classifies email bodies on the server.
+
+        :param texts: Email bodies.
+        :return: List of (label, score) tuples.
+        """
+        return [tuple(result) for result in self.request({'op': 'classify', 'texts': list(texts)})]
+
+    def classify(self, text):
+        """
+        Classifies one email body on the server.
+
+        :param text: Email body.
+        :return: Tuple of (label, score).
+        """
+        return self.classify_batch([text])[0]
+
+    def stats(self):
+        """
+        Reads the server's batching metrics.
+
+        :return: Dictionary of classifier and embedder metrics.
+        """
+        return self.request({'op': 'stats'})
+
+
+class RemoteEmbeddings(Embeddings):
+    """
+    An embedding model backed by the model server.
+    """
+
+    def __init__(self, client):
+        """
+        Initializes the remote embedding model.
+
+        :param client: ModelClient connected to the server.
+        """
+        self.client = client
+
+    def embed_documents(self, texts):
+        """
+        Embeds documents on the server.
+
+        :param texts: Texts to embed.
+        :return: List of embedding vectors.
+        """
+        return decode_vectors(self.client.request({'op': 'embed_documents', 'texts': list(texts)}))
+
+    def embed_query(self, text):
+        """
+        Embeds a query on the server.
+
+        :param text: Query text.
+        :return: Embedding vector.
+        """
+        return decode_vectors(self.client.request({'op': 'embed_query', 'text': text}))[0]
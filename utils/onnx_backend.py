@@ -0,0 +1,354 @@
+import inspect
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from langchain_core.embeddings import Embeddings
+from config import (
+    INFERENCE_BACKEND, ONNX_MODEL_DIR, ONNX_INTRA_OP_THREADS, EMBED_MODEL_NAME, ZERO_SHOT_MODEL, EMBED_BATCH_SIZE
+)
+
+MODEL_FILE = 'model.int8.onnx'
+META_FILE = 'meta.json'
+# Bumped whenever the export changes, so older exports and the results cached from them are not reused
+EXPORT_VERSION = 2
+
+
+def model_tag(model_name, backend=INFERENCE_BACKEND):
+    """
+    Names a model together with its backend, for cache keys that must not mix results of different backends.
+
+    :param model_name: Name of the HuggingFace model.
+    :param backend: 'torch' or 'onnx'.
+    :return: The model name, suffixed for the quantized ONNX backend.
+    """
+    return f"{model_name}@onnx-int8-v{EXPORT_VERSION}" if backend == 'onnx' else model_name
+
+
+def _export_onnx(model, tokenizer, path, output_name, output_axes):
+    """
+    Exports a transformers model to ONNX with dynamic batch and sequence dimensions.
+
+    The exported graph is run once on an example batch and compared with the PyTorch model.
+
+    :param model: PyTorch transformers model.
+    :param tokenizer: Tokenizer of the model.
+    :param path: Path of the ONNX file.
+    :param output_name: Name of the exported output.
+    :param output_axes: Dynamic axes of the output.
+    """
+    import torch
+
+    model.eval()
+    # Tuple outputs; the first one is the hidden state or the logits
+    model.config.return_dict = False
+    # Texts of different lengths, so that padding and the attention mask take part in the check
+    inputs = tokenizer(["An example sentence.", "A second and somewhat longer example sentence."],
+                       ["A hypothesis.", "Another hypothesis."], padding=True, return_tensors='pt')
+    # The export binds the inputs to forward()'s parameters in signature order and names them by position,
+    # which is not the order of the tokenizer output (input_ids, token_type_ids, attention_mask)
+    names = [name for name in inspect.signature(model.forward).parameters if name in inputs]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in names}
+    dynamic_axes[output_name] = output_axes
+    with torch.no_grad():
+        torch.onnx.export(model, ({name: inputs[name] for name in names},), path, input_names=names,
+                          output_names=[output_name], dynamic_axes=dynamic_axes, opset_version=14,
+                          do_constant_folding=True)
+        expected = model(**inputs)[0].numpy()
+    _check_export(path, {name: inputs[name].numpy() for name in names}, expected)
+
+
+def _check_export(path, inputs, expected):
+    """
+    Runs an exported model and compares its output with the PyTorch model's.
+
+    :param path: Path of the ONNX file.
+    :param inputs: Dictionary of input name to numpy array.
+    :param expected: Output of the PyTorch model for the same inputs.
+    :raises ValueError: If the outputs differ.
+    """
+    import numpy as np
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+    actual = session.run(None, {node.name: inputs[node.name].astype('int64') for node in session.get_inputs()})[0]
+    if actual.shape != expected.shape or not np.allclose(actual, expected, atol=1e-3):
+        difference = np.abs(actual - expected).max() if actual.shape == expected.shape else 'shape mismatch'
+        raise ValueError(f"ONNX export {path} does not match the PyTorch model: {difference}")
+
+
+def _export_embedding(model_name, directory):
+    """
+    Exports a sentence-transformers model, recording its pooling so that vectors match HuggingFaceEmbeddings.
+
+    :param model_name: Name of the HuggingFace embedding model.
+    :param directory: Directory receiving the model, tokenizer and metadata.
+    :return: Model metadata.
+    """
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device='cpu')
+    pooling = next(module for module in model if isinstance(module, Pooling))
+    if pooling.pooling_mode_cls_token:
+        mode = 'cls'
+    elif pooling.pooling_mode_max_tokens:
+        mode = 'max'
+    elif pooling.pooling_mode_mean_tokens:
+        mode = 'mean'
+    else:
+        raise ValueError(f"Unsupported pooling of {model_name}: {pooling.get_pooling_mode_str()}")
+    transformer = model[0]
+    _export_onnx(transformer.auto_model, transformer.tokenizer, os.path.join(directory, 'model.onnx'),
+                 'last_hidden_state', {0: 'batch', 1: 'sequence'})
+    transformer.tokenizer.save_pretrained(directory)
+    return {
+        'kind': 'embedding',
+        'pooling': mode,
+        'normalize': any(isinstance(module, Normalize) for module in model),
+        'max_length': model.max_seq_length,
+    }
+
+
+def _export_zero_shot(model_name, directory):
+    """
+    Exports an NLI sequence classification model used for zero-shot classification.
+
+    :param model_name: Name of the HuggingFace NLI model.
+    :param directory: Directory receiving the model, tokenizer and metadata.
+    :return: Model metadata.
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    _export_onnx(model, tokenizer, os.path.join(directory, 'model.onnx'), 'logits', {0: 'batch'})
+    tokenizer.save_pretrained(directory)
+    # Same rule as the transformers zero-shot pipeline
+    entailment_id = next((index for label, index in model.config.label2id.items() if label.lower().startswith('entail')), -1)
+    return {'kind': 'zero-shot', 'entailment_id': entailment_id}
+
+
+def export_model(model_name, kind, model_dir=ONNX_MODEL_DIR):
+    """
+    Exports a model to ONNX with dynamic int8 quantization, unless it was exported before.
+
+    The export is built in a temporary directory and renamed into place, so processes
+    starting at the same time never load a half-written model.
+
+    :param model_name: Name of the HuggingFace model.
+    :param kind: 'embedding' or 'zero-shot'.
+    :param model_dir: Directory holding the exported models.
+    :return: Directory of the exported model.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    directory = os.path.join(model_dir, kind, f"{model_name.replace('/', '--')}-v{EXPORT_VERSION}")
+    if os.path.exists(os.path.join(directory, META_FILE)):
+        return directory
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Exporting {model_name} to ONNX with int8 quantization")
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    staging = tempfile.mkdtemp(dir=os.path.dirname(directory))
+    try:
+        meta = (_export_embedding if kind == 'embedding' else _export_zero_shot)(model_name, staging)
+        fp32_path = os.path.join(staging, 'model.onnx')
+        quantize_dynamic(fp32_path, os.path.join(staging, MODEL_FILE), weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+        meta['model_name'] = model_name
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.rename(staging, directory)
+        logger.info(f"Exported {model_name} to {directory}")
+    except OSError:
+        # Another process finished the same export first
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return directory
+
+
+def load_session(directory, threads=ONNX_INTRA_OP_THREADS):
+    """
+    Opens an exported model with ONNX Runtime on the CPU.
+
+    :param directory: Directory of the exported model.
+    :param threads: Intra-op threads; None uses ONNX Runtime's default of one per physical core.
+    :return: Tuple of (InferenceSession, tokenizer, metadata).
+    """
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.inter_op_num_threads = 1
+    if threads:
+        options.intra_op_num_threads = threads
+    # Idle workers sleep instead of spinning, so the embedder and the classifier do not steal each other's cores
+    options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+    session = ort.InferenceSession(os.path.join(directory, MODEL_FILE), options, providers=['CPUExecutionProvider'])
+    with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+    return session, AutoTokenizer.from_pretrained(directory), meta
+
+
+def _feeds(session, encoded):
+    """
+    Selects the tokenizer outputs the exported graph takes as inputs.
+
+    :param session: InferenceSession.
+    :param encoded: Tokenizer output with numpy arrays.
+    :return: Dictionary of input name to int64 array.
+    """
+    return {node.name: encoded[node.name].astype('int64') for node in session.get_inputs()}
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    A quantized ONNX Runtime drop-in for HuggingFaceEmbeddings.
+
+    Texts are prepared, pooled and normalized exactly as sentence-transformers does for
+    the same model, so vectors stay comparable with those already in the vector store.
+    """
+
+    def __init__(self, model_name=EMBED_MODEL_NAME, model_dir=ONNX_MODEL_DIR, threads=ONNX_INTRA_OP_THREADS,
+                 batch_size=EMBED_BATCH_SIZE):
+        """
+        Exports the model on first use and opens it.
+
+        :param model_name: Name of the HuggingFace embedding model.
+        :param model_dir: Directory holding the exported models.
+        :param threads: ONNX Runtime intra-op threads.
+        :param batch_size: Number of texts per forward pass.
+        """
+        import numpy as np
+
+        self.np = np
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.session, self.tokenizer, meta = load_session(export_model(model_name, 'embedding', model_dir), threads)
+        self.pooling = meta['pooling']
+        self.normalize = meta['normalize']
+        self.max_length = meta['max_length']
+        # Fast tokenizers must not be used from two threads at once
+        self.tokenizer_lock = threading.Lock()
+
+    def _pool(self, hidden, mask):
+        """
+        Pools token embeddings into one vector per text.
+
+        :param hidden: Array of shape (batch, sequence, dimension).
+        :param mask: Attention mask of shape (batch, sequence).
+        :return: Array of shape (batch, dimension).
+        """
+        np = self.np
+        if self.pooling == 'cls':
+            pooled = hidden[:, 0]
+        elif self.pooling == 'max':
+            pooled = np.where(mask[:, :, None] > 0, hidden, -1e9).max(axis=1)
+        else:
+            weights = mask[:, :, None].astype(hidden.dtype)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def embed_documents(self, texts):
+        """
+        Embeds documents, batching texts of similar length together.
+
+        :param texts: Texts to embed.
+        :return: List of embedding vectors.
+        """
+        # HuggingFaceEmbeddings replaces newlines and sentence-transformers strips the result
+        texts = [str(text).replace('\n', ' ').strip() for text in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            with self.tokenizer_lock:
+                encoded = self.tokenizer([texts[i] for i in indices], padding=True, truncation=True,
+                                         max_length=self.max_length, return_tensors='np')
+            hidden = self.session.run(None, _feeds(self.session, encoded))[0]
+            for i, vector in zip(indices, self._pool(hidden, encoded['attention_mask'])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        """
+        Embeds a query.
+
+        :param text: Query text.
+        :return: Embedding vector.
+        """
+        return self.embed_documents([text])[0]
+
+
+class OnnxZeroShotPipeline:
+    """
+    A quantized ONNX Runtime drop-in for the transformers zero-shot classification pipeline.
+
+    Every text is paired with one hypothesis per label and the entailment logits are
+    turned into label scores the same way the pipeline does.
+    """
+
+    def __init__(self, model_name=ZERO_SHOT_MODEL, model_dir=ONNX_MODEL_DIR, threads=ONNX_INTRA_OP_THREADS):
+        """
+        Exports the model on first use and opens it.
+
+        :param model_name: Name of the HuggingFace NLI model.
+        :param model_dir: Directory holding the exported models.
+        :param threads: ONNX Runtime intra-op threads.
+        """
+        import numpy as np
+
+        self.np = np
+        self.model_name = model_name
+        self.session, self.tokenizer, meta = load_session(export_model(model_name, 'zero-shot', model_dir), threads)
+        self.entailment_id = meta['entailment_id']
+        self.contradiction_id = -1 if self.entailment_id == 0 else 0
+
+    def __call__(self, sequences, candidate_labels, multi_label=False, batch_size=8,
+                 hypothesis_template="This example is {}."):
+        """
+        Classifies texts against the candidate labels.
+
+        :param sequences: Text or list of texts.
+        :param candidate_labels: Candidate labels.
+        :param multi_label: Score every label independently instead of normalizing across labels.
+        :param batch_size: Number of text/hypothesis pairs per forward pass.
+        :param hypothesis_template: Template turning a label into a hypothesis.
+        :return: Dictionary with 'sequence', 'labels' and 'scores' sorted by score, or a list of them for a list of texts.
+        """
+        np = self.np
+        if isinstance(sequences, str):
+            return self([sequences], candidate_labels, multi_label, batch_size, hypothesis_template)[0]
+        labels = list(candidate_labels)
+        pairs = [(text, hypothesis_template.format(label)) for text in sequences for label in labels]
+        logits = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            encoded = self.tokenizer([text for text, _ in batch], [hypothesis for _, hypothesis in batch],
+                                     padding=True, truncation='only_first', return_tensors='np')
+            logits.append(self.session.run(None, _feeds(self.session, encoded))[0])
+        logits = np.concatenate(logits).reshape(len(sequences), len(labels), -1)
+
+        if multi_label or len(labels) == 1:
+            pair_logits = logits[..., [self.contradiction_id, self.entailment_id]]
+            scores = np.exp(pair_logits - pair_logits.max(axis=-1, keepdims=True))
+            scores = (scores / scores.sum(axis=-1, keepdims=True))[..., 1]
+        else:
+            entailment = logits[..., self.entailment_id]
+            scores = np.exp(entailment - entailment.max(axis=-1, keepdims=True))
+            scores = scores / scores.sum(axis=-1, keepdims=True)
+
+        results = []
+        for text, row in zip(sequences, scores):
+            order = np.argsort(-row)
+            results.append({'sequence': text, 'labels': [labels[i] for i in order], 'scores': [float(row[i]) for i in order]})
+        return results
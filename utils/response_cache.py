@@ -0,0 +1,164 @@
+import logging
+import sqlite3
+import threading
+import time
+import numpy as np
+from config import RESPONSE_CACHE_PATH, RESPONSE_CACHE_THRESHOLD
+
+
+class ResponseCache:
+    """
+    A semantic cache of replies that were actually sent, indexed by the embedding of the email they answered.
+
+    A new email whose body is close enough to a cached one with the same sentiment reuses that
+    reply instead of running the retrieve-and-generate chain. Hits, misses and the generation
+    time they saved are persisted next to the entries.
+    """
+
+    def __init__(self, embed_model, path=RESPONSE_CACHE_PATH, threshold=RESPONSE_CACHE_THRESHOLD):
+        """
+        Opens the cache and loads its embeddings into memory.
+
+        :param embed_model: Embedding model with embed_documents.
+        :param path: Path of the SQLite database.
+        :param threshold: Minimum cosine similarity for a hit.
+        """
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    message_id TEXT PRIMARY KEY,
+                    body TEXT,
+                    sentiment TEXT,
+                    score REAL,
+                    reply TEXT,
+                    embedding BLOB,
+                    updated_at REAL
+                )
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value REAL)")
+        rows = self.conn.execute("SELECT message_id, sentiment, reply, embedding FROM responses").fetchall()
+        self.entries = [(message_id, sentiment, reply) for message_id, sentiment, reply, _ in rows]
+        self.vectors = np.array([np.frombuffer(blob, dtype=np.float32) for *_, blob in rows]) if rows else None
+
+    def _embed(self, body):
+        """
+        Embeds an email body as a unit vector.
+
+        :param body: Email body.
+        :return: Normalized float32 vector.
+        """
+        vector = np.asarray(self.embed_model.embed_documents([body])[0], dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _stat(self, name):
+        """
+        Reads a counter.
+
+        :param name: Counter name.
+        :return: Counter value.
+        """
+        row = self.conn.execute("SELECT value FROM stats WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0.0
+
+    def _increment(self, name, amount=1.0):
+        """
+        Adds to a counter.
+
+        :param name: Counter name.
+        :param amount: Amount to add.
+        """
+        self.conn.execute("INSERT INTO stats (name, value) VALUES (?, ?) "
+                          "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def lookup(self, body, sentiment):
+        """
+        Finds the cached reply of the most similar prior email with the same sentiment.
+
+        :param body: Body of the new email.
+        :param sentiment: Sentiment label of the new email.
+        :return: Dictionary with message_id, reply and similarity, or None on a miss.
+        """
+        query = self._embed(body)
+        with self.lock:
+            hit = None
+            if self.vectors is not None:
+                scores = self.vectors @ query
+                for row in np.argsort(-scores):
+                    if scores[row] < self.threshold:
+                        break
+                    message_id, cached_sentiment, reply = self.entries[row]
+                    if cached_sentiment == sentiment:
+                        hit = {'message_id': message_id, 'reply': reply, 'similarity': float(scores[row])}
+                        break
+            with self.conn:
+                if hit:
+                    self._increment('hits')
+                    # A hit saves one generation, estimated by the average measured generation time
+                    generations = self._stat('generations')
+                    if generations:
+                        self._increment('seconds_saved', self._stat('generation_seconds') / generations)
+                else:
+                    self._increment('misses')
+        if hit:
+            self.logger.info(f"Response cache hit for {hit['message_id']} (similarity {hit['similarity']:.3f})")
+        return hit
+
+    def record_generation(self, seconds):
+        """
+        Records how long a reply took to generate, to estimate the time saved by hits.
+
+        :param seconds: Generation time in seconds.
+        """
+        with self.lock, self.conn:
+            self._increment('generations')
+            self._increment('generation_seconds', seconds)
+
+    def add(self, message_id, body, sentiment, score, reply):
+        """
+        Caches the reply sent to an email, replacing any earlier reply to the same message.
+
+        :param message_id: Message-ID of the email that was answered.
+        :param body: Body of the email.
+        :param sentiment: Sentiment label of the email.
+        :param score: Sentiment score of the email.
+        :param reply: Reply that was sent.
+        """
+        vector = self._embed(body)
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (message_id, body, sentiment, score, reply, embedding, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (message_id, body, sentiment, score, reply, vector.tobytes(), time.time())
+                )
+            entry = (message_id, sentiment, reply)
+            existing = [row for row, (cached_id, _, _) in enumerate(self.entries) if cached_id == message_id]
+            if existing:
+                self.entries[existing[0]] = entry
+                self.vectors[existing[0]] = vector
+            else:
+                self.entries.append(entry)
+                self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+
+    def stats(self):
+        """
+        Reports cache effectiveness.
+
+        :return: Dictionary with entries, hits, misses, hit rate and seconds saved.
+        """
+        with self.lock:
+            hits, misses = int(self._stat('hits')), int(self._stat('misses'))
+            total = hits + misses
+            return {'entries': len(self.entries), 'hits': hits, 'misses': misses,
+                    'hit_rate': hits / total if total else 0.0, 'seconds_saved': self._stat('seconds_saved')}
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self.conn.close()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from config import (
+    ZERO_SHOT_MODEL, TEXT_LABELS, SENTIMENT_CACHE_PATH, CLASSIFIER_BATCH_SIZE, FAST_SENTIMENT_MARGIN, INFERENCE_BACKEND
+)
+
+LABEL_DESCRIPTIONS = {
+    'Positive': "A customer email expressing satisfaction, gratitude or happiness.",
+    'Negative': "A customer email expressing frustration, anger, disappointment or a complaint.",
+    'Neutral': "A customer email asking a factual question or making a plain request.",
+}
+
+
+class PrototypeClassifier:
+    """
+    A fast sentiment classifier that scores email embeddings against one prototype vector per label.
+    """
+
+    def __init__(self, embed_model, labels=TEXT_LABELS, seed_path=None, scale=20.0):
+        """
+        Builds the label prototypes from label descriptions and an optional labeled seed file.
+
+        :param embed_model: Embedding model with embed_documents, e.g. HuggingFaceEmbeddings.
+        :param labels: Candidate sentiment labels.
+        :param seed_path: Optional JSON lines file of {"text": ..., "label": ...} examples.
+        :param scale: Softmax scale applied to cosine similarities to obtain scores.
+        """
+        import numpy as np
+
+        self.np = np
+        self.embed_model = embed_model
+        self.labels = list(labels)
+        self.scale = scale
+        self.logger = logging.getLogger(__name__)
+
+        examples = {label: [LABEL_DESCRIPTIONS.get(label, f"A customer email with {label.lower()} sentiment.")]
+                    for label in self.labels}
+        if seed_path:
+            with open(seed_path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        seed = json.loads(line)
+                        if seed['label'] in examples:
+                            examples[seed['label']].append(seed['text'])
+        prototypes = []
+        for label in self.labels:
+            vectors = self._normalize(np.array(self.embed_model.embed_documents(examples[label]), dtype=np.float32))
+            prototypes.append(vectors.mean(axis=0))
+        self.prototypes = self._normalize(np.array(prototypes))
+        self.logger.info(f"Built sentiment prototypes from {sum(len(v) for v in examples.values())} examples")
+
+    def _normalize(self, vectors):
+        """
+        Scales vectors to unit length.
+
+        :param vectors: 2-D array of vectors.
+        :return: Normalized vectors.
+        """
+        norms = self.np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / self.np.maximum(norms, 1e-12)
+
+    def classify_batch(self, texts):
+        """
+        Classifies email bodies by their nearest label prototype.
+
+        :param texts: Email bodies.
+        :return: List of (label, score, margin) tuples, where margin is the cosine gap to the runner-up label.
+        """
+        np = self.np
+        embeddings = self._normalize(np.array(self.embed_model.embed_documents(list(texts)), dtype=np.float32))
+        similarities = embeddings @ self.prototypes.T
+        logits = similarities * self.scale
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        ranked = np.argsort(-similarities, axis=1)
+        results = []
+        for row, order in enumerate(ranked):
+            best, second = order[0], order[1] if len(order) > 1 else order[0]
+            margin = float(similarities[row, best] - similarities[row, second])
+            results.append((self.labels[best], float(probabilities[row, best]), margin))
+        return results
+
+
+class SentimentClassifier:
+    """
+    A zero-shot sentiment classification service with batching and a persistent result cache.
+    """
+
+    def __init__(self, model_name=ZERO_SHOT_MODEL, labels=TEXT_LABELS, cache_path=SENTIMENT_CACHE_PATH,
+                 batch_size=CLASSIFIER_BATCH_SIZE, fast_classifier=None, margin_threshold=FAST_SENTIMENT_MARGIN,
+                 backend=INFERENCE_BACKEND):
+        """
+        Initializes the classifier and opens its result cache.
+
+        :param model_name: Name of the zero-shot classification model.
+        :param labels: Candidate sentiment labels.
+        :param cache_path: Path of the SQLite cache file.
+        :param batch_size: Number of emails per forward pass.
+        :param fast_classifier: Optional PrototypeClassifier tried before the zero-shot model.
+        :param margin_threshold: Minimum prototype margin for accepting a fast-path result.
+        :param backend: 'torch' for the transformers pipeline, 'onnx' for the quantized ONNX Runtime model.
+        """
+        from utils.onnx_backend import OnnxZeroShotPipeline, model_tag
+
+        # Results of the quantized model are cached apart from full-precision ones
+        self.model_name = model_tag(model_name, backend)
+        self.labels = list(labels)
+        self.batch_size = batch_size
+        self.fast_classifier = fast_classifier
+        self.margin_threshold = margin_threshold
+        self.logger = logging.getLogger(__name__)
+        if backend == 'onnx':
+            self.pipeline = OnnxZeroShotPipeline(model_name)
+        else:
+            from transformers import pipeline
+
+            self.pipeline = pipeline("zero-shot-classification", model=model_name)
+        self.pipeline_lock = threading.Lock()
+        self.cache_lock = threading.Lock()
+
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.cache = sqlite3.connect(cache_path, check_same_thread=False)
+        with self.cache:
+            self.cache.execute("CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, label TEXT, score REAL)")
+
+    @staticmethod
+    def normalize(text):
+        """
+        Normalizes an email body so that whitespace-only differences share a cache entry.
+
+        :param text: Email body.
+        :return: Normalized text.
+        """
+        return re.sub(r'\s+', ' ', str(text or '')).strip()
+
+    def cache_key(self, text):
+        """
+        Builds the cache key of a normalized body for the current model and labels.
+
+        :param text: Normalized email body.
+        :return: Hex digest.
+        """
+        # 'zero-shot' sets these keys apart from older entries that may hold fast-path labels
+        payload = json.dumps([self.model_name, self.labels, 'zero-shot', text])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _cached(self, keys):
+        """
+        Looks up cached results.
+
+        :param keys: Cache keys.
+        :return: Dictionary of key to (label, score) for the keys that are cached.
+        """
+        results = {}
+        keys = list(keys)
+        with self.cache_lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.cache.execute(
+                    f"SELECT key, label, score FROM sentiment WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                results.update({key: (label, score) for key, label, score in rows})
+        return results
+
+    def classify_batch(self, texts):
+        """
+        Classifies many email bodies, running only cache misses through the model.
+
+        Misses are sorted by length before batching so that each batch pads to a similar length.
+
+        :param texts: Email bodies.
+        :return: List of (label, score) tuples in input order.
+        """
+        normalized = [self.normalize(text) for text in texts]
+        keys = [self.cache_key(text) for text in normalized]
+        results = self._cached(set(keys))
+
+        misses = {}
+        for key, text in zip(keys, normalized):
+            if key not in results:
+                misses[key] = text
+        if misses:
+            new_results = []
+            accepted = 0
+            if self.fast_classifier is not None:
+                # Fast-path results are not cached: they depend on the seeds and the margin, and
+                # the cache must keep serving zero-shot labels when either changes or the path is disabled
+                fast_results = self.fast_classifier.classify_batch(list(misses.values()))
+                for (key, _), (label, score, margin) in zip(list(misses.items()), fast_results):
+                    if margin >= self.margin_threshold:
+                        results[key] = (label, score)
+                        accepted += 1
+                        del misses[key]
+                self.logger.info(f"Fast path accepted {accepted} of {len(fast_results)} emails")
+            ordered = sorted(misses.items(), key=lambda item: len(item[1]))
+            try:
+                for i in range(0, len(ordered), self.batch_size):
+                    batch = ordered[i:i + self.batch_size]
+                    with self.pipeline_lock:
+                        outputs = self.pipeline([text for _, text in batch], self.labels, multi_label=False,
+                                                batch_size=self.batch_size)
+                    if isinstance(outputs, dict):
+                        outputs = [outputs]
+                    for (key, _), output in zip(batch, outputs):
+                        new_results.append((key, output['labels'][0], output['scores'][0]))
+            except Exception as e:
+                self.logger.exception(f"Error in sentiment classification: {e}")
+                raise RuntimeError(f"Error in sentiment classification: {e}")
+            with self.cache_lock, self.cache:
+                self.cache.executemany("INSERT OR REPLACE INTO sentiment (key, label, score) VALUES (?, ?, ?)",
+                                       new_results)
+            results.update({key: (label, score) for key, label, score in new_results})
+            self.logger.info(f"Classified {len(new_results)} emails, {accepted} by the fast path, "
+                             f"{len(set(keys)) - len(new_results) - accepted} served from cache")
+        return [results[key] for key in keys]
+
+    def classify(self, text):
+        """
+        Classifies a single email body, returning immediately when it is cached.
+
+        :param text: Email body.
+        :return: Tuple of (label, score).
+        """
+        return self.classify_batch([text])[0]
@@ -0,0 +1,419 @@
+import atexit
+import contextlib
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import (
+    TRACE_ENABLED, TRACE_LOG_PATH, METRICS_PATH, METRICS_FLUSH_INTERVAL, METRICS_PORT, PROFILE_REQUESTS, PROFILE_DIR
+)
+
+# Histogram bucket upper bounds in seconds, from a cache hit to a long generation
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+PREFIX = "email_ai_"
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_profile_next = threading.Event()
+trace_logger = logging.getLogger('trace')
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms rendered in the Prometheus text format.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Initializes an empty registry.
+
+        :param buckets: Histogram bucket upper bounds in seconds.
+        """
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        """
+        Builds the key of a labelled series.
+
+        :param name: Metric name.
+        :param labels: Label values.
+        :return: Tuple of the name and the sorted labels.
+        """
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        """
+        Adds to a counter.
+
+        :param name: Counter name, without the _total suffix.
+        :param value: Amount to add.
+        :param labels: Label values of the series.
+        """
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Records an observation in a histogram.
+
+        :param name: Histogram name.
+        :param value: Observed value in seconds.
+        :param labels: Label values of the series.
+        """
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        """
+        Formats labels for the text format.
+
+        :param labels: Sorted (name, value) pairs.
+        :param extra: Additional pairs appended after them.
+        :return: Label set in braces, or an empty string.
+        """
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        """
+        Renders every series in the Prometheus text exposition format.
+
+        :return: Metrics text.
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, dict(value, buckets=list(value['buckets']))) for key, value in self.histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            metric = f"{PREFIX}{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram['buckets']):
+                cumulative += count
+                lines.append(f"{metric}_bucket{self._labels(labels, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{metric}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{metric}_count{self._labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes the rendered metrics to a file, replacing it atomically so readers never see a partial file.
+
+        :param path: Output path, e.g. a node_exporter textfile collector file.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temporary, path)
+
+
+metrics = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry on /metrics."""
+
+    def do_GET(self):
+        """Returns the metrics text."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        payload = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        """Keeps scrapes out of the application log."""
+
+
+def current_request_id():
+    """
+    Returns the ID of the request being handled.
+
+    :return: Request ID, or None outside of a request.
+    """
+    return _request_id.get()
+
+
+def new_request_id():
+    """
+    Creates a request ID.
+
+    :return: Short random hexadecimal ID.
+    """
+    return uuid.uuid4().hex[:12]
+
+
+def log_event(event, **fields):
+    """
+    Writes one JSON line to the trace log, tagged with the current request ID.
+
+    :param event: Event type, e.g. 'span'.
+    :param fields: Additional JSON-serializable fields.
+    """
+    if not TRACE_ENABLED:
+        return
+    record = {'ts': round(time.time(), 6), 'event': event, 'request_id': _request_id.get(),
+              'thread': threading.current_thread().name}
+    record.update(fields)
+    trace_logger.info(json.dumps(record, default=str))
+
+
+def increment(name, value=1, **labels):
+    """
+    Adds to a counter of the shared registry.
+
+    :param name: Counter name, without the _total suffix.
+    :param value: Amount to add.
+    :param labels: Label values of the series.
+    """
+    if TRACE_ENABLED:
+        metrics.increment(name, value, **labels)
+
+
+def record_span(stage, seconds, status='ok', request_id=None, **fields):
+    """
+    Records a stage timed elsewhere, e.g. in a worker process or by the LLM server.
+
+    :param stage: Stage name, used as the histogram's stage label.
+    :param seconds: Duration of the stage.
+    :param status: 'ok', 'error' or 'cancelled'.
+    :param request_id: Request ID to log; defaults to the current one.
+    :param fields: Fields added to the log line.
+    """
+    if not TRACE_ENABLED:
+        return
+    metrics.observe('stage_seconds', seconds, stage=stage)
+    if status != 'ok':
+        metrics.increment('stage_errors', stage=stage, status=status)
+    log_event('span', request_id=request_id or _request_id.get(), stage=stage, duration_ms=round(1000 * seconds, 3),
+              status=status, **fields)
+
+
+@contextlib.contextmanager
+def span(stage, **fields):
+    """
+    Times a pipeline stage, records it in the stage latency histogram and logs it as a JSON line.
+
+    The yielded dictionary can be filled with fields known only at the end, such as item counts.
+    The request ID is taken when the stage starts, so a stage spanning the yields of a
+    streaming generator keeps it.
+
+    :param stage: Stage name, used as the histogram's stage label.
+    :param fields: Fields added to the log line.
+    """
+    if not TRACE_ENABLED:
+        yield fields
+        return
+    request_id = _request_id.get()
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield fields
+    except GeneratorExit:
+        # A streaming consumer stopped reading
+        status = 'cancelled'
+        raise
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        record_span(stage, time.perf_counter() - start, status, request_id, **fields)
+
+
+@contextlib.contextmanager
+def bind(request_id):
+    """
+    Makes request_id the current request ID for the duration of the block.
+
+    :param request_id: Request ID.
+    """
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        try:
+            _request_id.reset(token)
+        except ValueError:
+            # Reset from another context, e.g. a generator resumed on a different thread
+            pass
+
+
+def bind_generator(generator, request_id):
+    """
+    Runs every step of a generator with the given request ID, wherever it is resumed.
+
+    Web frameworks resume streaming generators on pool threads with a fresh context,
+    so the request ID is bound anew around each step.
+
+    :param generator: Generator to wrap.
+    :param request_id: Request ID.
+    :return: Generator yielding the same items.
+    """
+    try:
+        while True:
+            with bind(request_id):
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        with bind(request_id):
+            generator.close()
+
+
+def profile_next_request():
+    """
+    Profiles the next request with cProfile, whichever thread handles it.
+    """
+    _profile_next.set()
+
+
+@contextlib.contextmanager
+def request(name, request_id=None, **fields):
+    """
+    The root span of one unit of work: a reply generation, a mailbox sync or an ingestion run.
+
+    A request ID is assigned and bound for every span inside it, the handling thread is
+    renamed after the request so that py-spy dumps show what each thread serves, and
+    the request is profiled when PROFILE_REQUESTS is set or profile_next_request() was called.
+
+    :param name: Request type, used as the stage label of the root span.
+    :param request_id: Existing ID to reuse, e.g. from a caller; a new one is created otherwise.
+    :param fields: Fields added to the root span's log line.
+    """
+    request_id = request_id or new_request_id()
+    thread = threading.current_thread()
+    thread_name = thread.name
+    profiler = None
+    if TRACE_ENABLED and (PROFILE_REQUESTS or _profile_next.is_set()):
+        _profile_next.clear()
+        profiler = cProfile.Profile()
+    with bind(request_id):
+        thread.name = f"{thread_name} [{name} {request_id}]"
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Only one profiler can be active at a time on Python 3.12+
+                logging.warning(f"Not profiling {name} request {request_id}: another profile is running")
+                profiler = None
+        try:
+            with span(name, **fields) as span_fields:
+                increment('requests', type=name)
+                yield span_fields
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _dump_profile(profiler, name, request_id)
+            thread.name = thread_name
+
+
+def _dump_profile(profiler, name, request_id):
+    """
+    Saves a request profile for pstats, snakeviz or flameprof.
+
+    :param profiler: Finished cProfile.Profile.
+    :param name: Request type.
+    :param request_id: Request ID.
+    """
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}-{request_id}.prof")
+        profiler.dump_stats(path)
+        logging.info(f"Saved profile of {name} request {request_id} to {path} (view with: python -m pstats {path})")
+        log_event('profile', stage=name, path=path)
+    except OSError as e:
+        logging.error(f"Error saving profile of request {request_id}: {e}")
+
+
+_setup_lock = threading.Lock()
+_metrics_server = None
+
+
+def setup_tracing():
+    """
+    Starts the JSON lines trace log, the periodic metrics file, the optional /metrics endpoint
+    and the SIGUSR1 profiling trigger. Safe to call more than once.
+    """
+    global _metrics_server
+    if not TRACE_ENABLED:
+        return
+    with _setup_lock:
+        if trace_logger.handlers:
+            return
+        os.makedirs(os.path.dirname(TRACE_LOG_PATH) or '.', exist_ok=True)
+        handler = logging.FileHandler(TRACE_LOG_PATH, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        trace_logger.addHandler(handler)
+        trace_logger.setLevel(logging.INFO)
+        # Spans go to their own file only, keeping app.log readable
+        trace_logger.propagate = False
+
+        if METRICS_PATH:
+            stop = threading.Event()
+
+            def write_metrics():
+                """Rewrites the metrics file."""
+                try:
+                    metrics.write(METRICS_PATH)
+                except OSError as e:
+                    logging.error(f"Error writing metrics to {METRICS_PATH}: {e}")
+
+            def flush():
+                """Rewrites the metrics file periodically until the process exits."""
+                while not stop.wait(METRICS_FLUSH_INTERVAL):
+                    write_metrics()
+
+            threading.Thread(target=flush, name="metrics-flush", daemon=True).start()
+            atexit.register(lambda: (stop.set(), write_metrics()))
+
+        if METRICS_PORT:
+            try:
+                _metrics_server = ThreadingHTTPServer(('127.0.0.1', METRICS_PORT), _MetricsHandler)
+                _metrics_server.daemon_threads = True
+                threading.Thread(target=_metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+                logging.info(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+            except OSError as e:
+                logging.error(f"Could not serve metrics on port {METRICS_PORT}: {e}")
+
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda *_: profile_next_request())
@@ -1,5 +1,7 @@
 import logging
+import os
 from langchain.vectorstores import Chroma
+from config import VECTOR_BACKEND
 
 
 class VectorDatabase:
@@ -7,15 +9,17 @@ class VectorDatabase:
     A class for creating and managing a vector database.
     """
 
-    def __init__(self, db_path, embedding_model):
+    def __init__(self, db_path, embedding_model, backend=VECTOR_BACKEND):
         """
         Initializes the vector database with a database path and embedding model.
 
         :param db_path: Path to store the vector database.
         :param embedding_model: Embedding model to use for vector creation.
+        :param backend: 'chroma', or 'memmap' for the in-process NumPy index.
         """
         self.db_path = db_path
         self.embedding_model = embedding_model
+        self.backend = backend
         self.vectorstore = None
         self.logger = logging.getLogger(__name__)
 
@@ -31,9 +35,117 @@ class VectorDatabase:
             raise ValueError("No documents provided for vector database creation.")
 
         try:
-            self.vectorstore = Chroma.from_documents(documents=documents, embedding=self.embedding_model, persist_directory=self.db_path)
+            self.open_vector_db().add_documents(documents)
             self.vectorstore.persist()
             self.logger.info(f"Vector database created with {len(documents)} documents.")
         except Exception as e:
             self.logger.exception(f"Error in creating vector database: {e}")
             raise RuntimeError(f"Error in creating vector database: {e}")
+
+    def open_vector_db(self):
+        """
+        Opens the existing vector database for incremental updates.
+
+        :return: The opened vector store.
+        """
+        if self.vectorstore is None:
+            if self.backend == 'memmap':
+                from utils.vector_index import MemmapVectorIndex
+
+                self.vectorstore = MemmapVectorIndex(os.path.join(self.db_path, 'memmap'), self.embedding_model)
+            else:
+                self.vectorstore = Chroma(persist_directory=self.db_path, embedding_function=self.embedding_model)
+        return self.vectorstore
+
+    def persist(self):
+        """
+        Writes pending changes to disk.
+
+        The memmap index only rewrites its document table here, so batch writes stay cheap.
+        """
+        if self.vectorstore is not None:
+            self.vectorstore.persist()
+
+    def add_documents(self, documents, ids):
+        """
+        Embeds documents and adds them under the given IDs.
+
+        :param documents: List of documents to be converted into vectors.
+        :param ids: One stable ID per document.
+        """
+        if not documents:
+            return
+        try:
+            self.open_vector_db().add_documents(documents, ids=ids)
+            self.vectorstore.persist()
+            self.logger.info(f"Added {len(documents)} documents to the vector database.")
+        except Exception as e:
+            self.logger.exception(f"Error adding documents to vector database: {e}")
+            raise RuntimeError(f"Error adding documents to vector database: {e}")
+
+    def add_embeddings(self, documents, embeddings, ids):
+        """
+        Adds documents whose embeddings were already computed.
+
+        :param documents: List of documents.
+        :param embeddings: One embedding vector per document.
+        :param ids: One stable ID per document.
+        """
+        if not documents:
+            return
+        try:
+            vectorstore = self.open_vector_db()
+            if self.backend == 'memmap':
+                vectorstore.add_embeddings([document.page_content for document in documents], embeddings,
+                                           [document.metadata for document in documents], ids)
+                return
+            vectorstore._collection.upsert(
+                ids=list(ids),
+                embeddings=[list(map(float, embedding)) for embedding in embeddings],
+                metadatas=[document.metadata for document in documents],
+                documents=[document.page_content for document in documents],
+            )
+            self.vectorstore.persist()
+        except Exception as e:
+            self.logger.exception(f"Error adding embeddings to vector database: {e}")
+            raise RuntimeError(f"Error adding embeddings to vector database: {e}")
+
+    def delete_documents(self, ids):
+        """
+        Removes documents from the vector database.
+
+        :param ids: IDs of the documents to remove.
+        """
+        if not ids:
+            return
+        try:
+            self.open_vector_db().delete(ids=list(ids))
+            if self.backend != 'memmap':
+                self.vectorstore.persist()
+            self.logger.info(f"Removed {len(ids)} documents from the vector database.")
+        except Exception as e:
+            self.logger.exception(f"Error removing documents from vector database: {e}")
+            raise RuntimeError(f"Error removing documents from vector database: {e}")
+
+    def count(self):
+        """
+        Counts the documents in the vector database.
+
+        :return: Number of stored documents.
+        """
+        vectorstore = self.open_vector_db()
+        if self.backend == 'memmap':
+            return len(vectorstore.id_to_row)
+        return vectorstore._collection.count()
+
+    def reset_vector_db(self):
+        """
+        Deletes every document in the vector database.
+        """
+        try:
+            self.open_vector_db().delete_collection()
+            self.vectorstore = None
+            self.logger.info("Vector database cleared.")
+        except Exception as e:
+            self.logger.exception(f"Error clearing vector database: {e}")
+            raise RuntimeError(f"Error clearing vector database: {e}")
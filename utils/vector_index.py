@@ -0,0 +1,359 @@
+import json
+import logging
+import os
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from config import VECTOR_INDEX_MODE, IVF_NLIST, IVF_NPROBE
+
+
+class MemmapVectorIndex(VectorStore):
+    """
+    An in-process vector store backed by a memory-mapped NumPy array of normalized vectors.
+
+    Search is an exact top-k over vectorized dot products. For larger corpora an IVF mode
+    clusters the vectors with k-means and only scans the clusters closest to the query.
+    Opening the index only maps the vector file and reads a small JSON document table.
+
+    A vector file is only ever resized by writing a new one; index.json names the file it
+    describes, so a crash before the next persist leaves the previous index intact.
+    """
+
+    def __init__(self, path, embedding, mode=VECTOR_INDEX_MODE, nlist=IVF_NLIST, nprobe=IVF_NPROBE):
+        """
+        Opens or creates the index.
+
+        :param path: Directory holding the index files.
+        :param embedding: Embedding model used for texts and queries.
+        :param mode: 'exact' or 'ivf'.
+        :param nlist: Number of IVF clusters.
+        :param nprobe: Number of IVF clusters scanned per query.
+        """
+        self.path = path
+        self.embedding = embedding
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.logger = logging.getLogger(__name__)
+        self.vectors = None
+        self.vector_file = 'vectors.f32'
+        self.dim = None
+        self.capacity = 0
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.deleted = np.zeros(0, dtype=bool)
+        self.id_to_row = {}
+        self.centroids = None
+        self.assignments = None
+
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'index.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            self.dim = meta['dim']
+            self.capacity = meta['capacity']
+            self.vector_file = meta.get('vector_file', self.vector_file)
+            self.ids = meta['ids']
+            self.texts = meta['texts']
+            self.metadatas = meta['metadatas']
+            self.deleted = np.array(meta['deleted'], dtype=bool)
+            self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids) if not self.deleted[row]}
+            if self.dim:
+                self.vectors = np.memmap(self._vector_path(), dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+            ivf_path = os.path.join(path, 'ivf.npz')
+            if os.path.exists(ivf_path):
+                ivf = np.load(ivf_path)
+                self.centroids, self.assignments = ivf['centroids'], ivf['assignments']
+
+    @property
+    def embeddings(self):
+        """Embeddings: The embedding model."""
+        return self.embedding
+
+    def _vector_path(self):
+        """Returns the path of the vector file."""
+        return os.path.join(self.path, self.vector_file)
+
+    def _new_vectors(self, capacity, dim):
+        """
+        Maps a new, empty vector file; the current one stays untouched until persist drops it.
+
+        :param capacity: Number of vectors the file holds.
+        :param dim: Embedding dimension.
+        """
+        self.vector_file = f"vectors-{uuid.uuid4().hex}.f32"
+        self.vectors = np.memmap(self._vector_path(), dtype=np.float32, mode='w+', shape=(capacity, dim))
+        self.capacity = capacity
+        self.dim = dim
+
+    def _remove_stale_vectors(self):
+        """
+        Deletes vector files that index.json no longer refers to.
+        """
+        for name in os.listdir(self.path):
+            if name.startswith('vectors') and name.endswith('.f32') and name != self.vector_file:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError as e:
+                    # Still mapped by a reader on platforms that refuse to delete open files
+                    self.logger.warning(f"Could not remove stale vector file {name}: {e}")
+
+    @staticmethod
+    def _normalize(vectors):
+        """
+        Scales vectors to unit length so that dot products are cosine similarities.
+
+        :param vectors: 2-D array of vectors.
+        :return: Normalized float32 vectors.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _reserve(self, count, dim):
+        """
+        Grows the vector file so that it can hold count more rows.
+
+        :param count: Number of rows about to be appended.
+        :param dim: Embedding dimension.
+        """
+        needed = len(self.ids) + count
+        if self.vectors is not None and needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity, 1024)
+        old = self.vectors[:len(self.ids)] if self.vectors is not None else None
+        self._new_vectors(capacity, dim)
+        if old is not None:
+            self.vectors[:len(old)] = old
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        """
+        Adds texts whose embeddings were already computed; existing IDs are replaced.
+
+        :param texts: Texts to add.
+        :param embeddings: One embedding vector per text.
+        :param metadatas: Optional metadata dictionary per text.
+        :param ids: Optional ID per text.
+        :return: IDs of the added texts.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = [metadata or {} for metadata in metadatas] if metadatas is not None else [{} for _ in texts]
+        self.delete([doc_id for doc_id in ids if doc_id in self.id_to_row])
+        vectors = self._normalize(embeddings)
+        self._reserve(len(texts), vectors.shape[1])
+        start = len(self.ids)
+        self.vectors[start:start + len(texts)] = vectors
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(texts), dtype=bool)])
+        self.id_to_row.update({doc_id: start + i for i, doc_id in enumerate(ids)})
+        if self.centroids is not None:
+            self.assignments = np.concatenate([self.assignments, np.argmax(vectors @ self.centroids.T, axis=1)])
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        """
+        Embeds and adds texts.
+
+        :param texts: Texts to add.
+        :param metadatas: Optional metadata dictionary per text.
+        :param ids: Optional ID per text.
+        :return: IDs of the added texts.
+        """
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids=None, **kwargs):
+        """
+        Marks documents as deleted; their rows are reclaimed when the index is persisted.
+
+        :param ids: IDs of the documents to delete.
+        :return: True.
+        """
+        for doc_id in ids or []:
+            row = self.id_to_row.pop(doc_id, None)
+            if row is not None:
+                self.deleted[row] = True
+        return True
+
+    def delete_collection(self):
+        """
+        Removes every document from the index.
+        """
+        for name in os.listdir(self.path):
+            if name in ('index.json', 'ivf.npz') or name.startswith('vectors') and name.endswith('.f32'):
+                os.remove(os.path.join(self.path, name))
+        self.__init__(self.path, self.embedding, self.mode, self.nlist, self.nprobe)
+
+    def _compact(self):
+        """
+        Drops deleted rows from the vector file and the document table.
+        """
+        keep = np.flatnonzero(~self.deleted)
+        vectors = np.array(self.vectors[keep]) if self.vectors is not None else None
+        self.ids = [self.ids[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self.deleted = np.zeros(len(keep), dtype=bool)
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        if vectors is not None:
+            self._new_vectors(max(len(keep), 1), self.dim)
+            self.vectors[:len(keep)] = vectors
+        self.centroids = None
+        self.assignments = None
+
+    def build_ivf(self, iterations=10):
+        """
+        Clusters the vectors with spherical k-means for IVF search.
+
+        :param iterations: Number of k-means iterations.
+        """
+        count = len(self.ids)
+        if count == 0:
+            return
+        vectors = np.asarray(self.vectors[:count])
+        nlist = min(self.nlist, count)
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(count, nlist, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = vectors[assignments == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+        self.centroids = centroids
+        self.assignments = np.argmax(vectors @ centroids.T, axis=1)
+        self.logger.info(f"Built IVF index with {nlist} clusters over {count} vectors")
+
+    def persist(self):
+        """
+        Compacts deleted rows, rebuilds IVF clusters if enabled and writes the index to disk.
+
+        Every file is written under a new name and swapped in with os.replace, and index.json,
+        which names the vector file, is replaced last.
+        """
+        if self.deleted.any():
+            self._compact()
+        if self.mode == 'ivf' and self.centroids is None:
+            self.build_ivf()
+        if self.vectors is not None:
+            self.vectors.flush()
+        ivf_path = os.path.join(self.path, 'ivf.npz')
+        if self.centroids is not None:
+            # Search ignores clusters whose assignments do not match the document table
+            with open(f"{ivf_path}.tmp", 'wb') as f:
+                np.savez(f, centroids=self.centroids, assignments=self.assignments)
+            os.replace(f"{ivf_path}.tmp", ivf_path)
+        elif os.path.exists(ivf_path):
+            os.remove(ivf_path)
+        meta_path = os.path.join(self.path, 'index.json')
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'capacity': self.capacity, 'vector_file': self.vector_file, 'ids': self.ids,
+                       'texts': self.texts, 'metadatas': self.metadatas, 'deleted': self.deleted.tolist()}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        self._remove_stale_vectors()
+
+    def _candidates(self, query, filter=None):
+        """
+        Selects the rows to score for a query.
+
+        :param query: Normalized query vector.
+        :param filter: Optional metadata filter of key/value pairs that must all match.
+        :return: Array of row numbers.
+        """
+        mask = ~self.deleted
+        if self.mode == 'ivf' and self.centroids is not None and len(self.assignments) == len(mask):
+            probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            mask &= np.isin(self.assignments, probes)
+        if filter:
+            mask &= np.array([all(metadata.get(key) == value for key, value in filter.items())
+                              for metadata in self.metadatas], dtype=bool)
+        return np.flatnonzero(mask)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None):
+        """
+        Finds the documents closest to an embedding.
+
+        :param embedding: Query embedding.
+        :param k: Number of documents to return.
+        :param filter: Optional metadata filter of key/value pairs that must all match.
+        :return: List of (document, cosine similarity) tuples, best first.
+        """
+        if self.vectors is None or not self.ids:
+            return []
+        query = self._normalize([embedding])[0]
+        rows = self._candidates(query, filter)
+        if len(rows) == 0:
+            return []
+        if len(rows) == len(self.ids):
+            # Scanning the contiguous block avoids copying rows out of the memory map
+            scores = self.vectors[:len(self.ids)] @ query
+        else:
+            scores = self.vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(Document(page_content=self.texts[rows[i]], metadata=self.metadatas[rows[i]]), float(scores[i]))
+                for i in top]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        """
+        Finds the documents closest to an embedding.
+
+        :param embedding: Query embedding.
+        :param k: Number of documents to return.
+        :param filter: Optional metadata filter.
+        :return: List of documents, best first.
+        """
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        """
+        Finds the documents closest to a query text.
+
+        :param query: Query text.
+        :param k: Number of documents to return.
+        :param filter: Optional metadata filter.
+        :return: List of (document, cosine similarity) tuples, best first.
+        """
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        """
+        Finds the documents closest to a query text.
+
+        :param query: Query text.
+        :param k: Number of documents to return.
+        :param filter: Optional metadata filter.
+        :return: List of documents, best first.
+        """
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        """Cosine similarities are already relevance scores."""
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, **kwargs):
+        """
+        Creates an index from texts.
+
+        :param texts: Texts to add.
+        :param embedding: Embedding model.
+        :param metadatas: Optional metadata dictionary per text.
+        :param ids: Optional ID per text.
+        :param persist_directory: Directory holding the index files.
+        :return: The persisted index.
+        """
+        index = cls(persist_directory, embedding, **kwargs)
+        index.add_texts(texts, metadatas, ids)
+        index.persist()
+        return index